@@ -0,0 +1,172 @@
+#backend/auth.py
+#
+# Token authentication for the API.
+#
+# Clients send JWT access tokens as `Authorization: Bearer <token>`. requires_auth verifies the
+# token and loads a slim principal of the user (id, username, email, role) into g.current_user.
+# Verified tokens are kept in the in-process token cache (utils/token_cache.py), so repeated
+# requests with the same token skip the signature check and the user lookup entirely.
+
+import time
+import uuid
+from datetime import datetime
+from functools import wraps
+
+import jwt
+from flask import current_app, g, jsonify, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import User
+from app.utils.database import add_user
+from app.utils.passwords import password_hasher
+from app.utils.revocation import revocation_list
+from app.utils.token_cache import Principal, token_cache, token_digest
+
+JWT_ALGORITHM = 'HS256'
+
+
+# Function to generate an access or refresh token for a user
+def generate_token(user_id, is_refresh=False):
+    now = int(time.time())
+    if is_refresh:
+        lifetime = current_app.config.get('JWT_REFRESH_TOKEN_EXPIRES', 2592000)
+    else:
+        lifetime = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES', 3600)
+    claims = {
+        'sub': str(user_id),
+        'type': 'refresh' if is_refresh else 'access',
+        'jti': uuid.uuid4().hex,
+        'iat': now,
+        'exp': now + int(lifetime),
+    }
+    return jwt.encode(claims, current_app.config['JWT_SECRET_KEY'], algorithm=JWT_ALGORITHM)
+
+# Function to decode a token of the given type; returns its claims or None
+def _decode(token, token_type):
+    try:
+        claims = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return None
+    if claims.get('type') != token_type or is_revoked(claims):
+        return None
+    return claims
+
+# Function to verify an access token; returns its claims or None
+def verify_token(token):
+    return _decode(token, 'access')
+
+# Function to verify a refresh token; returns its claims or None
+def verify_refresh_token(token):
+    return _decode(token, 'refresh')
+
+# Function to get the user ID from an access token
+def get_user_id_from_token(token):
+    claims = verify_token(token)
+    return int(claims['sub']) if claims else None
+
+# Function to get the user ID from a refresh token
+def get_user_id_from_refresh_token(token):
+    claims = verify_refresh_token(token)
+    return int(claims['sub']) if claims else None
+
+# Function to issue a new access token for a user
+def refresh_token(user_id):
+    return generate_token(user_id)
+
+# Function to check whether a token has been revoked (shared denylist, see utils/revocation.py)
+def is_revoked(claims):
+    return revocation_list.is_revoked(claims.get('jti', ''))
+
+# Function to revoke a token until it expires
+def revoke_token(token):
+    try:
+        claims = jwt.decode(token, current_app.config['JWT_SECRET_KEY'], algorithms=[JWT_ALGORITHM])
+    except jwt.InvalidTokenError:
+        return False
+    revocation_list.revoke(claims['jti'], int(claims['sub']), datetime.utcfromtimestamp(claims['exp']))
+    token_cache.invalidate(token_digest(token))
+    return True
+
+# Function to log a user out, revoking the token used for the request
+def logout_user(user_id, token=None):
+    if token:
+        revoke_token(token)
+    token_cache.invalidate_user(user_id)
+
+# Function to create a user with a hashed password
+def create_user(username, email, password):
+    return add_user(username, email, password_hasher.hash(password))
+
+# Function to check a user's credentials; returns the user or None
+def login_user(email, password):
+    user = User.query.filter_by(email=email).first()
+    if user and password_hasher.check_and_upgrade(user, password):
+        return user
+    return None
+
+# Function to authenticate an access token, using the verified-token cache
+def authenticate(token):
+    """Returns the Principal for a valid access token, or None."""
+    digest = token_digest(token)
+    cached = token_cache.get(digest)
+    if cached is not None:
+        # Tokens revoked by another worker are caught by the (in-memory) Bloom filter check
+        if is_revoked(cached[0]):
+            token_cache.invalidate(digest)
+            return None
+        return cached[1]
+
+    # Read before the load: an invalidation while it runs makes the result uncacheable
+    generation = token_cache.generation
+    claims = verify_token(token)
+    if claims is None:
+        return None
+    row = (db.session.query(User.id, User.username, User.email, User.role)
+           .filter(User.id == int(claims['sub']))
+           .first())
+    if row is None:
+        return None
+    principal = Principal(*row)
+    token_cache.put(digest, claims, principal, generation)
+    return principal
+
+# Decorator for routes that require a valid access token
+def requires_auth(f):
+    @wraps(f)
+    def decorated(*args, **kwargs):
+        scheme, _, token = request.headers.get('Authorization', '').partition(' ')
+        if scheme.lower() != 'bearer' or not token:
+            return jsonify({"msg": "Missing or malformed Authorization header"}), 401
+        principal = authenticate(token.strip())
+        if principal is None:
+            return jsonify({"msg": "Invalid or expired token"}), 401
+        g.current_user = principal
+        g.token = token.strip()
+        return f(*args, **kwargs)
+    return decorated
+
+# Session hooks: drop cached tokens of users that were updated or deleted, once committed
+def _record_user_changes(session, flush_context):
+    user_ids = session.info.setdefault('auth_invalidated_users', set())
+    for obj in session.dirty | session.deleted:
+        if isinstance(obj, User):
+            user_ids.add(obj.id)
+
+def _invalidate_users(session):
+    for user_id in session.info.pop('auth_invalidated_users', ()):
+        token_cache.invalidate_user(user_id)
+
+# Function to configure the token cache and its invalidation hooks for an app
+def init_auth(app):
+    token_cache.configure(app.config.get('AUTH_TOKEN_CACHE_SIZE', 10000),
+                          app.config.get('AUTH_TOKEN_CACHE_TTL', 60))
+    revocation_list.app = app
+    revocation_list.configure(app.config.get('REVOCATION_BLOOM_CAPACITY', 100000),
+                              app.config.get('REVOCATION_BLOOM_ERROR_RATE', 0.001),
+                              app.config.get('REVOCATION_REFRESH_INTERVAL', 2),
+                              app.config.get('REVOCATION_PRUNE_INTERVAL', 3600))
+    if not event.contains(Session, 'after_flush', _record_user_changes):
+        event.listen(Session, 'after_flush', _record_user_changes)
+        event.listen(Session, 'after_commit', _invalidate_users)
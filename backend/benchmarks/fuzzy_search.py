@@ -0,0 +1,105 @@
+#backend/benchmarks/fuzzy_search.py
+#
+# Benchmark: latency and hit rate of fuzzy user lookup (deletion index) against the ILIKE
+# path, for queries that misspell an existing username.
+#
+# Usage: python -m benchmarks.fuzzy_search [users] [queries]
+#
+# The term cap is lifted so any size can be measured; the index takes about 8.3 KB per user,
+# so the default 20k users need ~0.2 GiB.
+
+import random
+import string
+import sys
+import time
+
+from flask import Flask
+from sqlalchemy import or_
+
+from app import db
+from app.models import User
+from app.utils.fuzzy import fuzzy_index
+
+
+# Function to create a throwaway app bound to an in-memory SQLite database
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['FUZZY_MAX_TERMS'] = None
+    db.init_app(app)
+    fuzzy_index.init_app(app)
+    return app
+
+# Function to generate a random username
+def random_name(rng):
+    return ''.join(rng.choices(string.ascii_lowercase, k=rng.randint(6, 12)))
+
+# Function to seed the database with `users` users; returns their usernames
+def seed(users, rng):
+    db.create_all()
+    names = [f'{random_name(rng)}{i}' for i in range(users)]
+    for start in range(0, users, 50000):
+        db.session.execute(User.__table__.insert(), [
+            {'username': name, 'email': f'{name}@example.com', 'password_hash': 'x'}
+            for name in names[start:start + 50000]
+        ])
+    db.session.commit()
+    return names
+
+# Function to apply one random typo (substitution, deletion, insertion or transposition)
+def misspell(name, rng):
+    i = rng.randrange(len(name) - 1)
+    kind = rng.choice(('substitute', 'delete', 'insert', 'transpose'))
+    if kind == 'substitute':
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i + 1:]
+    if kind == 'delete':
+        return name[:i] + name[i + 1:]
+    if kind == 'insert':
+        return name[:i] + rng.choice(string.ascii_lowercase) + name[i:]
+    return name[:i] + name[i + 1] + name[i] + name[i + 2:]
+
+# Function to look users up with the previous ILIKE filter
+def ilike_path(query):
+    pattern = f'%{query}%'
+    return (db.session.query(User.id, User.username)
+            .filter(or_(User.username.ilike(pattern), User.email.ilike(pattern)))
+            .limit(50)
+            .all())
+
+# Function to look users up through the fuzzy index
+def fuzzy_path(query):
+    return fuzzy_index.search(User, query, 50)
+
+# Function to time a lookup path over the queries; returns (p50 ms, p99 ms, hit rate)
+def measure(fn, queries):
+    timings = []
+    hits = 0
+    for expected, query in queries:
+        start = time.perf_counter()
+        rows = fn(query)
+        timings.append(time.perf_counter() - start)
+        hits += any(row[1] == expected for row in rows)
+    timings.sort()
+    return (timings[len(timings) // 2] * 1000,
+            timings[min(int(len(timings) * 0.99), len(timings) - 1)] * 1000,
+            hits / len(queries))
+
+
+if __name__ == '__main__':
+    users = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 200
+    rng = random.Random(42)
+    app = make_app()
+    with app.app_context():
+        names = seed(users, rng)
+        queries = [(name, misspell(name, rng)) for name in rng.sample(names, count)]
+        start = time.perf_counter()
+        fuzzy_index.build()
+        build_seconds = time.perf_counter() - start
+        ilike = measure(ilike_path, queries)
+        fuzzy = measure(fuzzy_path, queries)
+    print(f"users:         {users}")
+    print(f"index build:   {build_seconds:.1f} s")
+    print(f"ILIKE:         p50 {ilike[0]:.2f} ms, p99 {ilike[1]:.2f} ms, found {ilike[2]:.0%}")
+    print(f"fuzzy index:   p50 {fuzzy[0]:.2f} ms, p99 {fuzzy[1]:.2f} ms, found {fuzzy[2]:.0%}")
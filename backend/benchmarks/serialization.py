@@ -0,0 +1,73 @@
+#backend/benchmarks/serialization.py
+#
+# Benchmark: rows/sec of the column-projected serializers against the previous ORM path
+# (full entity hydration followed by a hand-built dict per row).
+#
+# Usage: python -m benchmarks.serialization [rows]
+
+import sys
+import time
+
+from flask import Flask
+
+from app import db
+from app.models import Application, Institution, User, application_serializer
+
+
+# Function to create a throwaway app bound to an in-memory SQLite database
+def make_app():
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    db.init_app(app)
+    return app
+
+# Function to seed the database with one user, one institution and `rows` applications
+def seed(rows):
+    db.create_all()
+    db.session.execute(User.__table__.insert(), [
+        {'id': 1, 'username': 'bench', 'email': 'bench@example.com', 'password_hash': 'x'}
+    ])
+    db.session.execute(Institution.__table__.insert(), [
+        {'id': 1, 'name': 'Benchmark University', 'location': 'Nowhere'}
+    ])
+    db.session.execute(Application.__table__.insert(), [
+        {'user_id': 1, 'institution_id': 1, 'program': f'Program {i % 500}'} for i in range(rows)
+    ])
+    db.session.commit()
+
+# Function to serialize every application through full ORM entities
+def orm_path():
+    return [{
+        'id': application.id,
+        'user_id': application.user_id,
+        'institution_id': application.institution_id,
+        'program': application.program
+    } for application in Application.query.all()]
+
+# Function to serialize every application from projected row tuples
+def serializer_path():
+    return application_serializer.dump_rows(application_serializer.query().all())
+
+# Function to time a serialization path and return its throughput
+def measure(fn, rows, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        db.session.expunge_all()
+        start = time.perf_counter()
+        result = fn()
+        best = min(best, time.perf_counter() - start)
+        assert len(result) == rows
+    return rows / best
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    app = make_app()
+    with app.app_context():
+        seed(rows)
+        orm = measure(orm_path, rows)
+        projected = measure(serializer_path, rows)
+    print(f"rows:              {rows}")
+    print(f"ORM entities:      {orm:,.0f} rows/sec")
+    print(f"column serializer: {projected:,.0f} rows/sec ({projected / orm:.1f}x)")
@@ -0,0 +1,77 @@
+#backend/benchmarks/write_buffer.py
+#
+# Benchmark: rows/sec of access-log inserts committed one per request against the
+# write buffer's multi-row INSERTs, from several concurrent request threads.
+#
+# Usage: python -m benchmarks.write_buffer [rows] [threads]
+
+import os
+import sys
+import tempfile
+import threading
+import time
+
+from flask import Flask
+
+from app import db
+from app.models import ResourceAccess
+from app.utils.write_buffer import write_buffer
+
+
+# Function to create a throwaway app bound to a file-backed SQLite database (commits hit disk)
+def make_app(path):
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = f'sqlite:///{path}'
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {'connect_args': {'timeout': 30}}
+    db.init_app(app)
+    write_buffer.init_app(app)
+    return app
+
+# Function to record an access the previous way: one session commit per row
+def commit_path(app, i):
+    with app.app_context():
+        db.session.add(ResourceAccess(resource_id=i % 100 + 1, user_id=i % 1000 + 1))
+        db.session.commit()
+
+# Function to record an access through the write buffer
+def buffered_path(app, i):
+    write_buffer.add(ResourceAccess, resource_id=i % 100 + 1, user_id=i % 1000 + 1)
+
+# Function to run `rows` inserts over `threads` threads; returns rows/sec including the final flush
+def measure(app, fn, rows, threads):
+    def worker(offset):
+        for i in range(offset, rows, threads):
+            fn(app, i)
+
+    start = time.perf_counter()
+    workers = [threading.Thread(target=worker, args=(offset,)) for offset in range(threads)]
+    for thread in workers:
+        thread.start()
+    for thread in workers:
+        thread.join()
+    if fn is buffered_path:
+        write_buffer.flush()
+    return rows / (time.perf_counter() - start)
+
+# Function to count the stored rows
+def stored_rows(app):
+    with app.app_context():
+        return db.session.query(ResourceAccess).count()
+
+
+if __name__ == '__main__':
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 20000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 8
+    with tempfile.TemporaryDirectory() as directory:
+        app = make_app(os.path.join(directory, 'bench.db'))
+        with app.app_context():
+            db.create_all()
+        committed = measure(app, commit_path, rows, threads)
+        buffered = measure(app, buffered_path, rows, threads)
+        total = stored_rows(app)
+        write_buffer.close()
+    print(f"rows:          {rows} per path, {threads} threads")
+    print(f"commit per row: {committed:,.0f} rows/sec")
+    print(f"write buffer:   {buffered:,.0f} rows/sec ({buffered / committed:.1f}x)")
+    print(f"stored:         {total} rows (expected {2 * rows})")
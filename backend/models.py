@@ -27,6 +27,10 @@ class User(db.Model):
     date_created = db.Column(db.DateTime, default=datetime.utcnow)
     role = db.Column(db.String(50), default='student')  # 'student', 'admin', etc.
     
+    def set_password(self, password):
+        from app.utils.passwords import password_hasher
+        self.password_hash = password_hasher.hash(password)
+
     def __repr__(self):
         return f'<User {self.username}>'
 
@@ -46,6 +50,16 @@ class Institution(db.Model):
 
 class Application(db.Model):
     __tablename__ = 'applications'
+    __table_args__ = (
+        # Faceted search filters (see utils/facets.py)
+        db.Index('ix_applications_status_date', 'status', 'application_date'),
+        db.Index('ix_applications_institution_status_date', 'institution_id', 'status', 'application_date'),
+        db.Index('ix_applications_program_status_date', 'program', 'status', 'application_date'),
+        db.Index('ix_applications_user_date', 'user_id', 'application_date'),
+        # Officers' work queue: pending applications per institution, oldest first
+        db.Index('ix_applications_pending', 'institution_id', 'application_date',
+                 postgresql_where=db.text("status = 'pending'"), sqlite_where=db.text("status = 'pending'")),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -54,6 +68,8 @@ class Application(db.Model):
     application_date = db.Column(db.DateTime, default=datetime.utcnow)
     status = db.Column(db.String(50), default='pending')  # 'pending', 'accepted', 'rejected'
     
+    user = db.relationship('User', backref='applications', lazy=True)
+    
     def __repr__(self):
         return f'<Application {self.program} for {self.institution.name} by {self.user.username}>'
 
@@ -111,6 +127,7 @@ class Faculty(db.Model):
 
 class Course(db.Model):
     __tablename__ = 'courses'
+    __table_args__ = (db.Index('ix_courses_institution_id', 'institution_id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     institution_id = db.Column(db.Integer, db.ForeignKey('institutions.id'), nullable=False)
@@ -125,6 +142,10 @@ class Course(db.Model):
 
 class Enrollment(db.Model):
     __tablename__ = 'enrollments'
+    __table_args__ = (
+        db.Index('ix_enrollments_user_id', 'user_id'),
+        db.Index('ix_enrollments_course_id', 'course_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -137,8 +158,8 @@ class Enrollment(db.Model):
     def __repr__(self):
         return f'<Enrollment of {self.user.username} in {self.course.name} at {self.course.institution.name}>'
 
-class Grade(db.Model):
-    __tablename__ = 'grades'
+class CourseGrade(db.Model):
+    __tablename__ = 'course_grades'
     
     id = db.Column(db.Integer, primary_key=True)
     enrollment_id = db.Column(db.Integer, db.ForeignKey('enrollments.id'), nullable=False)
@@ -164,8 +185,8 @@ class Announcement(db.Model):
     def __repr__(self):
         return f'<Announcement "{self.title}" by {self.user.username}>'
         
-class Comment(db.Model):
-    __tablename__ = 'comments'
+class AnnouncementComment(db.Model):
+    __tablename__ = 'announcement_comments'
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
@@ -173,18 +194,35 @@ class Comment(db.Model):
     content = db.Column(db.Text)
     comment_date = db.Column(db.DateTime, default=datetime.utcnow)
     
-    user = db.relationship('User', backref='comments', lazy=True)
+    user = db.relationship('User', backref='announcement_comments', lazy=True)
     announcement = db.relationship('Announcement', backref='comments', lazy=True)
     
     def __repr__(self):
         return f'<Comment by {self.user.username} on announcement "{self.announcement.title}">'
 
+# Function to build the canonical key of the conversation between two users
+def conversation_key(user_id, other_user_id):
+    low, high = sorted((int(user_id), int(other_user_id)))
+    return f'{low}:{high}'
+
+# Function computing Message.conversation_key from the inserted sender and recipient
+def _message_conversation_key(context):
+    parameters = context.get_current_parameters()
+    return conversation_key(parameters['sender_id'], parameters['recipient_id'])
+
 class Message(db.Model):
     __tablename__ = 'messages'
+    __table_args__ = (
+        db.Index('ix_messages_sender_date', 'sender_id', 'send_date'),
+        db.Index('ix_messages_recipient_date', 'recipient_id', 'send_date'),
+        # Conversation history pages (see utils/messages.py)
+        db.Index('ix_messages_conversation_date', 'conversation_key', 'send_date', 'id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     sender_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     recipient_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    conversation_key = db.Column(db.String(41), nullable=False, default=_message_conversation_key)  # 'low id:high id'
     content = db.Column(db.Text)
     send_date = db.Column(db.DateTime, default=datetime.utcnow)
     
@@ -196,11 +234,18 @@ class Message(db.Model):
 
 class Notification(db.Model):
     __tablename__ = 'notifications'
+    __table_args__ = (
+        db.Index('ix_notifications_user_date', 'user_id', 'notification_date'),
+        # Unread inbox listings and mark-all-read (see utils/notifications.py)
+        db.Index('ix_notifications_unread', 'user_id', 'notification_date',
+                 postgresql_where=db.text('read_at IS NULL'), sqlite_where=db.text('read_at IS NULL')),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     content = db.Column(db.Text)
     notification_date = db.Column(db.DateTime, default=datetime.utcnow)
+    read_at = db.Column(db.DateTime)  # NULL while unread
     
     user = db.relationship('User', backref='notifications', lazy=True)
     
@@ -361,8 +406,8 @@ class Survey(db.Model):
     def __repr__(self):
         return f'<Survey "{self.title}">'
 
-class Question(db.Model):
-    __tablename__ = 'questions'
+class SurveyQuestion(db.Model):
+    __tablename__ = 'survey_questions'
     
     id = db.Column(db.Integer, primary_key=True)
     survey_id = db.Column(db.Integer, db.ForeignKey('surveys.id'), nullable=False)
@@ -387,16 +432,16 @@ class SurveyResponse(db.Model):
     def __repr__(self):
         return f'<Response of {self.user.username} for survey "{self.survey.title}">'
 
-class ResponseAnswer(db.Model):
-    __tablename__ = 'response_answers'
+class SurveyResponseAnswer(db.Model):
+    __tablename__ = 'survey_response_answers'
     
     id = db.Column(db.Integer, primary_key=True)
     response_id = db.Column(db.Integer, db.ForeignKey('survey_responses.id'), nullable=False)
-    question_id = db.Column(db.Integer, db.ForeignKey('questions.id'), nullable=False)
+    question_id = db.Column(db.Integer, db.ForeignKey('survey_questions.id'), nullable=False)
     answer_text = db.Column(db.Text, nullable=False)
     
     response = db.relationship('SurveyResponse', backref='answers', lazy=True)
-    question = db.relationship('Question', backref='responses', lazy=True)
+    question = db.relationship('SurveyQuestion', backref='responses', lazy=True)
     
     def __repr__(self):
         return f'<Answer "{self.answer_text}" for question "{self.question.question_text}">'
@@ -499,6 +544,8 @@ class Discussion(db.Model):
 
 class Post(db.Model):
     __tablename__ = 'posts'
+    # Thread pages: a discussion's posts in (post_date, id) order (see utils/discussions.py)
+    __table_args__ = (db.Index('ix_posts_discussion_date', 'discussion_id', 'post_date', 'id'),)
     
     id = db.Column(db.Integer, primary_key=True)
     discussion_id = db.Column(db.Integer, db.ForeignKey('discussions.id'), nullable=False)
@@ -514,6 +561,7 @@ class Post(db.Model):
 
 class Comment(db.Model):
     __tablename__ = 'comments'
+    __table_args__ = (db.Index('ix_comments_post_date', 'post_id', 'comment_date'),)
     
     id = db.Column(db.Integer, primary_key=True)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
@@ -584,6 +632,8 @@ class ResponseAnswer(db.Model):
 
 class PollVote(db.Model):
     __tablename__ = 'poll_votes'
+    # One vote per user and question (see utils/polls.py)
+    __table_args__ = (db.UniqueConstraint('user_id', 'question_id', name='uq_poll_votes_user_question'),)
     
     id = db.Column(db.Integer, primary_key=True)
     poll_id = db.Column(db.Integer, db.ForeignKey('polls.id'), nullable=False)
@@ -600,6 +650,8 @@ class PollVote(db.Model):
 
 class PollResult(db.Model):
     __tablename__ = 'poll_results'
+    # One tally per answer, the conflict target of the vote upsert (see utils/polls.py)
+    __table_args__ = (db.UniqueConstraint('question_id', 'answer_text', name='uq_poll_results_answer'),)
     
     id = db.Column(db.Integer, primary_key=True)
     poll_id = db.Column(db.Integer, db.ForeignKey('polls.id'), nullable=False)
@@ -630,6 +682,8 @@ class PollComment(db.Model):
 
 class PollCommentVote(db.Model):
     __tablename__ = 'poll_comment_votes'
+    # One vote per user and comment; buffered votes upsert on it (see utils/write_buffer.py)
+    __table_args__ = (db.UniqueConstraint('user_id', 'comment_id', name='uq_poll_comment_votes_user_comment'),)
     
     id = db.Column(db.Integer, primary_key=True)
     comment_id = db.Column(db.Integer, db.ForeignKey('poll_comments.id'), nullable=False)
@@ -659,6 +713,8 @@ class PollCommentReply(db.Model):
 
 class PollCommentReplyVote(db.Model):
     __tablename__ = 'poll_comment_reply_votes'
+    # One vote per user and reply, like PollCommentVote
+    __table_args__ = (db.UniqueConstraint('user_id', 'reply_id', name='uq_poll_comment_reply_votes_user_reply'),)
     
     id = db.Column(db.Integer, primary_key=True)
     reply_id = db.Column(db.Integer, db.ForeignKey('poll_comment_replies.id'), nullable=False)
@@ -671,21 +727,94 @@ class PollCommentReplyVote(db.Model):
     def __repr__(self):
         return f'<Vote of {self.user.username} on reply {self.reply.id}>'
 
-class PollCommentReplyVote(db.Model):
-    __tablename__ = 'poll_comment_reply_votes'
-    
+
+
+
+        
+
+class OutboxEmail(db.Model):
+    __tablename__ = 'email_outbox'
+    __table_args__ = (db.Index('ix_email_outbox_due', 'status', 'next_attempt_at'),)
+
     id = db.Column(db.Integer, primary_key=True)
-    reply_id = db.Column(db.Integer, db.ForeignKey('poll_comment_replies.id'), nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    vote = db.Column(db.Integer, default=0)  # 1 for upvote, -1 for downvote
-    
-    reply = db.relationship('PollCommentReply', backref='votes', lazy=True)
-    user = db.relationship('User', backref='poll_comment_reply_votes', lazy=True)
-    
+    recipient = db.Column(db.String(255), nullable=False)
+    subject = db.Column(db.String(255), nullable=False)
+    body = db.Column(db.Text, nullable=False)
+    status = db.Column(db.String(20), nullable=False, default='pending')  # 'pending', 'sent', 'failed'
+    attempts = db.Column(db.Integer, nullable=False, default=0)
+    next_attempt_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    last_error = db.Column(db.Text)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    sent_at = db.Column(db.DateTime)
+
     def __repr__(self):
-        return f'<Vote of {self.user.username} on reply {self.reply.id}>'
+        return f'<OutboxEmail {self.id} to {self.recipient} ({self.status})>'
+
+
+class RevokedToken(db.Model):
+    __tablename__ = 'revoked_tokens'
+
+    id = db.Column(db.Integer, primary_key=True)
+    jti = db.Column(db.String(64), unique=True, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), index=True)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    revoked_at = db.Column(db.DateTime, nullable=False, default=datetime.utcnow, index=True)
+
+    def __repr__(self):
+        return f'<RevokedToken {self.jti}>'
+
+
+class StatCounter(db.Model):
+    __tablename__ = 'stat_counters'
+
+    scope = db.Column(db.String(50), primary_key=True)  # 'users', 'applications.status', ...
+    bucket = db.Column(db.String(255), primary_key=True, default='')  # '' for totals
+    value = db.Column(db.BigInteger, nullable=False, default=0)
+
+    def __repr__(self):
+        return f'<StatCounter {self.scope}[{self.bucket}] = {self.value}>'
+
+
+class Serializer:
+    """Column-projected JSON serializer for one model.
+
+    Listing endpoints select only the serialized columns and build JSON straight from the
+    row tuples, skipping full-row hydration and the identity map.
+    """
+
+    def __init__(self, model, fields):
+        self.model = model
+        self.fields = tuple(fields)
+
+    @property
+    def columns(self):
+        return [getattr(self.model, field) for field in self.fields]
+
+    def query(self):
+        """Returns a column-only query yielding row tuples instead of ORM entities."""
+        return db.session.query(*self.columns)
+
+    def get(self, id):
+        """Returns the row tuple for a primary key, or None."""
+        return self.query().filter(self.model.id == id).first()
+
+    def dump(self, obj):
+        """Serializes a single row tuple or ORM entity."""
+        return {field: getattr(obj, field) for field in self.fields}
 
+    def dump_rows(self, rows):
+        """Serializes row tuples from query()."""
+        fields = self.fields
+        return [dict(zip(fields, row)) for row in rows]
 
 
+user_serializer = Serializer(User, ('id', 'username', 'email'))
+institution_serializer = Serializer(Institution, ('id', 'name', 'location', 'description'))
+application_serializer = Serializer(Application, ('id', 'user_id', 'institution_id', 'program'))
 
-        
\ No newline at end of file
+# Serializer registry, keyed by model
+SERIALIZERS = {
+    User: user_serializer,
+    Institution: institution_serializer,
+    Application: application_serializer,
+}
@@ -1,40 +1,59 @@
 #backend/routes/admin.py
 #
-from flask import Blueprint, jsonify, request
-from app.models import User, Application, Institution
+import click
+from flask import Blueprint, Response, current_app, jsonify, request
+from app.models import User, Application, Institution, user_serializer, institution_serializer, application_serializer
 from app import db
+from app.utils.database import get_system_stats, get_application_counts_by_institution, get_application_counts_by_program
+from app.utils.export import export_response, wants_stream
+from app.utils.facets import facet_counts, parse_application_filters
+from app.utils.institution_import import IMPORT_FORMATS, ImportAborted, import_institutions, iter_institution_rows
+from app.utils.metrics import request_metrics
+from app.utils.pagination import paginate
+from app.utils.passwords import password_hasher
+from app.utils.pool import pool_metrics
+from app.utils.search import search_engine, wants_fuzzy
 
 # Create a Blueprint for admin-related routes
 admin_bp = Blueprint('admin', __name__)
 
-# Route for getting a list of all users
+# Route for getting a list of all users (or streaming them all with ?stream=1&format=ndjson|csv)
 @admin_bp.route('/users', methods=['GET'])
 def get_users():
-    users = User.query.all()
+    if wants_stream(request.args):
+        try:
+            return export_response(user_serializer, request.args.get('format', 'ndjson'), 'users')
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+
+    try:
+        users, next_cursor = paginate(user_serializer.query(), User, sort_keys=('username', 'email'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # Serialize the results
-    users_data = [{
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    } for user in users]
+    users_data = user_serializer.dump_rows(users)
 
-    return jsonify(users_data), 200
+    return jsonify({'items': users_data, 'next_cursor': next_cursor}), 200
 
-# Route for getting a list of all applications
+# Route for getting a list of all applications (or streaming them all with ?stream=1&format=ndjson|csv)
 @admin_bp.route('/applications', methods=['GET'])
 def get_applications():
-    applications = Application.query.all()
+    if wants_stream(request.args):
+        try:
+            return export_response(application_serializer, request.args.get('format', 'ndjson'), 'applications')
+        except ValueError as e:
+            return jsonify({"msg": str(e)}), 400
+
+    try:
+        applications, next_cursor = paginate(application_serializer.query(), Application, sort_keys=('program',))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # Serialize the results
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
+    applications_data = application_serializer.dump_rows(applications)
 
-    return jsonify(applications_data), 200
+    return jsonify({'items': applications_data, 'next_cursor': next_cursor}), 200
 
 # Route for adding a new institution
 @admin_bp.route('/institutions', methods=['POST'])
@@ -52,15 +71,58 @@ def add_institution():
     try:
         db.session.add(new_institution)
         db.session.commit()
-        return jsonify({
-            'id': new_institution.id,
-            'name': new_institution.name,
-            'location': new_institution.location,
-            'description': new_institution.description
-        }), 201
+        return jsonify(institution_serializer.dump(new_institution)), 201
     except:
         return jsonify({"msg": "An error occurred while adding the institution"}), 500
 
+# Route for importing institutions in bulk from a CSV, JSON or NDJSON request body
+@admin_bp.route('/institutions/import', methods=['POST'])
+def import_institutions_file():
+    fmt = request.args.get('format', 'csv')
+    if fmt not in IMPORT_FORMATS:
+        return jsonify({"msg": f"Format must be one of {', '.join(IMPORT_FORMATS)}"}), 400
+
+    chunk_size = request.args.get('chunk_size', current_app.config.get('IMPORT_CHUNK_SIZE', 500), type=int)
+    if not chunk_size or chunk_size < 1:
+        return jsonify({"msg": "Chunk size must be a positive integer"}), 400
+
+    try:
+        report = import_institutions(iter_institution_rows(request.stream, fmt), chunk_size)
+    except ImportAborted as e:
+        # Chunks before the failure were committed; report them with the error
+        return jsonify(dict(e.report, msg=str(e))), 400 if e.parse_error else 500
+    except Exception as e:
+        return jsonify({"msg": "An error occurred while importing the institutions"}), 500
+
+    return jsonify(report), 200
+
+# Command for importing institutions in bulk from a file (flask admin import-institutions)
+@admin_bp.cli.command('import-institutions')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--format', 'fmt', type=click.Choice(IMPORT_FORMATS), default=None,
+              help='Input format; defaults to the file extension.')
+@click.option('--chunk-size', type=int, default=None, help='Rows upserted per transaction.')
+def import_institutions_command(path, fmt, chunk_size):
+    fmt = fmt or path.rsplit('.', 1)[-1].lower()
+    if fmt not in IMPORT_FORMATS:
+        raise click.UsageError(f"Cannot infer the format of {path}; pass --format")
+    chunk_size = chunk_size or current_app.config.get('IMPORT_CHUNK_SIZE', 500)
+
+    aborted = None
+    with open(path, 'rb') as stream:
+        try:
+            report = import_institutions(iter_institution_rows(stream, fmt), chunk_size)
+        except ImportAborted as e:
+            report, aborted = e.report, e
+
+    click.echo(f"Processed {report['processed']} rows in {report['seconds']}s "
+               f"({report['rows_per_sec']} rows/sec): {report['created']} created, "
+               f"{report['updated']} updated, {report['rejected']} rejected.")
+    for error in report['errors']:
+        click.echo(f"  row {error['row']}: {error['msg']}")
+    if aborted is not None:
+        raise click.ClickException(f"{aborted} (after row {report['processed']}; earlier chunks were kept)")
+
 # Route for deleting an institution by ID
 @admin_bp.route('/institutions/<int:id>', methods=['DELETE'])
 def delete_institution(id):
@@ -98,12 +160,7 @@ def update_institution(id):
 
     try:
         db.session.commit()
-        return jsonify({
-            'id': institution.id,
-            'name': institution.name,
-            'location': institution.location,
-            'description': institution.description
-        }), 200
+        return jsonify(institution_serializer.dump(institution)), 200
     except:
         return jsonify({"msg": "An error occurred while updating the institution"}), 500
 
@@ -125,46 +182,35 @@ def delete_user(id):
 # Route for getting a list of all institutions
 @admin_bp.route('/institutions', methods=['GET'])
 def get_institutions():
-    institutions = Institution.query.all()
+    try:
+        institutions, next_cursor = paginate(institution_serializer.query(), Institution, sort_keys=('name', 'location'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
+    institutions_data = institution_serializer.dump_rows(institutions)
 
-    return jsonify(institutions_data), 200
+    return jsonify({'items': institutions_data, 'next_cursor': next_cursor}), 200
 
 # Route for getting detailed information about a specific user
 @admin_bp.route('/users/<int:id>', methods=['GET'])
 def get_user(id):
-    user = User.query.get(id)
+    user = user_serializer.get(id)
 
     if not user:
         return jsonify({"msg": "User not found"}), 404
 
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    }), 200
+    return jsonify(user_serializer.dump(user)), 200
 
 # Route for getting detailed information about a specific institution
 @admin_bp.route('/institutions/<int:id>', methods=['GET'])
 def get_institution(id):
-    institution = Institution.query.get(id)
+    institution = institution_serializer.get(id)
 
     if not institution:
         return jsonify({"msg": "Institution not found"}), 404
 
-    return jsonify({
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    }), 200
+    return jsonify(institution_serializer.dump(institution)), 200
 
 # Route for updating an existing user
 @admin_bp.route('/users/<int:id>', methods=['PUT'])
@@ -186,28 +232,19 @@ def update_user(id):
 
     try:
         db.session.commit()
-        return jsonify({
-            'id': user.id,
-            'username': user.username,
-            'email': user.email
-        }), 200
+        return jsonify(user_serializer.dump(user)), 200
     except:
         return jsonify({"msg": "An error occurred while updating the user"}), 500
 
 # Route for getting detailed information about a specific application
 @admin_bp.route('/applications/<int:id>', methods=['GET'])
 def get_application(id):
-    application = Application.query.get(id)
+    application = application_serializer.get(id)
 
     if not application:
         return jsonify({"msg": "Application not found"}), 404
 
-    return jsonify({
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    }), 200
+    return jsonify(application_serializer.dump(application)), 200
 
 # Route for updating an existing application
 @admin_bp.route('/applications/<int:id>', methods=['PUT'])
@@ -231,12 +268,7 @@ def update_application(id):
 
     try:
         db.session.commit()
-        return jsonify({
-            'id': application.id,
-            'user_id': application.user_id,
-            'institution_id': application.institution_id,
-            'program': application.program
-        }), 200
+        return jsonify(application_serializer.dump(application)), 200
     except:
         return jsonify({"msg": "An error occurred while updating the application"}), 500
 
@@ -255,44 +287,58 @@ def delete_application(id):
     except:
         return jsonify({"msg": "An error occurred while deleting the application"}), 500
 
+# Route for getting system statistics (add ?breakdown=institution|program for per-value counts)
+@admin_bp.route('/stats', methods=['GET'])
+def get_stats():
+    stats = get_system_stats()
+    breakdown = request.args.get('breakdown')
+
+    if breakdown == 'institution':
+        stats['applications_by_institution'] = get_application_counts_by_institution()
+    elif breakdown == 'program':
+        stats['applications_by_program'] = get_application_counts_by_program()
+    elif breakdown:
+        return jsonify({"msg": "Breakdown must be 'institution' or 'program'"}), 400
+
+    return jsonify(stats), 200
+
+# Route for getting password hashing latency and queue metrics
+@admin_bp.route('/metrics/password-hashing', methods=['GET'])
+def get_password_hashing_metrics():
+    return jsonify(password_hasher.metrics()), 200
+
+# Route for getting connection pool usage and checkout wait times
+@admin_bp.route('/metrics/pool', methods=['GET'])
+def get_pool_metrics():
+    return jsonify(pool_metrics.snapshot()), 200
+
+# Route for getting per-endpoint request metrics in the Prometheus text format
+@admin_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    return Response(request_metrics.prometheus(), mimetype='text/plain; version=0.0.4')
+
+# Route for getting the most recent slow queries
+@admin_bp.route('/metrics/slow-queries', methods=['GET'])
+def get_slow_queries():
+    return jsonify(list(request_metrics.slow_queries)), 200
+
 # Route for searching all data by a given query
 @admin_bp.route('/search', methods=['GET'])
 def search_all():
     query = request.args.get('query', '')
-    institutions = Institution.query.filter(
-        (Institution.name.ilike(f'%{query}%')) | 
-        (Institution.location.ilike(f'%{query}%'))
-    ).all()
+    fuzzy = wants_fuzzy(request.args)
+    institutions = search_engine.search(Institution, query, fuzzy=fuzzy)
 
-    applications = Application.query.filter(
-        (Application.program.ilike(f'%{query}%'))
-    ).all()
+    applications = search_engine.search(Application, query)
 
-    users = User.query.filter(
-        (User.username.ilike(f'%{query}%')) | 
-        (User.email.ilike(f'%{query}%'))
-    ).all()
+    users = search_engine.search(User, query, fuzzy=fuzzy)
 
     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
-
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
-
-    users_data = [{
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    } for user in users]
+    institutions_data = institution_serializer.dump_rows(institutions)
+
+    applications_data = application_serializer.dump_rows(applications)
+
+    users_data = user_serializer.dump_rows(users)
 
     return jsonify({
         'institutions': institutions_data,
@@ -304,19 +350,12 @@ def search_all():
 @admin_bp.route('/search/users', methods=['GET'])
 def search_users():
     query = request.args.get('query', '')
-    users = User.query.filter(
-        (User.username.ilike(f'%{query}%')) | 
-        (User.email.ilike(f'%{query}%'))
-    ).all()
+    users = search_engine.search(User, query, fuzzy=wants_fuzzy(request.args))
 
     # Serialize the results
-    users_data = [{
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    } for user in users]
+    users_data = user_serializer.dump_rows(users)
 
-    return jsonify(users_data),
+    return jsonify(users_data), 200
 #         'id': user.id,
 #         'username': user.username,
 #         'email': user.email
@@ -326,78 +365,31 @@ def search_users():
 #
 #     return jsonify(users_data), 200
 
-# Route for searching applications by user ID
+# Route for searching applications with filters on status, institution, program and date
 @admin_bp.route('/search/applications', methods=['GET'])
 def search_applications():
-    user_id = request.args.get('user_id', '')
-    applications = Application.query.filter_by(user_id=user_id).all()
+    try:
+        conditions = parse_application_filters(request.args)
+        applications, next_cursor = paginate(application_serializer.query().filter(*conditions),
+                                             Application, sort_keys=('program',))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
-    # Serialize the results
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
+    # Serialize the results, with the number of matches per facet value
+    result = {'items': application_serializer.dump_rows(applications), 'next_cursor': next_cursor}
+    if request.args.get('facets', '1').lower() not in ('0', 'false', 'no'):
+        result['facets'] = facet_counts(conditions)
 
-    return jsonify(applications_data), 200
+    return jsonify(result), 200
 
 # Route for searching institutions by name or location
 @admin_bp.route('/search/institutions', methods=['GET'])
 def search_institutions():
     query = request.args.get('query', '')
-    institutions = Institution.query.filter(
-        (Institution.name.ilike(f'%{query}%')) | 
-        (Institution.location.ilike(f'%{query}%'))
-    ).all()
+    institutions = search_engine.search(Institution, query, fuzzy=wants_fuzzy(request.args))
 
     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
+    institutions_data = institution_serializer.dump_rows(institutions)
 
     return jsonify(institutions_data), 200
     return jsonify(institutions_data), 200
-
-# Route for searching applications by program
-@admin_bp.route('/search/applications', methods=['GET'])
-def search_applications():
-    query = request.args.get('query', '')
-    applications = Application.query.filter(
-        (Application.program.ilike(f'%{query}%'))
-    ).all()
-
-    # Serialize the results
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
-
-    return jsonify(applications_data), 200
-    return jsonify(applications_data), 200
-
-# Route for searching applications by college
-@admin_bp.route('/search/applications', methods=['GET'])
-def search_applications():
-    query = request.args.get('query', '')
-    applications = Application.query.filter(
-        (Application.program.ilike(f'%{query}%'))
-    ).all()
-
-    # Serialize the results
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
-
-    return jsonify(applications_data), 200
-    return jsonify(applications_data), 200
-    return jsonify(applications_data), 200
-
@@ -0,0 +1,44 @@
+#backend/routes/applications.py
+#
+from flask import Blueprint, current_app, g, jsonify, request
+from app.auth import requires_auth
+from app.models import application_serializer
+from app.utils.database import add_applications_bulk
+
+# Create a Blueprint for application-related routes
+applications_bp = Blueprint('applications', __name__)
+
+# Route for submitting many applications at once
+@applications_bp.route('/bulk', methods=['POST'])
+@requires_auth
+def submit_applications_bulk():
+    data = request.get_json() or {}
+    applications = data.get('applications')
+
+    if not isinstance(applications, list) or not applications:
+        return jsonify({"msg": "A non-empty list of applications is required"}), 400
+
+    max_items = current_app.config.get('MAX_BULK_APPLICATIONS', 100)
+    if len(applications) > max_items:
+        return jsonify({"msg": f"At most {max_items} applications can be submitted at once"}), 400
+
+    # Applications are submitted for the caller; only admins may name other users, with a
+    # top-level user_id applying to every item that does not name its own
+    if g.current_user.role == 'admin':
+        default_user_id, only_user_id = data.get('user_id', g.current_user.id), None
+    else:
+        default_user_id, only_user_id = g.current_user.id, g.current_user.id
+    for item in applications:
+        if isinstance(item, dict):
+            item.setdefault('user_id', default_user_id)
+
+    try:
+        created, errors = add_applications_bulk(applications, only_user_id=only_user_id)
+    except Exception as e:
+        return jsonify({"msg": "An error occurred while submitting the applications"}), 500
+
+    status = 201 if not errors else (207 if created else 400)
+    return jsonify({
+        'created': [application_serializer.dump(application) for application in created],
+        'errors': errors
+    }), status
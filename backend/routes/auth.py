@@ -1,8 +1,10 @@
 #backend/routes/auth.py
 #
-from flask import Blueprint, request, jsonify
-from app.models import User
+from flask import Blueprint, g, request, jsonify
+from app.models import User, user_serializer
 from app import db
+from app.utils.emails import send_email
+from app.utils.pagination import paginate
 from app.auth import generate_token, requires_auth, verify_token, verify_refresh_token, create_user, login_user, logout_user, refresh_token, revoke_token, get_user_id_from_token, get_user_id_from_refresh_token
 
 # Create a Blueprint for auth-related routes
@@ -27,11 +29,7 @@ def register_user():
 
     user = create_user(username, email, password)
 
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user
-    }), 201
+    return jsonify(user_serializer.dump(user)), 201
 
 # Route for logging in a user
 @auth_bp.route('/login', methods=['POST'])
@@ -60,10 +58,7 @@ def login():
 @auth_bp.route('/logout', methods=['POST'])
 @requires_auth
 def logout():
-    token = request.headers.get('Authorization').split()[1]
-    user_id = get_user_id_from_token(token)
-
-    logout_user(user_id)
+    logout_user(g.current_user.id, g.token)
 
     return jsonify({'msg': 'Logged out successfully'}), 200
 
@@ -71,12 +66,12 @@ def logout():
 @auth_bp.route('/refresh', methods=['POST'])
 def refresh():
     data = request.get_json()
-    refresh_token = data.get('refresh_token')
+    old_refresh_token = data.get('refresh_token')
 
-    if not refresh_token:
+    if not old_refresh_token:
         return jsonify({"msg": "Refresh token is required"}), 400
 
-    user_id = get_user_id_from_refresh_token(refresh_token)
+    user_id = get_user_id_from_refresh_token(old_refresh_token)
 
     if not user_id:
         return jsonify({"msg": "Invalid refresh token"}), 401
@@ -93,10 +88,7 @@ def refresh():
 @auth_bp.route('/revoke', methods=['POST'])
 @requires_auth
 def revoke():
-    token = request.headers.get('Authorization').split()[1]
-    user_id = get_user_id_from_token(token)
-
-    revoke_token(token)
+    revoke_token(g.token)
 
     return jsonify({'msg': 'Token revoked successfully'}), 200
 
@@ -104,25 +96,14 @@ def revoke():
 @auth_bp.route('/user', methods=['GET'])
 @requires_auth
 def get_user():
-    token = request.headers.get('Authorization').split()[1]
-    user_id = get_user_id_from_token(token)
-
-    user = User.query.get(user_id)
-
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    }), 200
+    # Served from the principal loaded by requires_auth, without a database query
+    return jsonify(user_serializer.dump(g.current_user)), 200
 
 # Route for updating the current user
 @auth_bp.route('/user', methods=['PUT'])
 @requires_auth
 def update_user():
-    token = request.headers.get('Authorization').split()[1]
-    user_id = get_user_id_from_token(token)
-
-    user = User.query.get(user_id)
+    user = User.query.get(g.current_user.id)
 
     data = request.get_json()
     username = data.get('username')
@@ -136,20 +117,13 @@ def update_user():
 
     db.session.commit()
 
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    }), 200
+    return jsonify(user_serializer.dump(user)), 200
 
 # Route for updating the current user's password
 @auth_bp.route('/user/password', methods=['PUT'])
 @requires_auth
 def update_password():
-    token = request.headers.get('Authorization').split()[1]
-    user_id = get_user_id_from_token(token)
-
-    user = User.query.get(user_id)
+    user = User.query.get(g.current_user.id)
 
     data = request.get_json()
     password = data.get('password')
@@ -158,6 +132,10 @@ def update_password():
         return jsonify({"msg": "Password is required"}), 400
 
     user.set_password(password)
+    # Queued in the same transaction as the new hash (see utils/outbox.py)
+    send_email("Your password was changed", user.email,
+               f"Hello {user.username},\n\nThe password of your account was just changed. "
+               "If this was not you, reset your password and contact support.")
     db.session.commit()
 
     return jsonify({'msg': 'Password updated successfully'}), 200
@@ -166,10 +144,7 @@ def update_password():
 @auth_bp.route('/user', methods=['DELETE'])
 @requires_auth
 def delete_user():
-    token = request.headers.get('Authorization').split()[1]
-    user_id = get_user_id_from_token(token)
-
-    user = User.query.get(user_id)
+    user = User.query.get(g.current_user.id)
 
     db.session.delete(user)
     db.session.commit()
@@ -180,37 +155,30 @@ def delete_user():
 @auth_bp.route('/users', methods=['GET'])
 @requires_auth
 def get_users():
-    users = User.query.all()
+    try:
+        users, next_cursor = paginate(user_serializer.query(), User, sort_keys=('username', 'email'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
-    users_data = [{
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    } for user in users]
+    users_data = user_serializer.dump_rows(users)
 
-    return jsonify(users_data), 200
+    return jsonify({'items': users_data, 'next_cursor': next_cursor}), 200
 
 # Route for getting detailed information about a specific user
 @auth_bp.route('/users/<int:id>', methods=['GET'])
 @requires_auth
-def get_user(id):
-    user = User.query.get(id)
+def get_user_by_id(id):
+    user = user_serializer.get(id)
 
     if not user:
         return jsonify({"msg": "User not found"}), 404
 
-    return jsonify({
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    }), 200
-
-
+    return jsonify(user_serializer.dump(user)), 200
 
 # Route for deleting a user
 @auth_bp.route('/users/<int:id>', methods=['DELETE'])
 @requires_auth
-def delete_user(id):
+def delete_user_by_id(id):
     user = User.query.get(id)
 
     if not user:
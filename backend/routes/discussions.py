@@ -0,0 +1,72 @@
+#backend/routes/discussions.py
+#
+from flask import Blueprint, Response, current_app, g, jsonify, request
+from app.models import Comment, Discussion, Post
+from app import db
+from app.auth import requires_auth
+from app.utils.discussions import load_thread
+
+# Create a Blueprint for discussion-related routes
+discussions_bp = Blueprint('discussions', __name__)
+
+# Route for getting a page of a discussion thread (posts, their comments and authors)
+@discussions_bp.route('/<int:discussion_id>/thread', methods=['GET'])
+def get_thread(discussion_id):
+    default_limit = current_app.config.get('ITEMS_PER_PAGE', 10)
+    max_limit = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+    try:
+        limit = int(request.args.get('limit', default_limit))
+        if limit < 1:
+            raise ValueError("Limit must be positive")
+        body = load_thread(discussion_id, request.args.get('cursor'), min(limit, max_limit))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    if body is None:
+        return jsonify({"msg": "Discussion not found"}), 404
+
+    return Response(body, mimetype='application/json'), 200
+
+# Route for adding a post to a discussion
+@discussions_bp.route('/<int:discussion_id>/posts', methods=['POST'])
+@requires_auth
+def add_post(discussion_id):
+    data = request.get_json() or {}
+    content = data.get('content')
+
+    if not content:
+        return jsonify({"msg": "Content is required"}), 400
+    if db.session.query(Discussion.id).filter(Discussion.id == discussion_id).first() is None:
+        return jsonify({"msg": "Discussion not found"}), 404
+
+    post = Post(discussion_id=discussion_id, user_id=g.current_user.id, content=content)
+
+    try:
+        db.session.add(post)
+        db.session.commit()
+        return jsonify({'id': post.id, 'post_date': post.post_date.isoformat()}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while adding the post"}), 500
+
+# Route for commenting on a post
+@discussions_bp.route('/posts/<int:post_id>/comments', methods=['POST'])
+@requires_auth
+def add_comment(post_id):
+    data = request.get_json() or {}
+    content = data.get('content')
+
+    if not content:
+        return jsonify({"msg": "Content is required"}), 400
+    if db.session.query(Post.id).filter(Post.id == post_id).first() is None:
+        return jsonify({"msg": "Post not found"}), 404
+
+    comment = Comment(post_id=post_id, user_id=g.current_user.id, content=content)
+
+    try:
+        db.session.add(comment)
+        db.session.commit()
+        return jsonify({'id': comment.id, 'comment_date': comment.comment_date.isoformat()}), 201
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({"msg": "An error occurred while adding the comment"}), 500
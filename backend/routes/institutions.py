@@ -1,42 +1,39 @@
 #backend/routes/institutions.py
 #
 from flask import Blueprint, jsonify, request
-from app.models import Institution, Application
+from app.models import Institution, Application, institution_serializer
 from app import db
+from app.utils.pagination import paginate
+from app.utils.response_cache import cached_response
 
 # Create a Blueprint for institution-related routes
 institutions_bp = Blueprint('institutions', __name__)
 
 # Route for getting a list of all institutions
 @institutions_bp.route('/institutions', methods=['GET'])
+@cached_response(Institution)
 def get_institutions():
-    institutions = Institution.query.all()
+    try:
+        institutions, next_cursor = paginate(institution_serializer.query(), Institution, sort_keys=('name', 'location'))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
+    institutions_data = institution_serializer.dump_rows(institutions)
 
-    return jsonify(institutions_data), 200
+    return jsonify({'items': institutions_data, 'next_cursor': next_cursor}), 200
 
 # Route for getting detailed information about a specific institution
 @institutions_bp.route('/institutions/<int:id>', methods=['GET'])
+@cached_response(Institution)
 def get_institution(id):
-    institution = Institution.query.get(id)
+    institution = institution_serializer.get(id)
 
     if not institution:
         return jsonify({"msg": "Institution not found"}), 404
 
     # Return the institution's details
-    return jsonify({
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    }), 200
+    return jsonify(institution_serializer.dump(institution)), 200
 
 # Route for adding a new institution
 @institutions_bp.route('/institutions', methods=['POST'])
@@ -54,12 +51,7 @@ def add_institution():
     try:
         db.session.add(new_institution)
         db.session.commit()
-        return jsonify({
-            'id': new_institution.id,
-            'name': new_institution.name,
-            'location': new_institution.location,
-            'description': new_institution.description
-        }), 201
+        return jsonify(institution_serializer.dump(new_institution)), 201
     except Exception as e:
         db.session.rollback()
         return jsonify({"msg": "An error occurred while adding the institution"}), 500
@@ -86,16 +78,10 @@ def update_institution(id):
 
     try:
         db.session.commit()
-        return jsonify({
-            'id': institution.id,
-            'name': institution.name,
-            'location': institution.location,
-            'description': institution.description
-        }), 200
+        return jsonify(institution_serializer.dump(institution)), 200
     except Exception as e:
         db.session.rollback()
-        return jsonify({"msg": "An error occurred while updating the institution
-"}), 500
+        return jsonify({"msg": "An error occurred while updating the institution"}), 500
 
 # Route for deleting an institution
 @institutions_bp.route('/institutions/<int:id>', methods=['DELETE'])
@@ -0,0 +1,66 @@
+#backend/routes/messages.py
+#
+from flask import Blueprint, current_app, g, jsonify, request
+from app.auth import requires_auth
+from app.utils.messages import (
+    RecipientNotFound, conversation_history, dump_message, list_conversations, send_message,
+)
+
+# Create a Blueprint for messaging routes
+messages_bp = Blueprint('messages', __name__)
+
+
+# Function to read the ?limit= argument, bounded by MAX_ITEMS_PER_PAGE
+def _limit():
+    default_limit = current_app.config.get('ITEMS_PER_PAGE', 10)
+    max_limit = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError("Limit must be an integer")
+    if limit < 1:
+        raise ValueError("Limit must be positive")
+    return min(limit, max_limit)
+
+# Route for sending a message to another user
+@messages_bp.route('', methods=['POST'])
+@requires_auth
+def post_message():
+    data = request.get_json() or {}
+    recipient_id = data.get('recipient_id')
+
+    if not isinstance(recipient_id, int) or isinstance(recipient_id, bool):
+        return jsonify({"msg": "recipient_id is required"}), 400
+
+    try:
+        message = send_message(g.current_user.id, recipient_id, data.get('content'))
+    except RecipientNotFound as e:
+        return jsonify({"msg": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        return jsonify({"msg": "An error occurred while sending the message"}), 500
+
+    return jsonify(dump_message(message)), 201
+
+# Route for listing the current user's conversations with their latest message
+@messages_bp.route('/conversations', methods=['GET'])
+@requires_auth
+def get_conversations():
+    try:
+        conversations, next_cursor = list_conversations(g.current_user.id, request.args.get('cursor'), _limit())
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return jsonify({'items': conversations, 'next_cursor': next_cursor}), 200
+
+# Route for getting the message history with another user, newest first
+@messages_bp.route('/conversations/<int:user_id>', methods=['GET'])
+@requires_auth
+def get_conversation(user_id):
+    try:
+        rows, next_cursor = conversation_history(g.current_user.id, user_id, request.args.get('cursor'), _limit())
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    return jsonify({'items': [dump_message(row) for row in rows], 'next_cursor': next_cursor}), 200
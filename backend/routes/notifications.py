@@ -0,0 +1,138 @@
+#backend/routes/notifications.py
+#
+from datetime import datetime
+from flask import Blueprint, current_app, g, jsonify, request
+from sqlalchemy import and_, func, or_
+from app.models import Notification
+from app import db
+from app.auth import requires_auth
+from app.utils.notifications import PollCursor, mark_read, notification_hub, unread_count
+from app.utils.pagination import decode_cursor, encode_cursor
+
+# Create a Blueprint for notification-related routes
+notifications_bp = Blueprint('notifications', __name__)
+
+NOTIFICATION_COLUMNS = (Notification.id, Notification.content, Notification.notification_date, Notification.read_at)
+
+
+# Function to serialize a notification row
+def _dump(row):
+    return {
+        'id': row.id,
+        'content': row.content,
+        'notification_date': row.notification_date.isoformat() if row.notification_date else None,
+        'read': row.read_at is not None,
+    }
+
+# Function to parse an integer request argument
+def _int_arg(name, default=None):
+    value = request.args.get(name)
+    if value is None:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+# Route for listing the current user's notifications, newest first
+@notifications_bp.route('', methods=['GET'])
+@requires_auth
+def list_notifications():
+    default_limit = current_app.config.get('ITEMS_PER_PAGE', 10)
+    max_limit = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+    query = db.session.query(*NOTIFICATION_COLUMNS).filter(Notification.user_id == g.current_user.id)
+    if request.args.get('unread') in ('1', 'true'):
+        query = query.filter(Notification.read_at.is_(None))
+
+    try:
+        limit = min(_int_arg('limit', default_limit), max_limit)
+        if limit < 1:
+            raise ValueError("Limit must be positive")
+        cursor = request.args.get('cursor')
+        if cursor:
+            sort, values = decode_cursor(cursor)
+            if sort != '-notification_date' or len(values) != 2:
+                raise ValueError("Invalid cursor")
+            date, last_id = datetime.fromisoformat(values[0]), int(values[1])
+            query = query.filter(or_(Notification.notification_date < date,
+                                     and_(Notification.notification_date == date, Notification.id < last_id)))
+    except (TypeError, ValueError) as e:
+        return jsonify({"msg": str(e)}), 400
+
+    rows = query.order_by(Notification.notification_date.desc(), Notification.id.desc()).limit(limit + 1).all()
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor('-notification_date', [rows[-1].notification_date.isoformat(), rows[-1].id])
+
+    return jsonify({'items': [_dump(row) for row in rows], 'next_cursor': next_cursor,
+                    'unread': unread_count(g.current_user.id)}), 200
+
+# Route for getting the current user's unread notification count
+@notifications_bp.route('/unread-count', methods=['GET'])
+@requires_auth
+def get_unread_count():
+    return jsonify({'unread': unread_count(g.current_user.id)}), 200
+
+# Route for marking the current user's notifications (all, or the given ids) as read
+@notifications_bp.route('/read', methods=['POST'])
+@requires_auth
+def read_notifications():
+    data = request.get_json(silent=True) or {}
+    ids = data.get('ids')
+    if ids is not None and (not isinstance(ids, list) or not all(isinstance(i, int) for i in ids)):
+        return jsonify({"msg": "ids must be a list of integers"}), 400
+
+    try:
+        changed = mark_read(g.current_user.id, ids)
+    except Exception as e:
+        return jsonify({"msg": "An error occurred while updating the notifications"}), 500
+
+    return jsonify({'marked': changed, 'unread': unread_count(g.current_user.id)}), 200
+
+# Route for long-polling new notifications (?cursor= from the previous response; see
+# utils/notifications.py for why the cursor is more than the last id)
+@notifications_bp.route('/poll', methods=['GET'])
+@requires_auth
+def poll_notifications():
+    user_id = g.current_user.id
+    max_timeout = current_app.config.get('NOTIFICATION_POLL_TIMEOUT', 25)
+    window = current_app.config.get('NOTIFICATION_REDELIVERY_WINDOW', 100)
+    limit = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+    try:
+        timeout = min(max(_int_arg('timeout', max_timeout), 0), max_timeout)
+        cursor = request.args.get('cursor')
+        position = PollCursor.decode(cursor, window) if cursor else None
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+
+    if position is None:
+        # First poll: tell the client where to start
+        last_id = db.session.query(func.max(Notification.id)).scalar() or 0
+        seen = [row[0] for row in db.session.query(Notification.id)
+                .filter(Notification.user_id == user_id, Notification.id > last_id - window)]
+        position = PollCursor(last_id, seen, window)
+        return jsonify({'items': [], 'cursor': position.encode(), 'unread': unread_count(user_id)}), 200
+
+    generation = notification_hub.subscribe(user_id)
+    try:
+        rows = position.query(user_id, limit)
+        if not rows and timeout and generation is not None:
+            # Give the connection back to the pool while parked
+            db.session.close()
+            if notification_hub.wait(user_id, generation, timeout):
+                rows = position.query(user_id, limit)
+    finally:
+        if generation is not None:
+            notification_hub.unsubscribe(user_id)
+
+    if not rows and timeout and generation is None:
+        # Every parking slot of this worker is taken
+        response = jsonify({"msg": "Too many clients are waiting, please poll again shortly"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    position.advance([row.id for row in rows])
+    return jsonify({'items': [_dump(row) for row in rows],
+                    'cursor': position.encode(),
+                    'unread': unread_count(user_id)}), 200
@@ -0,0 +1,89 @@
+#backend/routes/polls.py
+#
+import click
+from flask import Blueprint, g, jsonify, request
+from app.models import PollComment, PollCommentReply, PollCommentReplyVote, PollCommentVote
+from app import db
+from app.auth import requires_auth
+from app.utils.write_buffer import write_buffer
+from app.utils.polls import DuplicateVote, cast_vote, get_poll_results, reconcile_poll_results
+
+# Create a Blueprint for poll-related routes
+polls_bp = Blueprint('polls', __name__)
+
+# Route for voting on a poll question
+@polls_bp.route('/<int:poll_id>/votes', methods=['POST'])
+@requires_auth
+def vote(poll_id):
+    data = request.get_json() or {}
+    question_id = data.get('question_id')
+    answer_text = data.get('answer_text')
+
+    if not isinstance(question_id, int) or isinstance(question_id, bool) or \
+            not isinstance(answer_text, str) or not answer_text:
+        return jsonify({"msg": "question_id and answer_text are required"}), 400
+
+    try:
+        cast_vote(poll_id, g.current_user.id, question_id, answer_text)
+    except DuplicateVote as e:
+        return jsonify({"msg": str(e)}), 409
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
+    except Exception as e:
+        return jsonify({"msg": "An error occurred while recording the vote"}), 500
+
+    return jsonify({"msg": "Vote recorded"}), 201
+
+# Route for getting the live results of a poll
+@polls_bp.route('/<int:poll_id>/results', methods=['GET'])
+def results(poll_id):
+    tallies = get_poll_results(poll_id)
+    return jsonify({
+        'poll_id': poll_id,
+        'questions': [{'question_id': question_id, 'answers': answers}
+                      for question_id, answers in tallies.items()]
+    }), 200
+
+# Function to read the vote (1 or -1) of a comment or reply vote request
+def _vote_value():
+    vote = (request.get_json(silent=True) or {}).get('vote')
+    return vote if vote in (1, -1) and not isinstance(vote, bool) else None
+
+# Route for voting on a poll comment (buffered, see utils/write_buffer.py)
+@polls_bp.route('/<int:poll_id>/comments/<int:comment_id>/votes', methods=['POST'])
+@requires_auth
+def vote_on_comment(poll_id, comment_id):
+    vote = _vote_value()
+    if vote is None:
+        return jsonify({"msg": "vote must be 1 or -1"}), 400
+    comment = (db.session.query(PollComment.id)
+               .filter(PollComment.id == comment_id, PollComment.poll_id == poll_id)
+               .first())
+    if comment is None:
+        return jsonify({"msg": "Comment not found"}), 404
+    write_buffer.add(PollCommentVote, comment_id=comment_id, user_id=g.current_user.id, vote=vote)
+    return jsonify({"msg": "Vote recorded"}), 202
+
+# Route for voting on a reply to a poll comment (buffered)
+@polls_bp.route('/<int:poll_id>/comments/<int:comment_id>/replies/<int:reply_id>/votes', methods=['POST'])
+@requires_auth
+def vote_on_reply(poll_id, comment_id, reply_id):
+    vote = _vote_value()
+    if vote is None:
+        return jsonify({"msg": "vote must be 1 or -1"}), 400
+    reply = (db.session.query(PollCommentReply.id)
+             .join(PollComment, PollComment.id == PollCommentReply.comment_id)
+             .filter(PollCommentReply.id == reply_id, PollCommentReply.comment_id == comment_id,
+                     PollComment.poll_id == poll_id)
+             .first())
+    if reply is None:
+        return jsonify({"msg": "Reply not found"}), 404
+    write_buffer.add(PollCommentReplyVote, reply_id=reply_id, user_id=g.current_user.id, vote=vote)
+    return jsonify({"msg": "Vote recorded"}), 202
+
+# Command for rebuilding the poll tallies from the votes (flask polls reconcile-results)
+@polls_bp.cli.command('reconcile-results')
+@click.option('--poll-id', type=int, default=None, help='Only reconcile this poll.')
+def reconcile_results_command(poll_id):
+    written = reconcile_poll_results(poll_id)
+    click.echo(f"Rebuilt {written} poll result tallies.")
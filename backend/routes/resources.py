@@ -0,0 +1,28 @@
+#backend/routes/resources.py
+#
+from flask import Blueprint, g, jsonify
+from app.models import CourseMaterial, CourseMaterialAccess, Resource, ResourceAccess
+from app import db
+from app.auth import requires_auth
+from app.utils.write_buffer import write_buffer
+
+# Create a Blueprint for resource and course material routes
+resources_bp = Blueprint('resources', __name__)
+
+# Route for recording that the current user opened a resource (buffered, see utils/write_buffer.py)
+@resources_bp.route('/<int:resource_id>/access', methods=['POST'])
+@requires_auth
+def record_resource_access(resource_id):
+    if db.session.query(Resource.id).filter(Resource.id == resource_id).first() is None:
+        return jsonify({"msg": "Resource not found"}), 404
+    write_buffer.add(ResourceAccess, resource_id=resource_id, user_id=g.current_user.id)
+    return jsonify({"msg": "Access recorded"}), 202
+
+# Route for recording that the current user opened a course material (buffered)
+@resources_bp.route('/materials/<int:material_id>/access', methods=['POST'])
+@requires_auth
+def record_material_access(material_id):
+    if db.session.query(CourseMaterial.id).filter(CourseMaterial.id == material_id).first() is None:
+        return jsonify({"msg": "Course material not found"}), 404
+    write_buffer.add(CourseMaterialAccess, material_id=material_id, user_id=g.current_user.id)
+    return jsonify({"msg": "Access recorded"}), 202
@@ -1,9 +1,11 @@
 
 #backend/routes/search.py
 #
-from flask import Blueprint, request, jsonify
-from app.models import Institution, Application, User
+from flask import Blueprint, current_app, request, jsonify
+from app.models import Institution, Application, User, user_serializer, institution_serializer, application_serializer
 from app import db
+from app.utils.search import search_engine, wants_fuzzy
+from app.utils.suggest import SUGGESTION_TYPES, suggestion_index
 
 # Create a Blueprint for search routes
 search_bp = Blueprint('search', __name__)
@@ -12,18 +14,10 @@ search_bp = Blueprint('search', __name__)
 @search_bp.route('/institutions', methods=['GET'])
 def search_institutions():
     query = request.args.get('query', '')
-    institutions = Institution.query.filter(
-        (Institution.name.ilike(f'%{query}%')) | 
-        (Institution.location.ilike(f'%{query}%'))
-    ).all()
+    institutions = search_engine.search(Institution, query, fuzzy=wants_fuzzy(request.args))
 
     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
+    institutions_data = institution_serializer.dump_rows(institutions)
 
     return jsonify(institutions_data), 200
 
@@ -31,15 +25,10 @@ def search_institutions():
 @search_bp.route('/applications', methods=['GET'])
 def search_applications():
     user_id = request.args.get('user_id', '')
-    applications = Application.query.filter_by(user_id=user_id).all()
+    applications = application_serializer.query().filter(Application.user_id == user_id).all()
 
     # Serialize the results
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
+    applications_data = application_serializer.dump_rows(applications)
 
     return jsonify(applications_data), 200
 
@@ -47,17 +36,10 @@ def search_applications():
 @search_bp.route('/users', methods=['GET'])
 def search_users():
     query = request.args.get('query', '')
-    users = User.query.filter(
-        (User.username.ilike(f'%{query}%')) | 
-        (User.email.ilike(f'%{query}%'))
-    ).all()
+    users = search_engine.search(User, query, fuzzy=wants_fuzzy(request.args))
 
     # Serialize the results
-    users_data = [{
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    } for user in users]
+    users_data = user_serializer.dump_rows(users)
 
     return jsonify(users_data), 200
 
@@ -65,43 +47,44 @@ def search_users():
 @search_bp.route('/all', methods=['GET'])
 def search_all():
     query = request.args.get('query', '')
-    institutions = Institution.query.filter(
-        (Institution.name.ilike(f'%{query}%')) | 
-        (Institution.location.ilike(f'%{query}%'))
-    ).all()
+    fuzzy = wants_fuzzy(request.args)
+    institutions = search_engine.search(Institution, query, fuzzy=fuzzy)
 
-    applications = Application.query.filter(
-        (Application.program.ilike(f'%{query}%'))
-    ).all()
+    applications = search_engine.search(Application, query)
 
-    users = User.query.filter(
-        (User.username.ilike(f'%{query}%')) | 
-        (User.email.ilike(f'%{query}%'))
-    ).all()
+    users = search_engine.search(User, query, fuzzy=fuzzy)
 
     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
-
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
-
-    users_data = [{
-        'id': user.id,
-        'username': user.username,
-        'email': user.email
-    } for user in users]
+    institutions_data = institution_serializer.dump_rows(institutions)
+
+    applications_data = application_serializer.dump_rows(applications)
+
+    users_data = user_serializer.dump_rows(users)
 
     return jsonify({
         'institutions': institutions_data,
         'applications': applications_data,
         'users': users_data
     }), 200
+
+# Route for suggesting institutions, locations and programs while the user types
+@search_bp.route('/suggest', methods=['GET'])
+def suggest():
+    prefix = request.args.get('q', '')
+    kind = request.args.get('type')
+    if kind and kind not in SUGGESTION_TYPES:
+        return jsonify({"msg": f"Type must be one of: {', '.join(SUGGESTION_TYPES)}"}), 400
+    try:
+        limit = int(request.args.get('limit', 10))
+    except ValueError:
+        return jsonify({"msg": "Limit must be an integer"}), 400
+    limit = max(1, min(limit, current_app.config.get('SUGGEST_MAX_LIMIT', 50)))
+
+    suggestions = suggestion_index.suggest(prefix, limit, (kind,) if kind else None)
+    if suggestions is None:
+        # The index of this worker is still being built
+        response = jsonify({"msg": "Suggestions are not available yet, please try again shortly"})
+        response.headers['Retry-After'] = '5'
+        return response, 503
+
+    return jsonify(suggestions), 200
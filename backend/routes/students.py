@@ -1,8 +1,9 @@
 #backend/routes/students.py
 #
 from flask import Blueprint, jsonify, request
-from app.models import User, Application
+from app.models import User, Application, application_serializer
 from app import db
+from app.utils.pagination import paginate
 
 # Create a Blueprint for student-related routes
 students_bp = Blueprint('students', __name__)
@@ -10,14 +11,12 @@ students_bp = Blueprint('students', __name__)
 # Route for getting a list of all applications
 @students_bp.route('/applications', methods=['GET'])
 def get_applications():
-    applications = Application.query.all()
+    try:
+        applications, next_cursor = paginate(application_serializer.query(), Application, sort_keys=('program',))
+    except ValueError as e:
+        return jsonify({"msg": str(e)}), 400
 
     # Serialize the results
-    applications_data = [{
-        'id': application.id,
-        'user_id': application.user_id,
-        'institution_id': application.institution_id,
-        'program': application.program
-    } for application in applications]
+    applications_data = application_serializer.dump_rows(applications)
 
-    return jsonify(applications_data), 200
+    return jsonify({'items': applications_data, 'next_cursor': next_cursor}), 200
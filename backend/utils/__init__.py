@@ -1,17 +1,25 @@
 # This file can be left empty to mark the 'utils' directory as a package,
 # or you can import utility functions and classes here to make them globally accessible.
 
-# Import the functions from the utils and email modules
-from .utils import hash_password, verify_password
+# The functions of the utils and email modules are re-exported lazily: both modules need
+# `app.db`, and app.py imports `app.utils.replicas` before `db` exists, so importing them
+# here would make the package import circular.
+_EXPORTS = {
+    'hash_password': 'utils',
+    'verify_password': 'utils',
+    'send_email': 'emails',
+}
 
-from .email import send_email
+
+def __getattr__(name):
+    if name not in _EXPORTS:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    from importlib import import_module
+    return getattr(import_module(f'.{_EXPORTS[name]}', __name__), name)
 
 # Now, functions from utils and email modules can be accessed directly from 'utils'.
-# For example, to hash a password, you can call 
-utils.hash_password(password)
+# For example, to hash a password, you can call
+# utils.hash_password(password)
 
 # or to send an email, you can call
-utils.send_email(subject, recipient, body)
-
-
-
+# utils.send_email(subject, recipient, body)
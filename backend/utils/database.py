@@ -31,6 +31,9 @@
 # Import the necessary modules
 from app import db
 from app.models import User, Institution, Application
+from app.utils.loading import load_profile
+from app.utils.stats import read_counters, read_totals
+from app.utils.validators import validate_application_data
 
 # Function to add a new user to the database
 def add_user(username, email, password_hash):
@@ -77,9 +80,77 @@ def add_application(user_id, institution_id, program):
         db.session.rollback()
         raise e
 
+# Function to find which of the given IDs exist, with a single IN query
+def _existing_ids(model, ids):
+    if not ids:
+        return set()
+    return {row[0] for row in db.session.query(model.id).filter(model.id.in_(ids))}
+
+# Function to check that a JSON value is an integer ID (JSON true/false are not)
+def _is_id(value):
+    return isinstance(value, int) and not isinstance(value, bool)
+
+# Function to add a batch of applications in a single transaction
+def add_applications_bulk(applications, only_user_id=None):
+    """Validates a batch of application dicts and inserts the valid ones with one flush.
+
+    Returns (created, errors), where errors lists {'index': ..., 'msg': ...} for each
+    rejected item. Institutions and users are checked with one IN query each, and the
+    valid rows are written as a single batched INSERT in one transaction. With
+    only_user_id, items for any other user are rejected.
+    """
+    errors = []
+    candidates = []
+    for index, item in enumerate(applications):
+        if not isinstance(item, dict):
+            errors.append({'index': index, 'msg': "Application must be an object"})
+            continue
+        user_id = item.get('user_id')
+        institution_id = item.get('institution_id')
+        program = item.get('program')
+        if not isinstance(program, str):
+            program = ''
+        valid, message = validate_application_data(user_id, institution_id, program)
+        if valid and not (_is_id(user_id) and _is_id(institution_id)):
+            valid, message = False, "User ID and institution ID must be integers"
+        if valid and only_user_id is not None and user_id != only_user_id:
+            valid, message = False, "Applications can only be submitted for yourself"
+        if not valid:
+            errors.append({'index': index, 'msg': message})
+            continue
+        candidates.append((index, user_id, institution_id, program.strip()))
+
+    existing_institutions = _existing_ids(Institution, {candidate[2] for candidate in candidates})
+    existing_users = _existing_ids(User, {candidate[1] for candidate in candidates})
+
+    new_applications = []
+    for index, user_id, institution_id, program in candidates:
+        if institution_id not in existing_institutions:
+            errors.append({'index': index, 'msg': "Institution not found"})
+        elif user_id not in existing_users:
+            errors.append({'index': index, 'msg': "User not found"})
+        else:
+            new_applications.append(Application(user_id=user_id, institution_id=institution_id, program=program))
+
+    if new_applications:
+        try:
+            db.session.add_all(new_applications)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            raise e
+
+    errors.sort(key=lambda error: error['index'])
+    return new_applications, errors
+
+# Function to start an Application query with the institution and user eager-loaded (their
+# __repr__ reads both)
+def _applications():
+    return Application.query.options(*load_profile('application.detail'))
+
 # Function to get all applications
 def get_all_applications():
-    return Application.query.all()
+    return _applications().all()
 
 # Function to delete an institution by ID
 def delete_institution(institution_id):
@@ -135,7 +206,7 @@ def search_institutions(query):
     ).all()
 
 def search_programs(query):
-    return Application.query.filter(
+    return _applications().filter(
         Application.program.ilike(f'%{query}%')
     ).all()
 
@@ -145,32 +216,40 @@ def search_users(query):
         (User.email.ilike(f'%{query}%'))
     ).all()
 
-# Function to get system statistics
+# Function to get system statistics (read from the materialized counters in utils/stats.py)
 def get_system_stats():
-    num_users = User.query.count()
-    num_institutions = Institution.query.count()
-    num_applications = Application.query.count()
+    totals = read_totals()
     return {
-        'num_users': num_users,
-        'num_institutions': num_institutions,
-        'num_applications': num_applications
+        'num_users': totals['users'],
+        'num_institutions': totals['institutions'],
+        'num_applications': totals['applications'],
+        'applications_by_status': read_counters('applications.status')
     }
 
+# Function to get application counts per institution ID
+def get_application_counts_by_institution():
+    return {int(institution_id): count
+            for institution_id, count in read_counters('applications.institution').items()}
+
+# Function to get application counts per program name
+def get_application_counts_by_program():
+    return read_counters('applications.program')
+
 # Function to get all applications by a user ID
 def get_applications_by_user_id(user_id):
-    return Application.query.filter_by(user_id=user_id).all()
+    return _applications().filter_by(user_id=user_id).all()
 
 # Function to get all applications by an institution ID
 def get_applications_by_institution_id(institution_id):
-    return Application.query.filter_by(institution_id=institution_id).all()
+    return _applications().filter_by(institution_id=institution_id).all()
 
 # Function to get all applications by a program name
 def get_applications_by_program(program):
-    return Application.query.filter_by(program=program).all()
+    return _applications().filter_by(program=program).all()
 
 # Function to get all applications by a user ID and program name
 def get_applications_by_user_id_and_program(user_id, program):
-    return Application.query.filter_by(user_id=user_id, program=program).all()
+    return _applications().filter_by(user_id=user_id, program=program).all()
 
 
 
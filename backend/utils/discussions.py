@@ -0,0 +1,159 @@
+#backend/utils/discussions.py
+#
+# Threaded discussion loader.
+#
+# load_thread() returns one page of a discussion's posts, each with its comments and every
+# author, using a fixed number of queries however large the page: the discussion, the page of
+# posts, the comments of those posts (WHERE post_id IN ...) and their authors (WHERE id IN ...).
+# The tree is then built in one pass over the rows. Posts are paginated oldest first with a
+# (post_date, id) keyset cursor served by ix_posts_discussion_date.
+#
+# Pages are cached in the response cache backend. Each discussion has a version counter
+# (stat_counters scope 'discussion_version') that every flush adding, changing or deleting one
+# of its posts or comments bumps in the same transaction; the version is part of the cache
+# key, so new posts are visible immediately in every worker.
+
+import itertools
+import json
+from datetime import datetime
+
+from sqlalchemy import and_, event, or_
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Comment, Discussion, Post, StatCounter, User
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.replicas import on_primary
+from app.utils.response_cache import response_cache
+from app.utils.stats import bump_counters
+
+# stat_counters scope holding the discussion versions
+VERSION_SCOPE = 'discussion_version'
+
+
+# Function to read the version of a discussion's cached pages
+def discussion_version(discussion_id):
+    value = (db.session.query(StatCounter.value)
+             .filter(StatCounter.scope == VERSION_SCOPE, StatCounter.bucket == str(discussion_id))
+             .scalar())
+    return value or 0
+
+# Function to decode a thread cursor into (post_date, post id)
+def _decode_thread_cursor(cursor):
+    sort, values = decode_cursor(cursor)
+    if sort != 'post_date' or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(values[0]), int(values[1])
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+# Function to format an optional datetime for JSON
+def _iso(value):
+    return value.isoformat() if value else None
+
+# Function to build a page of a discussion thread from the database
+def build_thread(discussion_id, cursor=None, limit=20):
+    """Returns the thread page as a dict, or None if the discussion does not exist."""
+    discussion = (db.session.query(Discussion.id, Discussion.course_id, Discussion.title,
+                                   Discussion.description, Discussion.start_date)
+                  .filter(Discussion.id == discussion_id)
+                  .first())
+    if discussion is None:
+        return None
+
+    query = (db.session.query(Post.id, Post.user_id, Post.content, Post.post_date)
+             .filter(Post.discussion_id == discussion_id))
+    if cursor:
+        post_date, post_id = _decode_thread_cursor(cursor)
+        query = query.filter(or_(Post.post_date > post_date,
+                                 and_(Post.post_date == post_date, Post.id > post_id)))
+    posts = query.order_by(Post.post_date, Post.id).limit(limit + 1).all()
+    next_cursor = None
+    if len(posts) > limit:
+        posts = posts[:limit]
+        last = posts[-1]
+        next_cursor = encode_cursor('post_date', [_iso(last.post_date), last.id])
+
+    nodes = {}
+    author_ids = set()
+    for post in posts:
+        nodes[post.id] = {'id': post.id, 'user_id': post.user_id, 'content': post.content,
+                          'post_date': _iso(post.post_date), 'comments': []}
+        author_ids.add(post.user_id)
+
+    if nodes:
+        comments = (db.session.query(Comment.id, Comment.post_id, Comment.user_id,
+                                     Comment.content, Comment.comment_date)
+                    .filter(Comment.post_id.in_(list(nodes)))
+                    .order_by(Comment.comment_date, Comment.id))
+        for comment in comments:
+            nodes[comment.post_id]['comments'].append({
+                'id': comment.id, 'user_id': comment.user_id, 'content': comment.content,
+                'comment_date': _iso(comment.comment_date),
+            })
+            author_ids.add(comment.user_id)
+
+    authors = {}
+    if author_ids:
+        rows = db.session.query(User.id, User.username).filter(User.id.in_(author_ids))
+        authors = {str(user_id): {'id': user_id, 'username': username} for user_id, username in rows}
+
+    return {
+        'id': discussion.id,
+        'course_id': discussion.course_id,
+        'title': discussion.title,
+        'description': discussion.description,
+        'start_date': _iso(discussion.start_date),
+        'posts': list(nodes.values()),
+        'authors': authors,
+        'next_cursor': next_cursor,
+    }
+
+# Function to get a page of a discussion thread as JSON, from the cache when possible
+def load_thread(discussion_id, cursor=None, limit=20):
+    """Returns the thread page as JSON bytes, or None if the discussion does not exist."""
+    if cursor:
+        _decode_thread_cursor(cursor)  # Reject bad cursors before they reach the cache
+    # Read on the primary so a lagging replica cannot be cached under the new version
+    with on_primary():
+        version = discussion_version(discussion_id)
+        key = f'discussion:{discussion_id}:{version}:{limit}:{cursor or ""}'
+        cached = response_cache.backend.get(key)
+        if cached is not None:
+            return cached
+        thread = build_thread(discussion_id, cursor, limit)
+    if thread is None:
+        return None
+    body = json.dumps(thread, separators=(',', ':')).encode()
+    response_cache.backend.set(key, body, response_cache.ttl)
+    return body
+
+
+# Session hook: bump the version of every discussion whose posts or comments a flush changed
+def _on_flush(session, flush_context):
+    discussion_ids = set()
+    post_ids = set()
+    changed = itertools.chain(session.new, session.deleted,
+                              (obj for obj in session.dirty if session.is_modified(obj)))
+    for obj in changed:
+        if isinstance(obj, Post):
+            discussion_ids.add(obj.discussion_id)
+        elif isinstance(obj, Comment):
+            post_ids.add(obj.post_id)
+    post_ids.discard(None)
+    if post_ids:
+        rows = session.connection().execute(
+            Post.__table__.select().with_only_columns(Post.__table__.c.discussion_id)
+            .where(Post.__table__.c.id.in_(post_ids))
+        )
+        discussion_ids.update(row[0] for row in rows)
+    discussion_ids.discard(None)
+    if discussion_ids:
+        bump_counters(session.connection(),
+                      {(VERSION_SCOPE, str(discussion_id)): 1 for discussion_id in discussion_ids})
+
+# Function to register the version hook
+def init_discussion_cache(app):
+    if not event.contains(Session, 'after_flush', _on_flush):
+        event.listen(Session, 'after_flush', _on_flush)
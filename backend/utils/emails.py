@@ -1,21 +1,7 @@
-from flask_mail import Message
-from app import mail
+from app.utils.outbox import enqueue_email
 
+# Emails are queued in the outbox table and delivered by the `flask email-worker`
+# processes, so sending never waits on the SMTP server. The email is added to the caller's
+# session and is only queued when the caller commits.
 def send_email(subject, recipient, body):
-    msg = Message(subject, recipients=[recipient])
-    msg.body = body
-    mail.send(msg)
-# Compare this snippet from backend/app/utils/utils.py:
-# #backend/app/utils/utils.py
-#
-from werkzeug.security import generate_password_hash, check_password_hash
-
-def hash_password(password):
-    return generate_password_hash(password)
-
-def verify_password(stored_hash, password):
-    return check_password_hash(stored_hash, password)
-# Compare this snippet from backend/app/models.py:
-from app import db
-from datetime import datetime
-
+    return enqueue_email(subject, recipient, body)
@@ -0,0 +1,58 @@
+#backend/utils/export.py
+#
+# Streaming exports of full table listings as NDJSON or CSV.
+#
+# Rows are read through a server-side cursor in batches of EXPORT_BATCH_SIZE (column tuples
+# only, no ORM entities) and written out by a generator, so worker memory stays constant
+# no matter how many rows are exported.
+
+import csv
+import io
+import json
+
+from flask import Response, current_app, stream_with_context
+
+EXPORT_FORMATS = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+# Function to check whether a request asked for a streamed export
+def wants_stream(args):
+    return args.get('stream', '').lower() in ('1', 'true', 'yes')
+
+# Function to generate NDJSON lines from row tuples
+def _ndjson_lines(rows, fields):
+    for row in rows:
+        yield json.dumps(dict(zip(fields, row)), default=str) + '\n'
+
+# Function to generate CSV chunks from row tuples, one chunk per row
+def _csv_lines(rows, fields):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(fields)
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# Function to build a streamed export response for the columns of a model serializer
+def export_response(serializer, fmt, filename):
+    """Streams every row of the serializer's model as NDJSON or CSV (raises ValueError on unknown format)."""
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+
+    batch_size = current_app.config.get('EXPORT_BATCH_SIZE', 1000)
+    rows = serializer.query().order_by(serializer.model.id).yield_per(batch_size)
+    fields = serializer.fields
+    lines = _ndjson_lines(rows, fields) if fmt == 'ndjson' else _csv_lines(rows, fields)
+
+    return Response(
+        stream_with_context(lines),
+        mimetype=EXPORT_FORMATS[fmt],
+        headers={'Content-Disposition': f'attachment; filename={filename}.{fmt}'},
+    )
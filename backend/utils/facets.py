@@ -0,0 +1,112 @@
+#backend/utils/facets.py
+#
+# Faceted filtering of applications by status, institution, program and date.
+#
+# parse_application_filters() turns request arguments into SQL conditions, and facet_counts()
+# returns, for the filtered applications, the number of applications per status, institution,
+# program and day in a single query: GROUP BY GROUPING SETS on PostgreSQL, and a UNION ALL of
+# one GROUP BY per facet elsewhere (SQLite has no grouping sets). The composite indexes on
+# applications (see models.py and the migration) lead with the filtered columns so both the
+# page and the counts can be answered from index ranges.
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import String, cast, func, literal, select, tuple_, union_all
+
+from app import db
+from app.models import Application
+
+# Facet name -> grouped expression
+FACETS = {
+    'status': Application.status,
+    'institution_id': Application.institution_id,
+    'program': Application.program,
+    'application_date': func.date(Application.application_date),
+}
+
+
+# Function to parse a date argument in ISO format
+def _parse_date(name, value):
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"{name} must be an ISO date, e.g. 2024-05-01")
+
+# Function to parse a list of integer arguments
+def _parse_ints(name, values):
+    try:
+        return [int(value) for value in values]
+    except ValueError:
+        raise ValueError(f"{name} must be an integer")
+
+# Function to build the SQL conditions of the application filters in the request arguments
+def parse_application_filters(args):
+    """Returns a list of conditions (raises ValueError on bad input).
+
+    Supports repeated status, institution_id and program arguments, user_id, a program
+    substring `query`, `since`/`until` ISO dates and `days` (the last N days).
+    """
+    conditions = []
+    statuses = args.getlist('status')
+    if statuses:
+        conditions.append(Application.status.in_(statuses))
+    institution_ids = _parse_ints('institution_id', args.getlist('institution_id'))
+    if institution_ids:
+        conditions.append(Application.institution_id.in_(institution_ids))
+    programs = args.getlist('program')
+    if programs:
+        conditions.append(Application.program.in_(programs))
+    if args.get('user_id'):
+        conditions.append(Application.user_id == _parse_ints('user_id', [args['user_id']])[0])
+    if args.get('query'):
+        escaped = args['query'].replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        conditions.append(Application.program.ilike(f'%{escaped}%', escape='\\'))
+
+    if args.get('days'):
+        days = _parse_ints('days', [args['days']])[0]
+        conditions.append(Application.application_date >= datetime.utcnow() - timedelta(days=days))
+    if args.get('since'):
+        conditions.append(Application.application_date >= _parse_date('since', args['since']))
+    if args.get('until'):
+        conditions.append(Application.application_date < _parse_date('until', args['until']))
+    return conditions
+
+# Function to count the filtered applications per facet value with GROUPING SETS
+def _grouping_sets_counts(conditions):
+    columns = [expression.label(name) for name, expression in FACETS.items()]
+    flags = [func.grouping(expression).label(f'{name}_grouped') for name, expression in FACETS.items()]
+    stmt = (select(*columns, *flags, func.count().label('total'))
+            .where(*conditions)
+            .group_by(func.grouping_sets(*[tuple_(expression) for expression in FACETS.values()])))
+    for row in db.session.execute(stmt):
+        for name in FACETS:
+            # grouping() is 0 for the column the row is grouped by
+            if getattr(row, f'{name}_grouped') == 0:
+                yield name, getattr(row, name), row.total
+                break
+
+# Function to count the filtered applications per facet value with UNION ALL
+def _union_counts(conditions):
+    stmt = union_all(*[
+        select(literal(name).label('facet'), cast(expression, String).label('value'), func.count().label('total'))
+        .where(*conditions)
+        .group_by(expression)
+        for name, expression in FACETS.items()
+    ])
+    for row in db.session.execute(stmt):
+        yield row.facet, row.value, row.total
+
+# Function to compute the facet counts of the applications matching the conditions
+def facet_counts(conditions):
+    """Returns {facet: {value: count}}, each facet ordered by descending count."""
+    if db.engine.dialect.name == 'postgresql':
+        rows = _grouping_sets_counts(conditions)
+    else:
+        rows = _union_counts(conditions)
+
+    facets = {name: [] for name in FACETS}
+    for name, value, count in rows:
+        if value is not None:
+            facets[name].append((str(value), count))
+    return {name: dict(sorted(values, key=lambda item: (-item[1], item[0])))
+            for name, values in facets.items()}
@@ -0,0 +1,223 @@
+#backend/utils/fuzzy.py
+#
+# Typo-tolerant lookup of users and institutions (?fuzzy=1 on the search endpoints).
+#
+# A SymSpell-style deletion index maps every string obtainable by deleting up to
+# FUZZY_MAX_DISTANCE characters from the first FUZZY_PREFIX_LENGTH characters of a term to
+# the terms it came from. A query generates its own deletes the same way, so candidate terms
+# are found with dictionary lookups instead of a scan, and are then verified with the
+# Damerau-Levenshtein (optimal string alignment) distance. Limiting deletes to the prefix
+# bounds the index at C(prefix, <=distance) entries per term regardless of term length.
+#
+# The index lives in each worker process. It is built by one background thread on the first
+# fuzzy lookup and kept in sync with committed writes through session hooks (see
+# utils/live_index.py). Writes that bypass this process's session hooks (other workers, bulk
+# SQL) show up after the full rebuild started every FUZZY_REBUILD_INTERVAL seconds, which
+# runs in the background while the previous index keeps serving. Lookups wait at most
+# FUZZY_INDEX_WAIT seconds for the first build and otherwise return None, so the caller
+# answers with plain substring matches meanwhile.
+# Memory: with the default distance 2 and prefix 7, about 27 delete entries per term,
+# measured at ~4.2 KB per term on CPython 3.11 (a user has two terms, username and email).
+# Each model's index holds at most FUZZY_MAX_TERMS distinct terms (~0.2 GiB per worker at
+# the default 50k, twice that while a rebuild runs); a model with more terms is not indexed
+# at all and its fuzzy lookups return None, i.e. fall back to substring matches, which the
+# pg_trgm backend serves from the database. Building takes about 7 s per 100k terms.
+
+import heapq
+import time
+from collections import defaultdict
+
+from app import db
+from app.models import User, Institution, SERIALIZERS
+from app.utils.live_index import LiveIndex
+
+# Columns matched fuzzily for each model
+FUZZY_FIELDS = {
+    User: ('username', 'email'),
+    Institution: ('name',),
+}
+
+
+# Function to compute the optimal string alignment distance, giving up beyond max_distance
+def edit_distance(a, b, max_distance):
+    """Returns the Damerau-Levenshtein (OSA) distance, or max_distance + 1 if it is larger."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous2 = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if previous2 is not None and i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, previous2[j - 2] + 1)
+            current[j] = value
+            row_min = min(row_min, value)
+        if row_min > max_distance:
+            return max_distance + 1
+        previous2, previous = previous, current
+    return min(previous[-1], max_distance + 1)
+
+# Function to list every string obtained by deleting up to max_distance characters
+def deletes(term, max_distance):
+    results = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {word[:i] + word[i + 1:] for word in frontier for i in range(len(word))}
+        results |= frontier
+    return results
+
+
+class DeletionIndex:
+    """SymSpell-style index from prefix deletes to terms, and from terms to row ids.
+
+    Once adding a row would exceed `max_terms` distinct terms, the index empties itself and
+    is marked full; a full index ignores further writes and must not be searched.
+    """
+
+    def __init__(self, max_distance=2, prefix_length=7, max_terms=None):
+        self.max_distance = max_distance
+        self.prefix_length = prefix_length
+        self.max_terms = max_terms
+        self.full = False
+        self.deletes = defaultdict(set)    # delete -> terms
+        self.term_rows = defaultdict(set)  # term -> row ids
+        self.rows = {}                     # row id -> terms
+
+    def add(self, row_id, values):
+        if self.full:
+            return
+        self.remove(row_id)
+        terms = {value.lower() for value in values if value}
+        if self.max_terms is not None:
+            new_terms = sum(1 for term in terms if term not in self.term_rows)
+            if len(self.term_rows) + new_terms > self.max_terms:
+                self.full = True
+                self.deletes, self.term_rows, self.rows = defaultdict(set), defaultdict(set), {}
+                return
+        self.rows[row_id] = terms
+        for term in terms:
+            if term not in self.term_rows:
+                for delete in deletes(term[:self.prefix_length], self.max_distance):
+                    self.deletes[delete].add(term)
+            self.term_rows[term].add(row_id)
+
+    def remove(self, row_id):
+        for term in self.rows.pop(row_id, ()):
+            row_ids = self.term_rows.get(term)
+            if row_ids is None:
+                continue
+            row_ids.discard(row_id)
+            if row_ids:
+                continue
+            del self.term_rows[term]
+            for delete in deletes(term[:self.prefix_length], self.max_distance):
+                terms = self.deletes.get(delete)
+                if terms is not None:
+                    terms.discard(term)
+                    if not terms:
+                        del self.deletes[delete]
+
+    def search(self, query, limit, max_distance=None):
+        """Returns up to `limit` (distance, row id), closest first."""
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+        needle = query.lower()
+        if not needle:
+            return []
+        candidates = set()
+        for delete in deletes(needle[:self.prefix_length], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        best = {}
+        for term in candidates:
+            distance = edit_distance(needle, term, max_distance)
+            if distance > max_distance:
+                continue
+            for row_id in self.term_rows[term]:
+                if distance < best.get(row_id, max_distance + 1):
+                    best[row_id] = distance
+        return heapq.nsmallest(limit, ((distance, row_id) for row_id, distance in best.items()))
+
+
+class FuzzyIndex(LiveIndex):
+    """Per-process deletion indexes for FUZZY_FIELDS, kept in sync with committed writes."""
+
+    name = 'fuzzy'
+    changes_key = 'fuzzy_index_changes'
+
+    def __init__(self):
+        super().__init__()
+        self.max_distance = 2
+        self.prefix_length = 7
+        self.max_terms = 50000
+        self.wait = 5
+        self.rebuild_interval = 300
+
+    def init_app(self, app):
+        self.app = app
+        self.max_distance = app.config.get('FUZZY_MAX_DISTANCE', self.max_distance)
+        self.prefix_length = app.config.get('FUZZY_PREFIX_LENGTH', self.prefix_length)
+        self.max_terms = app.config.get('FUZZY_MAX_TERMS', self.max_terms)
+        self.wait = app.config.get('FUZZY_INDEX_WAIT', self.wait)
+        self.rebuild_interval = app.config.get('FUZZY_REBUILD_INTERVAL', self.rebuild_interval)
+        app.extensions['fuzzy_index'] = self
+        self.listen()
+
+    def load(self):
+        indexes = {}
+        for model, fields in FUZZY_FIELDS.items():
+            index = DeletionIndex(self.max_distance, self.prefix_length, self.max_terms)
+            columns = [getattr(model, field) for field in fields]
+            for row in db.session.query(model.id, *columns).yield_per(1000):
+                index.add(row[0], row[1:])
+                if index.full:
+                    self.app.logger.warning(f"More than {self.max_terms} {model.__tablename__} terms; "
+                                            f"fuzzy lookups of them fall back to substring matches")
+                    break
+            indexes[model] = index
+        return indexes
+
+    def apply(self, indexes, changes):
+        for model, row_id, values in changes:
+            if values is None:
+                indexes[model].remove(row_id)
+            else:
+                indexes[model].add(row_id, values)
+
+    def search(self, model, query, limit):
+        """Returns serializer row tuples of the closest matches, smallest edit distance first.
+
+        Returns None while the index is still being built, or if the model has more terms
+        than FUZZY_MAX_TERMS.
+        """
+        indexes = self.current(timeout=self.wait)
+        if indexes is None:
+            return None
+        if time.monotonic() - self.built_at > self.rebuild_interval:
+            self.refresh()  # Catches up with writes made by other processes
+        with self.lock:
+            if indexes[model].full:
+                return None
+            matches = indexes[model].search(query, limit)
+        if not matches:
+            return []
+        ids = [row_id for _, row_id in matches]
+        rows = {row.id: row for row in SERIALIZERS[model].query().filter(model.id.in_(ids))}
+        return [rows[row_id] for row_id in ids if row_id in rows]
+
+    def _record_changes(self, session, flush_context):
+        changes = session.info.setdefault(self.changes_key, [])
+        for obj in session.new | session.dirty:
+            fields = FUZZY_FIELDS.get(type(obj))
+            if fields:
+                changes.append((type(obj), obj.id, tuple(getattr(obj, f) for f in fields)))
+        for obj in session.deleted:
+            if type(obj) in FUZZY_FIELDS:
+                changes.append((type(obj), obj.id, None))
+
+
+fuzzy_index = FuzzyIndex()
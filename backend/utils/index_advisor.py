@@ -0,0 +1,240 @@
+#backend/utils/index_advisor.py
+#
+# Query pattern log and index advisor.
+#
+# With QUERY_PATTERN_LOG_DIR set, every SELECT/UPDATE/DELETE the app executes is reduced to
+# an access pattern per table: the columns compared for equality (=, IN), the first column
+# compared by range (<, >, BETWEEN, LIKE) and the ORDER BY columns. Each process aggregates
+# count and time per pattern and writes them to patterns-<pid>.json in that directory at most
+# every QUERY_PATTERN_FLUSH_INTERVAL seconds. `flask index-advisor` merges the files,
+# compares the patterns with the indexes in the database and prints a CREATE INDEX for
+# every frequent pattern no existing index serves (equality columns first, then the range
+# or sort column).
+#
+# explain() and uses_index() return and check query plans, for before/after checks when
+# adding indexes.
+
+import atexit
+import glob
+import json
+import os
+import threading
+import time
+import weakref
+
+import click
+from sqlalchemy import Column, event, inspect, text
+from sqlalchemy.engine import Engine
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, UnaryExpression
+
+from app import db
+
+EQUALITY_OPERATORS = {operators.eq, operators.in_op, operators.is_}
+RANGE_OPERATORS = {operators.lt, operators.le, operators.gt, operators.ge, operators.between_op,
+                   operators.like_op, operators.ilike_op}
+
+
+# Function to get the table column behind an expression, if any
+def _table_column(expression):
+    while isinstance(expression, UnaryExpression):
+        expression = expression.element
+    expression = getattr(expression, 'element', expression)  # Labels
+    if isinstance(expression, Column) and expression.table is not None and hasattr(expression.table, 'name'):
+        return expression
+    return None
+
+# Function to reduce a statement to {table: (equality columns, range columns, order columns)}
+def extract_patterns(statement):
+    where = getattr(statement, 'whereclause', None)
+    patterns = {}
+
+    def pattern(column):
+        return patterns.setdefault(column.table.name, (set(), [], []))
+
+    if where is not None:
+        for element in visitors.iterate(where):
+            if not isinstance(element, BinaryExpression):
+                continue
+            left, right = _table_column(element.left), _table_column(element.right)
+            if left is None or right is not None:
+                continue  # Not a column compared with a value (joins are handled by FKs)
+            if element.operator in EQUALITY_OPERATORS:
+                pattern(left)[0].add(left.name)
+            elif element.operator in RANGE_OPERATORS:
+                ranges = pattern(left)[1]
+                if left.name not in ranges:
+                    ranges.append(left.name)
+
+    for clause in getattr(statement, '_order_by_clauses', ()):
+        column = _table_column(clause)
+        if column is not None:
+            order = pattern(column)[2]
+            if column.name not in order:
+                order.append(column.name)
+
+    return [(table, tuple(sorted(equal)), tuple(ranges), tuple(order))
+            for table, (equal, ranges, order) in patterns.items()]
+
+
+class QueryPatternLog:
+    """Flask extension recording per-process query patterns and registering the advisor command."""
+
+    def __init__(self, app=None):
+        self.directory = None
+        self.flush_interval = 60
+        self.patterns = {}  # (table, equality, range, order) -> [count, seconds]
+        self.cache = weakref.WeakKeyDictionary()  # compiled statement -> patterns
+        self.lock = threading.Lock()
+        self.next_flush = 0.0
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['query_patterns'] = self
+
+        @app.cli.command('index-advisor')
+        @click.option('--min-count', default=10, help='Ignore patterns executed fewer times.')
+        def index_advisor_command(min_count):
+            """Suggest indexes for the query patterns logged in QUERY_PATTERN_LOG_DIR."""
+            directory = app.config.get('QUERY_PATTERN_LOG_DIR')
+            if not directory:
+                raise click.UsageError('QUERY_PATTERN_LOG_DIR is not set')
+            suggestions = advise(load_patterns(directory), min_count)
+            for suggestion in suggestions:
+                print(f"-- {suggestion['count']} executions, {suggestion['seconds']:.2f}s total")
+                print(suggestion['sql'])
+            print(f"{len(suggestions)} index suggestion(s).")
+
+        self.directory = app.config.get('QUERY_PATTERN_LOG_DIR')
+        if not self.directory:
+            return
+        self.flush_interval = app.config.get('QUERY_PATTERN_FLUSH_INTERVAL', self.flush_interval)
+        os.makedirs(self.directory, exist_ok=True)
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+            atexit.register(self.flush)
+
+    def _patterns_of(self, context):
+        compiled = getattr(context, 'compiled', None)
+        if compiled is None:
+            return ()
+        try:
+            return self.cache[compiled]
+        except KeyError:
+            patterns = self.cache[compiled] = extract_patterns(compiled.statement)
+            return patterns
+        except TypeError:
+            return extract_patterns(compiled.statement)
+
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('pattern_starts', []).append((time.perf_counter(), self._patterns_of(context)))
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        start, patterns = conn.info['pattern_starts'].pop()
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            for pattern in patterns:
+                stats = self.patterns.setdefault(pattern, [0, 0.0])
+                stats[0] += 1
+                stats[1] += elapsed
+        if time.monotonic() >= self.next_flush:
+            self.flush()
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its entry
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('pattern_starts'):
+            connection.info['pattern_starts'].pop()
+
+    def flush(self):
+        """Writes this process's aggregated patterns to the log directory."""
+        if not self.directory:
+            return
+        with self.lock:
+            self.next_flush = time.monotonic() + self.flush_interval
+            rows = [{'table': table, 'equality': list(equal), 'range': list(ranges), 'order': list(order),
+                     'count': count, 'seconds': seconds}
+                    for (table, equal, ranges, order), (count, seconds) in self.patterns.items()]
+        path = os.path.join(self.directory, f'patterns-{os.getpid()}.json')
+        with open(path + '.tmp', 'w') as f:
+            json.dump(rows, f)
+        os.replace(path + '.tmp', path)
+
+
+# Function to merge the pattern files of all processes
+def load_patterns(directory):
+    merged = {}
+    for path in glob.glob(os.path.join(directory, 'patterns-*.json')):
+        with open(path) as f:
+            for row in json.load(f):
+                key = (row['table'], tuple(row['equality']), tuple(row['range']), tuple(row['order']))
+                stats = merged.setdefault(key, [0, 0.0])
+                stats[0] += row['count']
+                stats[1] += row['seconds']
+    return merged
+
+# Function to list the column lists of the indexes (including keys) of a table
+def _existing_indexes(inspector, table):
+    indexes = [index['column_names'] for index in inspector.get_indexes(table)]
+    indexes += [constraint['column_names'] for constraint in inspector.get_unique_constraints(table)]
+    primary_key = inspector.get_pk_constraint(table).get('constrained_columns')
+    if primary_key:
+        indexes.append(primary_key)
+    return indexes
+
+# Function to check whether an index serves an equality set followed by a range/sort column
+def _serves(index_columns, equal, tail):
+    if len(index_columns) < len(equal) + (1 if tail else 0):
+        return False
+    if set(index_columns[:len(equal)]) != set(equal):
+        return False
+    return not tail or index_columns[len(equal)] == tail
+
+# Function to suggest indexes for patterns that no existing index serves
+def advise(patterns, min_count=10):
+    """Returns suggestions ({table, columns, sql, count, seconds}), most expensive first."""
+    inspector = inspect(db.engine)
+    tables = set(inspector.get_table_names())
+    existing = {}
+    suggestions = {}
+    for (table, equal, ranges, order), (count, seconds) in patterns.items():
+        if count < min_count or table not in tables:
+            continue
+        tail = ranges[0] if ranges else next((column for column in order if column not in equal), None)
+        if not equal and not tail:
+            continue
+        if table not in existing:
+            existing[table] = _existing_indexes(inspector, table)
+        if any(_serves(index, equal, tail) for index in existing[table]):
+            continue
+        columns = tuple(equal) + ((tail,) if tail else ())
+        suggestion = suggestions.setdefault((table, columns), {
+            'table': table,
+            'columns': list(columns),
+            'sql': f"CREATE INDEX ix_{table}_{'_'.join(columns)} ON {table} ({', '.join(columns)});",
+            'count': 0,
+            'seconds': 0.0,
+        })
+        suggestion['count'] += count
+        suggestion['seconds'] += seconds
+    return sorted(suggestions.values(), key=lambda suggestion: -suggestion['seconds'])
+
+# Function to get the database's query plan for an ORM query or statement
+def explain(query):
+    """Returns the query plan as a list of lines."""
+    statement = getattr(query, 'statement', query)
+    dialect = db.engine.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    prefix = 'EXPLAIN QUERY PLAN ' if dialect.name == 'sqlite' else 'EXPLAIN '
+    rows = db.session.execute(text(prefix + sql)).fetchall()
+    return [' '.join(str(value) for value in row) for row in rows]
+
+# Function to check whether the plan of a query uses an index
+def uses_index(query, index_name):
+    return any(index_name in line for line in explain(query))
+
+
+query_patterns = QueryPatternLog()
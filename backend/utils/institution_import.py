@@ -0,0 +1,203 @@
+#backend/utils/institution_import.py
+#
+# Bulk import of institutions from CSV, JSON (an array of objects) or NDJSON files.
+#
+# Input is parsed incrementally, so files of any size are imported with bounded memory.
+# Rows are validated with validate_institution_data and upserted on the unique `name`
+# column in chunks: each chunk costs one lookup of the existing names (to count created
+# versus updated rows) and one multi-row INSERT ... ON CONFLICT DO UPDATE, committed
+# together. If the input turns out to be malformed (or a chunk fails) partway through, the
+# chunks already committed stay, the search and suggestion indexes are still invalidated,
+# and ImportAborted carries the partial report.
+
+import codecs
+import csv
+import io
+import json
+import time
+
+from sqlalchemy import bindparam
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app import db
+from app.models import Institution
+from app.utils.response_cache import bump_table_versions
+from app.utils.search import search_engine
+from app.utils.suggest import suggestion_index
+from app.utils.stats import bump_counters
+from app.utils.validators import validate_institution_data
+
+IMPORT_FORMATS = ('csv', 'json', 'ndjson')
+INSTITUTION_FIELDS = ('name', 'location', 'description', 'website')
+
+# Maximum number of row errors included in an import report
+MAX_REPORTED_ERRORS = 100
+
+# Errors meaning the input itself is malformed (JSONDecodeError and UnicodeDecodeError are ValueErrors)
+PARSE_ERRORS = (ValueError, csv.Error)
+
+
+class ImportAborted(Exception):
+    """Raised by import_institutions() when it stops early; `report` covers the committed chunks."""
+
+    def __init__(self, message, report, parse_error):
+        super().__init__(message)
+        self.report = report
+        self.parse_error = parse_error
+
+
+# Function to parse CSV rows from a binary stream
+def _iter_csv(stream):
+    yield from csv.DictReader(io.TextIOWrapper(stream, encoding='utf-8', newline=''))
+
+# Function to parse NDJSON rows from a binary stream
+def _iter_ndjson(stream):
+    for line in io.TextIOWrapper(stream, encoding='utf-8'):
+        if line.strip():
+            yield json.loads(line)
+
+# Function to parse the objects of a top-level JSON array without loading the whole file
+def _iter_json_array(stream, read_size=65536):
+    decoder = json.JSONDecoder()
+    reader = codecs.getincrementaldecoder('utf-8')()
+    buffer = ''
+    position = 0
+    started = False
+    while True:
+        chunk = stream.read(read_size)
+        buffer = buffer[position:] + reader.decode(chunk or b'', final=not chunk)
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in ' \t\r\n,':
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != '[':
+                    raise ValueError("JSON input must be an array of objects")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == ']':
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                if not chunk:
+                    raise
+                break  # The object continues in the next chunk
+            yield item
+        if not chunk:
+            raise ValueError("Unexpected end of JSON input")
+
+# Function to parse institution rows from a binary stream in the given format
+def iter_institution_rows(stream, fmt):
+    if fmt == 'csv':
+        return _iter_csv(stream)
+    if fmt == 'ndjson':
+        return _iter_ndjson(stream)
+    if fmt == 'json':
+        return _iter_json_array(stream)
+    raise ValueError(f"Unsupported import format: {fmt}")
+
+# Function to validate and normalize one raw row
+def _clean_row(raw):
+    if not isinstance(raw, dict):
+        return None, "Row must be an object"
+    row = {field: raw.get(field) for field in INSTITUTION_FIELDS}
+    for field in INSTITUTION_FIELDS:
+        row[field] = '' if row[field] is None else str(row[field]).strip()
+    valid, message = validate_institution_data(row['name'], row['location'], row['description'])
+    if not valid:
+        return None, message
+    row['website'] = row['website'] or None
+    return row, None
+
+# Function to upsert one chunk of rows keyed on the institution name
+def _upsert_chunk(connection, rows, existing):
+    table = Institution.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        # SQLite also uses ON CONFLICT DO UPDATE: INSERT OR REPLACE would delete the old row
+        # and assign a new id, orphaning its applications and courses.
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.name],
+            set_={field: stmt.excluded[field] for field in INSTITUTION_FIELDS if field != 'name'},
+        )
+        connection.execute(stmt, rows)
+        return
+
+    updates = [dict(row, match_name=row['name']) for row in rows if row['name'] in existing]
+    inserts = [row for row in rows if row['name'] not in existing]
+    if updates:
+        connection.execute(
+            table.update().where(table.c.name == bindparam('match_name')),
+            updates,
+        )
+    if inserts:
+        connection.execute(table.insert(), inserts)
+
+# Function to write one chunk in its own transaction; returns (created, updated)
+def _write_chunk(chunk):
+    rows = list(chunk.values())
+    names = list(chunk)
+    existing = {name for (name,) in db.session.query(Institution.name).filter(Institution.name.in_(names))}
+    try:
+        connection = db.session.connection()
+        _upsert_chunk(connection, rows, existing)
+        created = len(rows) - len(existing)
+        if created:
+            bump_counters(connection, {('institutions', ''): created})
+        bump_table_versions(db.session, [Institution.__tablename__])
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+    return created, len(existing)
+
+# Function to import institutions from an iterable of raw rows
+def import_institutions(raw_rows, chunk_size=500):
+    """Validates and upserts institutions chunk by chunk; returns an import report."""
+    report = {'processed': 0, 'created': 0, 'updated': 0, 'rejected': 0, 'errors': []}
+    start = time.perf_counter()
+    chunk = {}
+
+    def flush():
+        created, updated = _write_chunk(chunk)
+        report['created'] += created
+        report['updated'] += updated
+        chunk.clear()
+
+    try:
+        for number, raw in enumerate(raw_rows, start=1):
+            report['processed'] += 1
+            row, error = _clean_row(raw)
+            if error:
+                report['rejected'] += 1
+                if len(report['errors']) < MAX_REPORTED_ERRORS:
+                    report['errors'].append({'row': number, 'msg': error})
+                continue
+            # A name repeated within a chunk keeps its last row; ON CONFLICT cannot
+            # touch the same row twice in one statement.
+            chunk.pop(row['name'], None)
+            chunk[row['name']] = row
+            if len(chunk) >= chunk_size:
+                flush()
+        if chunk:
+            flush()
+    except Exception as e:
+        parse_error = isinstance(e, PARSE_ERRORS)
+        message = f"Could not parse the import file: {e}" if parse_error else "The import stopped early"
+        raise ImportAborted(message, report, parse_error) from e
+    finally:
+        # Earlier chunks are committed even when a later one fails
+        if report['created'] or report['updated']:
+            search_engine.invalidate()
+            suggestion_index.invalidate()
+
+        elapsed = time.perf_counter() - start
+        report['seconds'] = round(elapsed, 3)
+        report['rows_per_sec'] = round(report['processed'] / elapsed, 1) if elapsed else None
+    return report
@@ -0,0 +1,160 @@
+#backend/utils/live_index.py
+#
+# Base class of the per-process indexes (trigram search, fuzzy lookup, typeahead).
+#
+# Each index is read from the database once and then kept in sync with committed writes:
+# session hooks stage the changes of a flush and apply them after the commit. Builds run in
+# one background thread per process (single-flight); while a build reads its snapshot, the
+# changes committed meanwhile are logged and replayed onto the new state before it replaces
+# the old one, so no write is lost between the snapshot and the swap. Each logged batch is
+# stamped when its commit returns, and batches stamped before the build started reading are
+# not replayed: the snapshot already contains them, and replaying non-idempotent changes
+# (popularity counts) would apply them twice. invalidate() drops the state after bulk
+# writes that bypass the session; a build already running starts over.
+
+import os
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+
+
+class LiveIndex:
+    """Per-process index state built in the background and kept in sync with committed writes."""
+
+    name = 'index'
+    changes_key = None  # session.info key of the changes staged at flush time
+
+    def __init__(self):
+        self.app = None
+        self.state = None
+        self.built_at = 0.0
+        self._reset_after_fork()
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # A build thread of the parent does not exist in the child; the state is still valid
+        self.lock = threading.Lock()
+        self.ready = threading.Condition(self.lock)
+        self.building = False
+        self.replay = None   # (commit time, changes) batches committed while a build runs
+        self.generation = 0  # bumped by invalidate()
+        self.builds = 0      # finished build attempts
+
+    def listen(self):
+        if not event.contains(Session, 'after_flush', self._record_changes):
+            event.listen(Session, 'after_flush', self._record_changes)
+            event.listen(Session, 'after_commit', self._apply_changes)
+            event.listen(Session, 'after_soft_rollback', self._discard_changes)
+
+    def unlisten(self):
+        # Detaches a replaced index: every index of a class stages its changes under one key
+        if event.contains(Session, 'after_flush', self._record_changes):
+            event.remove(Session, 'after_flush', self._record_changes)
+            event.remove(Session, 'after_commit', self._apply_changes)
+            event.remove(Session, 'after_soft_rollback', self._discard_changes)
+
+    def load(self):
+        """Reads a new state from the database."""
+        raise NotImplementedError
+
+    def apply(self, state, changes):
+        """Applies committed changes to a state; called with the lock held."""
+        raise NotImplementedError
+
+    def current(self, timeout=None):
+        """Returns the state; without one, starts a build and waits for it up to `timeout` seconds.
+
+        Returns None if the state is still missing after the timeout or the build failed.
+        """
+        with self.lock:
+            if self.state is None:
+                builds = self.builds + 1  # The running build, or the one started here
+                self._start_build()
+                self.ready.wait_for(lambda: self.state is not None or self.builds >= builds, timeout)
+            return self.state
+
+    def refresh(self):
+        """Starts a background rebuild unless one is running; the current state keeps serving."""
+        with self.lock:
+            self._start_build()
+
+    def build(self):
+        """Rebuilds the state in the calling thread (or waits for the running build); returns it."""
+        with self.lock:
+            if self.building:
+                builds = self.builds
+                self.ready.wait_for(lambda: self.builds > builds)
+                return self.state
+            self.building, self.replay = True, []
+        self._build()
+        return self.state
+
+    def invalidate(self):
+        # Rebuilt on the next lookup; used after bulk writes that bypass the session hooks
+        with self.lock:
+            self.state = None
+            self.generation += 1
+
+    def _start_build(self):
+        # Called with the lock held
+        if self.building:
+            return
+        if self.app is None:
+            raise RuntimeError(f"The {self.name} index is not initialised")
+        self.building, self.replay = True, []
+        threading.Thread(target=self._build_in_app, name=f'{self.name}-build', daemon=True).start()
+
+    def _build_in_app(self):
+        with self.app.app_context():
+            try:
+                self._build()
+            except Exception as e:
+                self.app.logger.error(f"Building the {self.name} index failed: {e}")
+            finally:
+                db.session.remove()
+
+    def _build(self):
+        try:
+            while True:
+                with self.lock:
+                    generation = self.generation
+                started = time.monotonic()
+                state = self.load()
+                with self.lock:
+                    if self.generation == generation:
+                        for committed_at, changes in self.replay:
+                            if committed_at > started:  # Possibly missing from the snapshot
+                                self.apply(state, changes)
+                        self.state = state
+                        self.built_at = time.monotonic()
+                        return
+                    # Invalidated meanwhile: the snapshot may predate the bulk write
+                    self.replay = []
+        finally:
+            with self.lock:
+                self.building, self.replay = False, None
+                self.builds += 1
+                self.ready.notify_all()
+
+    # Session hooks: changes are staged at flush time and only applied once committed
+    def _record_changes(self, session, flush_context):
+        raise NotImplementedError
+
+    def _apply_changes(self, session):
+        changes = session.info.pop(self.changes_key, None)
+        if not changes:
+            return
+        with self.lock:
+            # Checked under the lock: a build or invalidate() may have swapped the state
+            if self.replay is not None:
+                self.replay.append((time.monotonic(), changes))
+            if self.state is not None:
+                self.apply(self.state, changes)
+
+    def _discard_changes(self, session, previous_transaction):
+        session.info.pop(self.changes_key, None)
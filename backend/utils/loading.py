@@ -0,0 +1,139 @@
+#backend/utils/loading.py
+#
+# Relationship loading profiles and N+1 query diagnostics.
+#
+# All relationships in models.py are lazy, so traversing them (including from __repr__) over a
+# list of N objects fires up to N extra SELECTs per relationship. Loading profiles are named
+# bundles of joinedload/selectinload options for a use case:
+#
+#     Enrollment.query.options(*load_profile('enrollment.detail')).all()
+#
+# count_queries()/max_queries() count the statements a block executes and are meant for tests,
+# and LOG_LAZY_LOADS logs every lazy load triggered while handling a request.
+
+from contextlib import contextmanager
+
+from flask import current_app, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session, joinedload, selectinload
+
+from app import db
+from app.models import (
+    Application, Comment, Course, Discussion, Enrollment, Institution, PollComment,
+    PollCommentVote, Post, SubmissionAnswer, User,
+)
+
+# Registered loading profiles: name -> function returning loader options
+LOADING_PROFILES = {}
+
+
+# Decorator to register a loading profile
+def loading_profile(name):
+    def register(fn):
+        LOADING_PROFILES[name] = fn
+        return fn
+    return register
+
+# Function to get the loader options of a named profile
+def load_profile(name):
+    if name not in LOADING_PROFILES:
+        raise KeyError(f"Unknown loading profile: {name}")
+    return LOADING_PROFILES[name]()
+
+
+@loading_profile('application.detail')
+def _application_detail():
+    return [joinedload(Application.institution), joinedload(Application.user)]
+
+@loading_profile('institution.applications')
+def _institution_applications():
+    return [selectinload(Institution.applications)]
+
+@loading_profile('user.applications')
+def _user_applications():
+    return [selectinload(User.applications).joinedload(Application.institution)]
+
+@loading_profile('course.detail')
+def _course_detail():
+    return [joinedload(Course.institution)]
+
+@loading_profile('enrollment.detail')
+def _enrollment_detail():
+    return [joinedload(Enrollment.user),
+            joinedload(Enrollment.course).joinedload(Course.institution)]
+
+@loading_profile('comment.detail')
+def _comment_detail():
+    return [joinedload(Comment.user), joinedload(Comment.post)]
+
+@loading_profile('submission_answer.detail')
+def _submission_answer_detail():
+    return [joinedload(SubmissionAnswer.question), joinedload(SubmissionAnswer.answer)]
+
+@loading_profile('poll_comment_vote.detail')
+def _poll_comment_vote_detail():
+    return [joinedload(PollCommentVote.user), joinedload(PollCommentVote.comment)]
+
+@loading_profile('poll_comment.thread')
+def _poll_comment_thread():
+    return [joinedload(PollComment.user),
+            selectinload(PollComment.votes),
+            selectinload(PollComment.replies)]
+
+@loading_profile('discussion.thread')
+def _discussion_thread():
+    posts = selectinload(Discussion.posts)
+    return [posts.joinedload(Post.user),
+            posts.selectinload(Post.comments).joinedload(Comment.user)]
+
+
+class QueryCounter:
+    """Statements executed while a count_queries() block is active."""
+
+    def __init__(self):
+        self.statements = []
+
+    @property
+    def count(self):
+        return len(self.statements)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+
+# Context manager counting the SQL statements executed on the app's engine
+@contextmanager
+def count_queries(engine=None):
+    engine = engine or db.engine
+    counter = QueryCounter()
+    event.listen(engine, 'before_cursor_execute', counter._record)
+    try:
+        yield counter
+    finally:
+        event.remove(engine, 'before_cursor_execute', counter._record)
+
+# Context manager failing when a block executes more than `limit` SQL statements
+@contextmanager
+def max_queries(limit, engine=None):
+    with count_queries(engine) as counter:
+        yield counter
+    if counter.count > limit:
+        listing = '\n'.join(f'  {statement}' for statement in counter.statements)
+        raise AssertionError(f"Expected at most {limit} queries, executed {counter.count}:\n{listing}")
+
+# Session hook: log lazy loads triggered while handling a request
+def _log_lazy_load(orm_execute_state):
+    if orm_execute_state.lazy_loaded_from is None or not has_request_context():
+        return
+    parent = orm_execute_state.lazy_loaded_from.class_.__name__
+    mapper = orm_execute_state.bind_mapper
+    target = mapper.class_.__name__ if mapper is not None else '?'
+    current_app.logger.warning(
+        f"Lazy load of {target} from {parent} during {request.method} {request.path} "
+        f"({request.endpoint}); consider a loading profile"
+    )
+
+# Function to enable lazy-load logging when LOG_LAZY_LOADS is set
+def init_lazy_load_logging(app):
+    if app.config.get('LOG_LAZY_LOADS') and not event.contains(Session, 'do_orm_execute', _log_lazy_load):
+        event.listen(Session, 'do_orm_execute', _log_lazy_load)
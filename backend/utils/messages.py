@@ -0,0 +1,127 @@
+#backend/utils/messages.py
+#
+# Conversation-indexed messaging.
+#
+# Every message stores the canonical key of its conversation ('low user id:high user id', set
+# on insert), so a conversation is one range of ix_messages_conversation_date instead of an
+# OR of both directions over the whole table. History is paged newest first with a
+# (send_date, id) keyset cursor, so every page costs the same index range scan.
+#
+# The conversation list picks the latest message of each of a user's conversations in a
+# single query: DISTINCT ON (conversation_key) on PostgreSQL, a ROW_NUMBER() window elsewhere.
+# Both read only the user's own messages through the sender and recipient indexes, so their
+# cost follows the user's history, not the size of the table.
+
+from datetime import datetime
+
+from sqlalchemy import and_, func, or_, select
+
+from app import db
+from app.models import Message, User, conversation_key
+from app.utils.pagination import decode_cursor, encode_cursor
+
+MESSAGE_COLUMNS = (Message.id, Message.sender_id, Message.recipient_id, Message.conversation_key,
+                   Message.content, Message.send_date)
+
+
+class RecipientNotFound(LookupError):
+    """Raised by send_message() when the recipient does not exist."""
+
+
+# Function to serialize a message row
+def dump_message(row):
+    return {
+        'id': row.id,
+        'sender_id': row.sender_id,
+        'recipient_id': row.recipient_id,
+        'content': row.content,
+        'send_date': row.send_date.isoformat() if row.send_date else None,
+    }
+
+# Function to decode a newest-first (send_date, tiebreaker) cursor
+def _decode(cursor, sort):
+    cursor_sort, values = decode_cursor(cursor)
+    if cursor_sort != sort or len(values) != 2:
+        raise ValueError("Invalid cursor")
+    try:
+        return datetime.fromisoformat(values[0]), values[1]
+    except (TypeError, ValueError):
+        raise ValueError("Invalid cursor")
+
+# Function to build the condition selecting rows older than a (send_date, tiebreaker) cursor
+def _before(date_column, tiebreaker, values):
+    send_date, last = values
+    return or_(date_column < send_date, and_(date_column == send_date, tiebreaker < last))
+
+# Function to send a message
+def send_message(sender_id, recipient_id, content):
+    if sender_id == recipient_id:
+        raise ValueError("Cannot send a message to yourself")
+    if not content:
+        raise ValueError("Content is required")
+    # Checked here: SQLite does not enforce the foreign key, PostgreSQL would fail the insert
+    if db.session.query(User.id).filter(User.id == recipient_id).first() is None:
+        raise RecipientNotFound("Recipient not found")
+    message = Message(sender_id=sender_id, recipient_id=recipient_id, content=content)
+    try:
+        db.session.add(message)
+        db.session.commit()
+        return message
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+# Function to get one page of the conversation between two users, newest first
+def conversation_history(user_id, other_user_id, cursor=None, limit=20):
+    """Returns (rows, next_cursor) (raises ValueError on a bad cursor)."""
+    query = (db.session.query(*MESSAGE_COLUMNS)
+             .filter(Message.conversation_key == conversation_key(user_id, other_user_id)))
+    if cursor:
+        send_date, last_id = _decode(cursor, '-send_date')
+        query = query.filter(_before(Message.send_date, Message.id, (send_date, int(last_id))))
+    rows = query.order_by(Message.send_date.desc(), Message.id.desc()).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor('-send_date', [rows[-1].send_date.isoformat(), rows[-1].id])
+    return rows, next_cursor
+
+# Function to build the query of the latest message of each of a user's conversations
+def _latest_messages(user_id):
+    mine = or_(Message.sender_id == user_id, Message.recipient_id == user_id)
+    if db.engine.dialect.name == 'postgresql':
+        return (select(*MESSAGE_COLUMNS)
+                .where(mine)
+                .distinct(Message.conversation_key)
+                .order_by(Message.conversation_key, Message.send_date.desc(), Message.id.desc())
+                .subquery())
+    ranked = (select(*MESSAGE_COLUMNS,
+                     func.row_number().over(partition_by=Message.conversation_key,
+                                            order_by=(Message.send_date.desc(), Message.id.desc()))
+                     .label('position'))
+              .where(mine)
+              .subquery())
+    return select(*[ranked.c[column.key] for column in MESSAGE_COLUMNS]).where(ranked.c.position == 1).subquery()
+
+# Function to list a user's conversations with their latest message, most recent first
+def list_conversations(user_id, cursor=None, limit=20):
+    """Returns (conversations, next_cursor) (raises ValueError on a bad cursor)."""
+    latest = _latest_messages(user_id)
+    stmt = select(latest)
+    if cursor:
+        values = _decode(cursor, '-latest')
+        stmt = stmt.where(_before(latest.c.send_date, latest.c.conversation_key, values))
+    stmt = stmt.order_by(latest.c.send_date.desc(), latest.c.conversation_key.desc()).limit(limit + 1)
+    rows = db.session.execute(stmt).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor('-latest', [rows[-1].send_date.isoformat(), rows[-1].conversation_key])
+
+    conversations = []
+    for row in rows:
+        other_user_id = row.recipient_id if row.sender_id == user_id else row.sender_id
+        conversations.append({'user_id': other_user_id, 'latest_message': dump_message(row)})
+    return conversations, next_cursor
@@ -0,0 +1,202 @@
+#backend/utils/metrics.py
+#
+# Per-request SQL and latency instrumentation.
+#
+# Engine events time every statement; request hooks attribute the query count, database time,
+# JSON serialization time and total duration to the request's endpoint and record them in
+# per-endpoint histograms. /admin/metrics exposes them in the Prometheus text format (rates
+# and quantiles over a window are computed by Prometheus from the cumulative buckets).
+# Statements slower than SLOW_QUERY_THRESHOLD seconds are logged and kept in a bounded list
+# of recent slow queries. With METRICS_SERVER_TIMING set, every response also carries a
+# Server-Timing header.
+
+import threading
+import time
+from collections import deque
+
+from flask import current_app, g, has_request_context, request
+from flask.json.provider import DefaultJSONProvider
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+# Upper bounds of the queries-per-request histogram buckets
+QUERY_COUNT_BUCKETS = (1, 2, 5, 10, 20, 50, 100, 200)
+
+
+class LatencyHistogram:
+    """Thread-safe cumulative histogram."""
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * len(buckets)
+        self.count = 0
+        self.total = 0.0
+        self.lock = threading.Lock()
+
+    def observe(self, value):
+        with self.lock:
+            self.count += 1
+            self.total += value
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    self.counts[i] += 1
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                'count': self.count,
+                'sum': self.total,
+                'buckets': dict(zip(self.buckets, self.counts)),
+            }
+
+
+class EndpointMetrics:
+    """Histograms recorded for one endpoint."""
+
+    def __init__(self):
+        self.duration = LatencyHistogram()
+        self.db_time = LatencyHistogram()
+        self.serialization_time = LatencyHistogram()
+        self.db_queries = LatencyHistogram(QUERY_COUNT_BUCKETS)
+
+
+class TimedJSONProvider(DefaultJSONProvider):
+    """JSON provider that adds the time spent serializing to the current request."""
+
+    def dumps(self, obj, **kwargs):
+        start = time.perf_counter()
+        try:
+            return super().dumps(obj, **kwargs)
+        finally:
+            if has_request_context():
+                g.serialization_time = g.get('serialization_time', 0.0) + time.perf_counter() - start
+
+
+# Function to render one histogram in the Prometheus text format
+def prometheus_histogram(lines, name, labels, snapshot):
+    label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+    prefix = label_text + ',' if label_text else ''
+    for bound, count in snapshot['buckets'].items():
+        lines.append(f'{name}_bucket{{{prefix}le="{bound}"}} {count}')
+    lines.append(f'{name}_bucket{{{prefix}le="+Inf"}} {snapshot["count"]}')
+    lines.append(f'{name}_sum{{{label_text}}} {snapshot["sum"]}')
+    lines.append(f'{name}_count{{{label_text}}} {snapshot["count"]}')
+
+
+class RequestMetrics:
+    """Flask extension recording per-endpoint query counts, DB time and latency."""
+
+    def __init__(self, app=None):
+        self.endpoints = {}
+        self.lock = threading.Lock()
+        self.slow_queries = deque(maxlen=100)
+        self.slow_query_threshold = 0.5
+        self.server_timing = False
+        self.collectors = []
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.slow_query_threshold = app.config.get('SLOW_QUERY_THRESHOLD', self.slow_query_threshold)
+        self.server_timing = app.config.get('METRICS_SERVER_TIMING', self.server_timing)
+        self.slow_queries = deque(maxlen=app.config.get('SLOW_QUERY_LOG_SIZE', 100))
+        app.json = TimedJSONProvider(app)
+        app.before_request(self._start_request)
+        app.after_request(self._finish_request)
+        if not event.contains(Engine, 'before_cursor_execute', self._before_cursor_execute):
+            event.listen(Engine, 'before_cursor_execute', self._before_cursor_execute)
+            event.listen(Engine, 'after_cursor_execute', self._after_cursor_execute)
+            event.listen(Engine, 'handle_error', self._handle_error)
+        app.extensions['request_metrics'] = self
+
+    def register_collector(self, collector):
+        """Adds a callable returning extra Prometheus text lines to the exposition."""
+        if collector not in self.collectors:
+            self.collectors.append(collector)
+
+    # Engine hooks: time each statement and attribute it to the current request
+    def _before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('query_start_times', []).append(time.perf_counter())
+
+    def _after_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info['query_start_times'].pop()
+        endpoint = None
+        if has_request_context():
+            g.db_queries = g.get('db_queries', 0) + 1
+            g.db_time = g.get('db_time', 0.0) + elapsed
+            endpoint = request.endpoint
+        if elapsed >= self.slow_query_threshold:
+            self.slow_queries.append({
+                'statement': statement,
+                'seconds': round(elapsed, 6),
+                'endpoint': endpoint,
+                'at': time.time(),
+            })
+            if has_request_context():
+                current_app.logger.warning(f"Slow query ({elapsed:.3f}s) in {endpoint}: {statement}")
+
+    def _handle_error(self, exception_context):
+        # A failed statement never reaches after_cursor_execute; drop its start time
+        connection = exception_context.connection
+        if connection is not None and connection.info.get('query_start_times'):
+            connection.info['query_start_times'].pop()
+
+    # Request hooks
+    def _start_request(self):
+        g.request_start = time.perf_counter()
+
+    def _finish_request(self, response):
+        start = g.get('request_start')
+        if start is None:
+            return response
+        duration = time.perf_counter() - start
+        db_time = g.get('db_time', 0.0)
+        serialization_time = g.get('serialization_time', 0.0)
+        queries = g.get('db_queries', 0)
+
+        endpoint = request.endpoint or 'unmatched'
+        with self.lock:
+            metrics = self.endpoints.get(endpoint)
+            if metrics is None:
+                metrics = self.endpoints[endpoint] = EndpointMetrics()
+        metrics.duration.observe(duration)
+        metrics.db_time.observe(db_time)
+        metrics.serialization_time.observe(serialization_time)
+        metrics.db_queries.observe(queries)
+
+        if self.server_timing:
+            response.headers['Server-Timing'] = (
+                f'db;dur={db_time * 1000:.2f};desc="{queries} queries", '
+                f'serialize;dur={serialization_time * 1000:.2f}, '
+                f'total;dur={duration * 1000:.2f}'
+            )
+        return response
+
+    def prometheus(self):
+        """Returns all metrics in the Prometheus text exposition format."""
+        with self.lock:
+            endpoints = sorted(self.endpoints.items())
+        families = [
+            ('uap_request_duration_seconds', 'duration', 'Request duration'),
+            ('uap_request_db_seconds', 'db_time', 'Time spent executing SQL per request'),
+            ('uap_request_serialization_seconds', 'serialization_time', 'Time spent serializing JSON per request'),
+            ('uap_request_db_queries', 'db_queries', 'SQL statements executed per request'),
+        ]
+        lines = []
+        for name, attribute, description in families:
+            lines.append(f'# HELP {name} {description}.')
+            lines.append(f'# TYPE {name} histogram')
+            for endpoint, metrics in endpoints:
+                prometheus_histogram(lines, name, {'endpoint': endpoint}, getattr(metrics, attribute).snapshot())
+        lines.append('# HELP uap_slow_queries_recent Slow queries currently held in the recent slow query log.')
+        lines.append('# TYPE uap_slow_queries_recent gauge')
+        lines.append(f'uap_slow_queries_recent {len(self.slow_queries)}')
+        for collector in self.collectors:
+            lines.extend(collector())
+        return '\n'.join(lines) + '\n'
+
+
+request_metrics = RequestMetrics()
@@ -0,0 +1,298 @@
+#backend/utils/notifications.py
+#
+# Per-user notification inbox: unread counters and long-poll delivery.
+#
+# Each user's unread count is a stat_counters row (scope 'notifications.unread', bucket =
+# user id). Every flush that inserts, deletes, reads or unreads a notification bumps it in
+# the same transaction, and mark_read() bumps it by the number of rows its UPDATE changed,
+# so the count is one primary-key lookup instead of a scan of the user's history.
+#
+# GET /notifications/poll is a long poll: with nothing new for the client it parks the request
+# on an in-process NotificationHub until a notification for the user is committed, or
+# NOTIFICATION_POLL_TIMEOUT passes. Commits in the same process wake waiters immediately; a
+# watcher thread picks up notifications committed by other processes with one query every
+# NOTIFICATION_WATCH_INTERVAL seconds, and only while someone is waiting.
+#
+# Ids are allocated when a row is inserted, not when it commits, so under concurrent writers
+# a notification can become visible after one with a higher id was already delivered. Poll
+# cursors and the watcher therefore remember the ids they have seen in the last
+# NOTIFICATION_REDELIVERY_WINDOW ids and look again below their high-water mark, instead of
+# only asking for `id > last seen`.
+#
+# Parked requests hold a worker thread (but no database connection) for up to the poll
+# timeout, so the API must run on a threaded server (e.g. gunicorn --threads N, or gthread /
+# gevent workers), with more threads than NOTIFICATION_MAX_WAITERS. Beyond that many parked
+# polls per process, new polls are answered with 503 and Retry-After instead of waiting.
+
+import os
+import threading
+import time
+from datetime import datetime
+
+import click
+from sqlalchemy import event, func, inspect
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import Notification, StatCounter
+from app.utils.pagination import decode_cursor, encode_cursor
+from app.utils.stats import bump_counters, lock_table, replace_counters
+
+# stat_counters scope holding the unread counts
+UNREAD_SCOPE = 'notifications.unread'
+
+
+# Function to read a user's unread notification count
+def unread_count(user_id):
+    value = (db.session.query(StatCounter.value)
+             .filter(StatCounter.scope == UNREAD_SCOPE, StatCounter.bucket == str(user_id))
+             .scalar())
+    return max(value or 0, 0)
+
+# Function to create a notification for each user in one transaction
+def notify(user_ids, content):
+    notifications = [Notification(user_id=user_id, content=content) for user_id in user_ids]
+    try:
+        db.session.add_all(notifications)
+        db.session.commit()
+        return notifications
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+# Function to mark a user's notifications (or only the given ids) as read
+def mark_read(user_id, ids=None):
+    """Marks unread notifications as read; returns how many changed."""
+    table = Notification.__table__
+    stmt = (table.update()
+            .where(table.c.user_id == user_id, table.c.read_at.is_(None))
+            .values(read_at=datetime.utcnow()))
+    if ids is not None:
+        stmt = stmt.where(table.c.id.in_(ids))
+    try:
+        connection = db.session.connection()
+        changed = connection.execute(stmt).rowcount
+        if changed:
+            bump_counters(connection, {(UNREAD_SCOPE, str(user_id)): -changed})
+        db.session.commit()
+        return changed
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+# Function to recompute the unread counters from the notifications table
+def reconcile_unread_counts():
+    """Rebuilds the unread counters; returns the number of counters written."""
+    try:
+        # Lock before counting so no concurrent bump falls between the count and the write
+        connection = db.session.connection()
+        lock_table(connection, StatCounter.__table__)
+        rows = (db.session.query(Notification.user_id, func.count(Notification.id))
+                .filter(Notification.read_at.is_(None))
+                .group_by(Notification.user_id)
+                .all())
+        replace_counters(connection, [UNREAD_SCOPE],
+                         {(UNREAD_SCOPE, str(user_id)): count for user_id, count in rows})
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+    return len(rows)
+
+
+class PollCursor:
+    """Position of a long-polling client: its high-water id and the ids it got just below it."""
+
+    def __init__(self, last_id, seen=(), window=100):
+        self.last_id = last_id
+        self.window = window
+        self.seen = {i for i in seen if i > last_id - window}
+
+    @classmethod
+    def decode(cls, cursor, window):
+        sort, values = decode_cursor(cursor)
+        if sort != 'notifications' or not values or \
+                not all(isinstance(value, int) and not isinstance(value, bool) for value in values):
+            raise ValueError("Invalid cursor")
+        return cls(values[0], values[1:], window)
+
+    def encode(self):
+        return encode_cursor('notifications', [self.last_id] + sorted(self.seen))
+
+    def query(self, user_id, limit):
+        """Returns the user's notifications the client has not received, oldest first."""
+        query = (db.session.query(Notification.id, Notification.content, Notification.notification_date,
+                                  Notification.read_at)
+                 .filter(Notification.user_id == user_id, Notification.id > self.last_id - self.window))
+        if self.seen:
+            query = query.filter(Notification.id.notin_(self.seen))
+        return query.order_by(Notification.id).limit(limit).all()
+
+    def advance(self, ids):
+        self.last_id = max([self.last_id, *ids])
+        self.seen = {i for i in self.seen.union(ids) if i > self.last_id - self.window}
+
+
+class NotificationHub:
+    """In-process wake-ups for long-polling clients, per user."""
+
+    def __init__(self):
+        self.app = None
+        self.watch_interval = 2
+        self.window = 100
+        self.max_waiters = 50
+        self.condition = threading.Condition()
+        self.waiting = {}      # user id -> parked requests
+        self.parked = 0
+        self.generations = {}  # user id -> wake-ups since the first request parked
+        self.position = None   # PollCursor of the watcher over all users
+        self.thread = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # Parked requests and the watcher thread belong to the parent
+        self.condition = threading.Condition()
+        self.waiting, self.generations = {}, {}
+        self.parked = 0
+        self.position = None
+        self.thread = None
+
+    def _seed(self):
+        # The watcher's position: every id committed so far counts as seen
+        last_id = db.session.query(func.max(Notification.id)).scalar() or 0
+        seen = [row[0] for row in db.session.query(Notification.id).filter(Notification.id > last_id - self.window)]
+        return PollCursor(last_id, seen, self.window)
+
+    def subscribe(self, user_id):
+        """Registers a waiter; returns the generation to pass to wait(), or None when full."""
+        # Seed the watcher's position before the caller looks for new rows, so a notification
+        # committed by another process in between is still unseen by the watcher
+        position = self._seed() if self.position is None else None
+        with self.condition:
+            if self.parked >= self.max_waiters:
+                return None
+            if self.position is None:
+                self.position = position
+            self.parked += 1
+            self.waiting[user_id] = self.waiting.get(user_id, 0) + 1
+            if self.thread is None and self.app is not None:
+                self.thread = threading.Thread(target=self._watch, name='notification-watcher', daemon=True)
+                self.thread.start()
+            return self.generations.get(user_id, 0)
+
+    def unsubscribe(self, user_id):
+        with self.condition:
+            self.parked -= 1
+            self.waiting[user_id] -= 1
+            if not self.waiting[user_id]:
+                del self.waiting[user_id]
+                self.generations.pop(user_id, None)
+
+    def wait(self, user_id, generation, timeout):
+        """Blocks until the user is woken after `generation`; returns False on timeout."""
+        with self.condition:
+            return self.condition.wait_for(lambda: self.generations.get(user_id, 0) != generation, timeout)
+
+    def publish(self, user_ids):
+        with self.condition:
+            woken = [user_id for user_id in user_ids if user_id in self.waiting]
+            for user_id in woken:
+                self.generations[user_id] = self.generations.get(user_id, 0) + 1
+            if woken:
+                self.condition.notify_all()
+
+    def _watch(self):
+        # Wakes waiters for notifications committed by other processes
+        while True:
+            time.sleep(self.watch_interval)
+            with self.condition:
+                if not self.waiting:
+                    # The next subscriber seeds a fresh position
+                    self.position = None
+                    continue
+            with self.app.app_context():
+                try:
+                    self._check()
+                except Exception as e:
+                    self.app.logger.error(f"Notification watcher failed: {e}")
+                finally:
+                    db.session.remove()
+
+    def _check(self):
+        position = self.position
+        if position is None:
+            return
+        query = (db.session.query(Notification.id, Notification.user_id)
+                 .filter(Notification.id > position.last_id - position.window))
+        rows = [row for row in query if row[0] not in position.seen]
+        if rows:
+            position.advance([notification_id for notification_id, _ in rows])
+            self.publish({user_id for _, user_id in rows})
+
+
+notification_hub = NotificationHub()
+
+
+# Session hooks: bump unread counters with the flushed rows, wake waiters once committed
+def _on_flush(session, flush_context):
+    deltas = {}
+    for obj in session.new:
+        if isinstance(obj, Notification):
+            session.info.setdefault('notified_users', set()).add(obj.user_id)
+            if obj.read_at is None:
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) + 1
+    for obj in session.deleted:
+        if isinstance(obj, Notification):
+            history = inspect(obj).attrs.read_at.history
+            read_at = history.deleted[0] if history.deleted else obj.read_at
+            if read_at is None:
+                deltas[obj.user_id] = deltas.get(obj.user_id, 0) - 1
+    for obj in session.dirty:
+        if not isinstance(obj, Notification):
+            continue
+        history = inspect(obj).attrs.read_at.history
+        if not history.added or not history.deleted:
+            continue
+        was_unread, is_unread = history.deleted[0] is None, history.added[0] is None
+        if was_unread != is_unread:
+            deltas[obj.user_id] = deltas.get(obj.user_id, 0) + (1 if is_unread else -1)
+    deltas = {(UNREAD_SCOPE, str(user_id)): delta for user_id, delta in deltas.items() if delta}
+    if deltas:
+        bump_counters(session.connection(), deltas)
+
+def _on_commit(session):
+    users = session.info.pop('notified_users', None)
+    if users:
+        notification_hub.publish(users)
+
+def _on_rollback(session, previous_transaction):
+    session.info.pop('notified_users', None)
+
+
+class NotificationInbox:
+    """Flask extension registering the counter hooks, the hub and the reconciliation command."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        notification_hub.app = app
+        notification_hub.position = None  # Seeded from this app's database on first use
+        notification_hub.watch_interval = app.config.get('NOTIFICATION_WATCH_INTERVAL', 2)
+        notification_hub.window = app.config.get('NOTIFICATION_REDELIVERY_WINDOW', 100)
+        notification_hub.max_waiters = app.config.get('NOTIFICATION_MAX_WAITERS', 50)
+        if not event.contains(Session, 'after_flush', _on_flush):
+            event.listen(Session, 'after_flush', _on_flush)
+            event.listen(Session, 'after_commit', _on_commit)
+            event.listen(Session, 'after_soft_rollback', _on_rollback)
+        app.extensions['notification_inbox'] = self
+
+        @app.cli.command('reconcile-notifications')
+        def reconcile_notifications_command():
+            """Recompute the unread notification counters."""
+            click.echo(f"Reconciled {reconcile_unread_counts()} unread counters.")
+
+
+notification_inbox = NotificationInbox()
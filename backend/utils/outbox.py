@@ -0,0 +1,240 @@
+#backend/utils/outbox.py
+#
+# Durable outbound email queue.
+#
+# send_email() only adds a row to the email_outbox table in the caller's session, so the email
+# is queued if and only if the caller's transaction commits, and request latency no longer
+# depends on the SMTP server. A pool of worker processes claims due rows in batches and sends
+# each batch over a single SMTP connection. Claiming a row leases it for MAIL_OUTBOX_LEASE
+# seconds with a conditional UPDATE, so two workers never claim the same row; a worker that
+# dies mid-batch simply lets the lease expire and the rows are picked up again. Failed
+# deliveries are retried with exponential backoff up to MAIL_OUTBOX_MAX_ATTEMPTS.
+#
+# MAIL_TRANSPORT = 'file' writes messages as .eml files to MAIL_OUTBOX_DIR instead of sending
+# them, which is the stand-in for tests and local development (a debugging SMTP server such
+# as `python -m aiosmtpd -n -l localhost:1025` works with the 'smtp' transport as well).
+
+import multiprocessing
+import os
+import pickle
+import smtplib
+import time
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+
+import click
+
+from app import db
+from app.models import OutboxEmail
+
+
+class FileTransport:
+    """Writes each message to an .eml file instead of sending it."""
+
+    def __init__(self, config):
+        self.directory = config.get('MAIL_OUTBOX_DIR') or 'outbox'
+
+    def __enter__(self):
+        os.makedirs(self.directory, exist_ok=True)
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def send(self, email_id, message):
+        path = os.path.join(self.directory, f'{email_id}.eml')
+        with open(path, 'wb') as f:
+            f.write(message.as_bytes())
+
+
+class SMTPTransport:
+    """Sends every message of a batch over one persistent SMTP connection."""
+
+    def __init__(self, config):
+        self.config = config
+        self.connection = None
+
+    def __enter__(self):
+        config = self.config
+        if config.get('MAIL_USE_SSL'):
+            self.connection = smtplib.SMTP_SSL(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=30)
+        else:
+            self.connection = smtplib.SMTP(config['MAIL_SERVER'], config['MAIL_PORT'], timeout=30)
+            if config.get('MAIL_USE_TLS'):
+                self.connection.starttls()
+        if config.get('MAIL_USERNAME'):
+            self.connection.login(config['MAIL_USERNAME'], config['MAIL_PASSWORD'])
+        return self
+
+    def __exit__(self, *exc_info):
+        try:
+            self.connection.quit()
+        except smtplib.SMTPException:
+            self.connection.close()
+        return False
+
+    def send(self, email_id, message):
+        self.connection.send_message(message)
+
+
+TRANSPORTS = {
+    'smtp': SMTPTransport,
+    'file': FileTransport,
+}
+
+
+# Function to queue an email for delivery by the outbox workers
+def enqueue_email(subject, recipient, body):
+    """Adds the email to the current session; it is queued when the caller commits."""
+    email = OutboxEmail(subject=subject, recipient=recipient, body=body)
+    db.session.add(email)
+    return email
+
+# Function to build the MIME message for an outbox row
+def build_message(email, sender):
+    message = EmailMessage()
+    message['Subject'] = email.subject
+    message['From'] = sender
+    message['To'] = email.recipient
+    message.set_content(email.body)
+    return message
+
+# Function to lease a batch of due emails to the calling worker
+def claim_batch(batch_size, lease_seconds):
+    now = datetime.utcnow()
+    query = (db.session.query(OutboxEmail.id)
+             .filter(OutboxEmail.status == 'pending', OutboxEmail.next_attempt_at <= now)
+             .order_by(OutboxEmail.next_attempt_at)
+             .limit(batch_size))
+    if db.session.get_bind().dialect.name == 'postgresql':
+        # Concurrent workers skip rows another worker is claiming instead of waiting on them
+        query = query.with_for_update(skip_locked=True)
+
+    # Each lease is a compare-and-set on the due date, so a row another worker claimed since
+    # the SELECT (e.g. on SQLite, which has no row locks) is left alone
+    table = OutboxEmail.__table__
+    lease_until = now + timedelta(seconds=lease_seconds)
+    claimed = []
+    for (email_id,) in query.all():
+        result = db.session.execute(
+            table.update()
+            .where(table.c.id == email_id, table.c.status == 'pending', table.c.next_attempt_at <= now)
+            .values(attempts=table.c.attempts + 1, next_attempt_at=lease_until)
+        )
+        if result.rowcount:
+            claimed.append(email_id)
+    db.session.commit()
+    if not claimed:
+        return []
+    return OutboxEmail.query.filter(OutboxEmail.id.in_(claimed)).order_by(OutboxEmail.id).all()
+
+# Function to record the outcome of a delivery attempt
+def _record_failure(email, error, config):
+    email.last_error = str(error)
+    if email.attempts >= config.get('MAIL_OUTBOX_MAX_ATTEMPTS', 8):
+        email.status = 'failed'
+    else:
+        delay = config.get('MAIL_OUTBOX_BACKOFF', 30) * 2 ** (email.attempts - 1)
+        email.next_attempt_at = datetime.utcnow() + timedelta(seconds=delay)
+
+# Function to deliver one claimed batch over a single transport connection
+def deliver_batch(emails, config):
+    """Sends the emails and records each outcome; returns the number delivered."""
+    transport = TRANSPORTS[config.get('MAIL_TRANSPORT', 'smtp')](config)
+    sender = config.get('MAIL_DEFAULT_SENDER')
+    delivered = 0
+    try:
+        with transport:
+            for email in emails:
+                try:
+                    transport.send(email.id, build_message(email, sender))
+                except (smtplib.SMTPRecipientsRefused, smtplib.SMTPDataError, ValueError) as e:
+                    # Message-level failure; the connection is still usable
+                    _record_failure(email, e, config)
+                    continue
+                email.status = 'sent'
+                email.sent_at = datetime.utcnow()
+                email.last_error = None
+                delivered += 1
+    except (smtplib.SMTPException, OSError) as e:
+        # Connection-level failure; retry everything that was not sent yet
+        for email in emails:
+            if email.status == 'pending':
+                _record_failure(email, e, config)
+    db.session.commit()
+    return delivered
+
+# Function to process the outbox until stopped (or once, when `once` is set)
+def run_worker(app, once=False):
+    config = app.config
+    batch_size = config.get('MAIL_OUTBOX_BATCH_SIZE', 50)
+    lease = config.get('MAIL_OUTBOX_LEASE', 300)
+    idle = config.get('MAIL_OUTBOX_POLL_INTERVAL', 2)
+    with app.app_context():
+        while True:
+            emails = claim_batch(batch_size, lease)
+            if emails:
+                delivered = deliver_batch(emails, config)
+                app.logger.info(f"Outbox: delivered {delivered} of {len(emails)} emails")
+            if once and not emails:
+                return
+            if not emails:
+                time.sleep(idle)
+
+# Function run in each worker process of the pool
+def _worker_process(settings, once):
+    from app import create_app
+    run_worker(create_app(settings), once=once)
+
+# Function to copy the settings of an app for worker processes
+def worker_settings(app):
+    """Returns the app's settings as a mapping create_app() accepts.
+
+    The values are passed instead of an import path, so configuration classes defined in a
+    function (e.g. for tests) work too. Raises ValueError if they cannot be sent to a worker.
+    """
+    settings = {key: value for key, value in app.config.items() if key.isupper()}
+    try:
+        pickle.dumps(settings)
+    except Exception as e:
+        raise ValueError(f"The configuration cannot be passed to worker processes: {e}")
+    return settings
+
+# Function to run a pool of outbox worker processes with the parent's settings
+def run_worker_pool(processes, settings, once=False):
+    workers = [multiprocessing.Process(target=_worker_process, args=(settings, once),
+                                       name=f'outbox-worker-{i}')
+               for i in range(processes)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+
+
+class EmailOutbox:
+    """Flask extension registering the `flask email-worker` command."""
+
+    def __init__(self, app=None):
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        app.extensions['email_outbox'] = self
+
+        @app.cli.command('email-worker')
+        @click.option('--processes', type=int, default=None, help='Number of worker processes.')
+        @click.option('--once', is_flag=True, help='Exit once the outbox is drained.')
+        def email_worker(processes, once):
+            """Deliver queued emails from the outbox."""
+            processes = processes or app.config.get('MAIL_OUTBOX_WORKERS', 2)
+            if processes == 1:
+                run_worker(app, once=once)
+                return
+            try:
+                settings = worker_settings(app)
+            except ValueError as e:
+                raise click.ClickException(str(e))
+            run_worker_pool(processes, settings, once=once)
+
+
+email_outbox = EmailOutbox()
@@ -0,0 +1,98 @@
+#backend/utils/pagination.py
+#
+# Keyset (cursor) pagination for list endpoints.
+#
+# Pages are ordered by an optional sort column followed by the primary key, and the next
+# page starts strictly after the last row of the previous one. Fetching page N therefore
+# costs the same index range scan as page 1, instead of an OFFSET that grows with N.
+# Cursors are opaque to clients: a url-safe base64 encoding of the sort key and the last
+# row's key values.
+
+import base64
+import binascii
+import json
+
+from flask import current_app, request
+from sqlalchemy import and_, or_
+
+
+# Function to encode the key values of the last row of a page into a cursor
+def encode_cursor(sort, values):
+    payload = json.dumps({'s': sort, 'v': list(values)}, separators=(',', ':'))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip('=')
+
+# Function to decode a cursor back into its sort key and key values
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        sort, values = payload['s'], payload['v']
+    except (binascii.Error, ValueError, TypeError, KeyError):
+        raise ValueError("Invalid cursor")
+    # The values are bound into comparisons, so anything but a list of scalars is rejected
+    if not (sort is None or isinstance(sort, str)) or not isinstance(values, list) or \
+            not all(value is None or isinstance(value, (str, int, float)) for value in values):
+        raise ValueError("Invalid cursor")
+    return sort, values
+
+# Function to parse a sort argument such as 'name' or '-name'
+def parse_sort(sort, sort_keys):
+    if not sort:
+        return None, False
+    descending = sort.startswith('-')
+    key = sort.lstrip('-')
+    if key not in sort_keys:
+        raise ValueError(f"Cannot sort by '{key}'")
+    return key, descending
+
+# Function to build the keyset condition selecting rows after the cursor position
+def _after(columns, values, descending):
+    clauses = []
+    for i, column in enumerate(columns):
+        equal = [columns[j] == values[j] for j in range(i)]
+        beyond = column < values[i] if descending else column > values[i]
+        clauses.append(and_(*equal, beyond))
+    return or_(*clauses)
+
+# Function to fetch one page of a query with keyset pagination
+def paginate_query(query, model, sort=None, cursor=None, limit=None, sort_keys=()):
+    """Returns (rows, next_cursor); next_cursor is None on the last page."""
+    key, descending = parse_sort(sort, sort_keys)
+    columns = ([getattr(model, key)] if key else []) + [model.id]
+
+    if cursor:
+        cursor_sort, values = decode_cursor(cursor)
+        if cursor_sort != (sort or None) or len(values) != len(columns):
+            raise ValueError("Cursor does not match the requested sort order")
+        query = query.filter(_after(columns, values, descending))
+
+    order = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        last = rows[-1]
+        values = [getattr(last, key)] if key else []
+        next_cursor = encode_cursor(sort or None, values + [last.id])
+    return rows, next_cursor
+
+# Function to paginate a query using the cursor, limit and sort request arguments
+def paginate(query, model, sort_keys=()):
+    """Paginates using ?cursor=, ?limit= and ?sort= (raises ValueError on bad input)."""
+    default_limit = current_app.config.get('ITEMS_PER_PAGE', 10)
+    max_limit = current_app.config.get('MAX_ITEMS_PER_PAGE', 100)
+    try:
+        limit = int(request.args.get('limit', default_limit))
+    except ValueError:
+        raise ValueError("Limit must be an integer")
+    if limit < 1:
+        raise ValueError("Limit must be positive")
+
+    return paginate_query(
+        query, model,
+        sort=request.args.get('sort'),
+        cursor=request.args.get('cursor'),
+        limit=min(limit, max_limit),
+        sort_keys=sort_keys,
+    )
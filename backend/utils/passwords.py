@@ -0,0 +1,157 @@
+#backend/utils/passwords.py
+#
+# Password hashing service.
+#
+# Hashing and verifying passwords is deliberately CPU-expensive, so the work runs in a bounded
+# process pool instead of the request thread. When more than PASSWORD_HASH_MAX_PENDING
+# operations are queued, new ones are rejected with PasswordHashingBusy (a 503 response)
+# rather than piling up behind a login storm; an operation still running after
+# PASSWORD_HASH_TIMEOUT seconds gets the same 503, and keeps its queue slot until the pool
+# has actually finished it. Stored hashes made with an older method or
+# work factor are transparently re-hashed with PASSWORD_HASH_METHOD on the next successful
+# login.
+
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeoutError
+
+from flask import jsonify
+from werkzeug.security import check_password_hash, generate_password_hash
+
+from app import db
+from app.utils.metrics import LatencyHistogram, prometheus_histogram
+
+# Upper bounds (seconds) of the latency histogram buckets
+LATENCY_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class PasswordHashingBusy(Exception):
+    """Raised when the hashing queue is full or an operation times out."""
+
+
+class PasswordHasher:
+    """Flask extension running password hashing in a bounded process pool."""
+
+    def __init__(self, app=None):
+        self.method = 'scrypt'
+        self.workers = 0
+        self.timeout = 10
+        self.pool = None
+        self.pool_lock = threading.Lock()
+        self.slots = None
+        self.rejected = 0
+        self.timed_out = 0
+        self.histograms = {'hash': LatencyHistogram(LATENCY_BUCKETS), 'verify': LatencyHistogram(LATENCY_BUCKETS)}
+        self._method_prefix = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.method = app.config.get('PASSWORD_HASH_METHOD', self.method)
+        self.workers = app.config.get('PASSWORD_HASH_WORKERS', self.workers)
+        self.timeout = app.config.get('PASSWORD_HASH_TIMEOUT', self.timeout)
+        self.slots = threading.BoundedSemaphore(app.config.get('PASSWORD_HASH_MAX_PENDING', 64))
+        self._method_prefix = None
+        app.extensions['password_hasher'] = self
+        app.register_error_handler(PasswordHashingBusy, self._busy_response)
+
+    @staticmethod
+    def _busy_response(error):
+        response = jsonify({"msg": "The server is busy, please try again shortly"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    def _executor(self):
+        # Created lazily so each (forked) web worker process gets its own pool
+        if self.pool is None:
+            with self.pool_lock:
+                if self.pool is None:
+                    self.pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self.pool
+
+    def _release(self, future=None):
+        if self.slots is not None:
+            self.slots.release()
+
+    def _run(self, kind, fn, *args):
+        if self.slots is not None and not self.slots.acquire(blocking=False):
+            self.rejected += 1
+            raise PasswordHashingBusy()
+        start = time.perf_counter()
+        if not self.workers:
+            try:
+                return fn(*args)
+            finally:
+                self._release()
+                self.histograms[kind].observe(time.perf_counter() - start)
+
+        try:
+            future = self._executor().submit(fn, *args)
+        except Exception:
+            self._release()
+            raise
+        # The slot is freed when the pool finishes the job, even if the request gave up on it
+        future.add_done_callback(self._release)
+        try:
+            return future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self.timed_out += 1
+            raise PasswordHashingBusy()
+        finally:
+            self.histograms[kind].observe(time.perf_counter() - start)
+
+    def hash(self, password):
+        """Returns a hash of the password made with the configured method."""
+        return self._run('hash', generate_password_hash, password, self.method)
+
+    def verify(self, stored_hash, password):
+        """Returns whether the password matches the stored hash."""
+        return self._run('verify', check_password_hash, stored_hash, password)
+
+    def needs_rehash(self, stored_hash):
+        """Returns whether a stored hash was made with a different method or work factor."""
+        if self._method_prefix is None:
+            # Werkzeug expands defaults (e.g. 'scrypt' -> 'scrypt:32768:8:1'), so compare
+            # against the prefix of a real hash made with the configured method.
+            self._method_prefix = generate_password_hash('', self.method).split('$', 1)[0]
+        return stored_hash.split('$', 1)[0] != self._method_prefix
+
+    def check_and_upgrade(self, user, password):
+        """Verifies a user's password and upgrades an outdated hash in place."""
+        if not self.verify(user.password_hash, password):
+            return False
+        if self.needs_rehash(user.password_hash):
+            user.password_hash = self.hash(password)
+            try:
+                db.session.commit()
+            except Exception:
+                db.session.rollback()  # The old hash still works; retry on the next login
+        return True
+
+    def metrics(self):
+        return {
+            'workers': self.workers,
+            'rejected': self.rejected,
+            'timed_out': self.timed_out,
+            'hash': self.histograms['hash'].snapshot(),
+            'verify': self.histograms['verify'].snapshot(),
+        }
+
+    def prometheus_lines(self):
+        """Returns the hashing metrics as Prometheus text lines."""
+        lines = [
+            '# HELP uap_password_hash_seconds Password hashing and verification latency.',
+            '# TYPE uap_password_hash_seconds histogram',
+        ]
+        for operation, histogram in self.histograms.items():
+            prometheus_histogram(lines, 'uap_password_hash_seconds', {'operation': operation}, histogram.snapshot())
+        lines.append('# HELP uap_password_hash_rejected_total Hashing operations rejected because the queue was full.')
+        lines.append('# TYPE uap_password_hash_rejected_total counter')
+        lines.append(f'uap_password_hash_rejected_total {self.rejected}')
+        lines.append('# HELP uap_password_hash_timed_out_total Hashing operations that exceeded the timeout.')
+        lines.append('# TYPE uap_password_hash_timed_out_total counter')
+        lines.append(f'uap_password_hash_timed_out_total {self.timed_out}')
+        return lines
+
+
+password_hasher = PasswordHasher()
@@ -0,0 +1,173 @@
+#backend/utils/polls.py
+#
+# Poll vote ingestion and denormalized tallies.
+#
+# cast_vote() inserts the PollVote row and bumps the matching PollResult.vote_count with a
+# single upsert (INSERT ... ON CONFLICT DO UPDATE SET vote_count = vote_count + 1) in the same
+# transaction, so the tally never needs to be recomputed from the votes and concurrent voters
+# cannot lose increments. Live results read the PollResult rows only, O(questions x answers)
+# however many people voted. reconcile_poll_results() rebuilds the tallies from poll_votes to
+# repair drift from writes made outside cast_vote(); it locks poll_results and writes the
+# recomputed counts with one INSERT ... SELECT ... ON CONFLICT DO UPDATE, so votes cast while
+# it runs are not lost.
+#
+# Each user has one vote per question (uq_poll_votes_user_question). Answers are free text, so
+# a question tallies at most POLL_MAX_ANSWERS distinct answers; further new answers are refused.
+# The cap is checked with the question row locked, so concurrent new answers cannot exceed it.
+
+from datetime import datetime
+
+from flask import current_app
+from sqlalchemy import func, select, true
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import Poll, PollQuestion, PollResult, PollVote
+from app.utils.stats import lock_table
+
+
+class DuplicateVote(ValueError):
+    """Raised by cast_vote() when the user already voted on the question."""
+
+
+
+# Function to add one vote to an answer's tally inside the caller's transaction
+def bump_tally(connection, poll_id, question_id, answer_text, delta=1):
+    table = PollResult.__table__
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(poll_id=poll_id, question_id=question_id,
+                                    answer_text=answer_text, vote_count=delta)
+        connection.execute(stmt.on_conflict_do_update(
+            index_elements=[table.c.question_id, table.c.answer_text],
+            set_={'vote_count': table.c.vote_count + delta},
+        ))
+        return
+
+    updated = connection.execute(
+        table.update()
+        .where(table.c.question_id == question_id, table.c.answer_text == answer_text)
+        .values(vote_count=table.c.vote_count + delta)
+    )
+    if not updated.rowcount:
+        connection.execute(table.insert(), [{'poll_id': poll_id, 'question_id': question_id,
+                                             'answer_text': answer_text, 'vote_count': delta}])
+
+# Function to check whether an answer already has a tally
+def _has_answer(connection, question_id, answer_text):
+    results = PollResult.__table__
+    return connection.execute(
+        select(results.c.id).where(results.c.question_id == question_id,
+                                   results.c.answer_text == answer_text)
+    ).first() is not None
+
+# Function to serialize the transactions adding new answers to a question
+def _lock_question(connection, question_id):
+    if connection.dialect.name == 'postgresql':
+        questions = PollQuestion.__table__
+        connection.execute(select(questions.c.id).where(questions.c.id == question_id).with_for_update())
+    else:
+        lock_table(connection, PollResult.__table__)  # SQLite has a single database write lock
+
+# Function to record a vote and bump its tally atomically
+def cast_vote(poll_id, user_id, question_id, answer_text):
+    """Records a vote (raises ValueError if the poll is closed or the question is not in it)."""
+    poll = db.session.query(Poll.start_date, Poll.end_date).filter(Poll.id == poll_id).first()
+    if poll is None:
+        raise ValueError("Poll not found")
+    now = datetime.utcnow()
+    if (poll.start_date and now < poll.start_date) or now > poll.end_date:
+        raise ValueError("Poll is not open for voting")
+    in_poll = (db.session.query(PollQuestion.id)
+               .filter(PollQuestion.id == question_id, PollQuestion.poll_id == poll_id)
+               .first())
+    if in_poll is None:
+        raise ValueError("Question does not belong to this poll")
+    answer_text = (answer_text or '').strip()
+    if not answer_text:
+        raise ValueError("Answer is required")
+    if len(answer_text) > current_app.config.get('POLL_ANSWER_MAX_LENGTH', 255):
+        raise ValueError("Answer is too long")
+
+    try:
+        connection = db.session.connection()
+        if not _has_answer(connection, question_id, answer_text):
+            # A new answer: lock the question so concurrent new answers are counted one at a
+            # time and cannot push it past the cap
+            _lock_question(connection, question_id)
+            results = PollResult.__table__
+            answers = connection.execute(
+                select(func.count(results.c.id)).where(results.c.question_id == question_id)
+            ).scalar()
+            if answers >= current_app.config.get('POLL_MAX_ANSWERS', 50) and \
+                    not _has_answer(connection, question_id, answer_text):
+                raise ValueError("This question accepts no new answers")
+        connection.execute(PollVote.__table__.insert(), [{
+            'poll_id': poll_id, 'user_id': user_id,
+            'question_id': question_id, 'answer_text': answer_text,
+        }])
+        bump_tally(connection, poll_id, question_id, answer_text)
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        raise DuplicateVote("You have already voted on this question")
+    except Exception as e:
+        db.session.rollback()
+        raise e
+
+# Function to read the live results of a poll from the tallies
+def get_poll_results(poll_id):
+    """Returns {question_id: {answer_text: vote_count}}."""
+    results = {}
+    rows = (db.session.query(PollResult.question_id, PollResult.answer_text, PollResult.vote_count)
+            .filter(PollResult.poll_id == poll_id)
+            .order_by(PollResult.question_id, PollResult.vote_count.desc()))
+    for question_id, answer_text, vote_count in rows:
+        results.setdefault(question_id, {})[answer_text] = vote_count or 0
+    return results
+
+# Function to rebuild the tallies of one poll (or all polls) from the votes
+def reconcile_poll_results(poll_id=None):
+    """Recomputes poll_results from poll_votes; returns the number of tallies written."""
+    table = PollResult.__table__
+    votes = PollVote.__table__
+    tallies = (select(votes.c.poll_id, votes.c.question_id, votes.c.answer_text, func.count(votes.c.id))
+               .where(true())  # Keeps SQLite from reading ON CONFLICT as part of the SELECT
+               .group_by(votes.c.poll_id, votes.c.question_id, votes.c.answer_text))
+    reset = table.update().values(vote_count=0)
+    empty = table.delete().where(table.c.vote_count == 0)
+    if poll_id is not None:
+        tallies = tallies.where(votes.c.poll_id == poll_id)
+        reset = reset.where(table.c.poll_id == poll_id)
+        empty = empty.where(table.c.poll_id == poll_id)
+
+    try:
+        # Lock before counting: a vote either bumped and committed before the count, or
+        # bumps after the rebuilt tally commits
+        connection = db.session.connection()
+        lock_table(connection, table)
+        connection.execute(reset)
+
+        dialect = connection.dialect.name
+        if dialect in ('postgresql', 'sqlite'):
+            insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+            stmt = insert(table).from_select(['poll_id', 'question_id', 'answer_text', 'vote_count'], tallies)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=[table.c.question_id, table.c.answer_text],
+                set_={'vote_count': stmt.excluded.vote_count},
+            )
+            written = connection.execute(stmt).rowcount
+        else:
+            rows = connection.execute(tallies).all()
+            for row_poll_id, question_id, answer_text, count in rows:
+                bump_tally(connection, row_poll_id, question_id, answer_text, count)
+            written = len(rows)
+
+        connection.execute(empty)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+    return written
@@ -0,0 +1,136 @@
+#backend/utils/pool.py
+#
+# Database engine options and connection pool metrics.
+#
+# engine_options() turns the DB_* settings in config.py into SQLAlchemy engine options for a
+# database URI: pool size, overflow, checkout timeout, recycle, pre-ping and a per-statement
+# timeout. Server databases get an InstrumentedQueuePool, which records how long requests
+# wait to check out a connection and how often they time out; together with the checked-out
+# count this is exported through /admin/metrics to show pool saturation.
+
+import threading
+import time
+import weakref
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+from app.utils.metrics import LatencyHistogram, prometheus_histogram
+
+# Upper bounds (seconds) of the checkout wait histogram buckets
+CHECKOUT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 5.0, 30.0)
+
+
+class PoolMetrics:
+    """Checkout wait times, timeouts and live pools, keyed by pool name."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.pools = {}       # name -> weak reference to the current pool
+        self.waits = {}       # name -> LatencyHistogram of checkout waits
+        self.timeouts = {}    # name -> checkouts that gave up after pool_timeout
+
+    def register(self, name, pool):
+        with self.lock:
+            self.pools[name] = weakref.ref(pool)
+            self.waits.setdefault(name, LatencyHistogram(CHECKOUT_BUCKETS))
+            self.timeouts.setdefault(name, 0)
+
+    def observe(self, name, seconds, timed_out=False):
+        self.waits[name].observe(seconds)
+        if timed_out:
+            with self.lock:
+                self.timeouts[name] += 1
+
+    def snapshot(self):
+        """Returns the current state of every pool."""
+        with self.lock:
+            pools = {name: ref() for name, ref in self.pools.items()}
+        result = {}
+        for name, pool in pools.items():
+            if pool is None:
+                continue
+            capacity = pool.size() + max(pool._max_overflow, 0)
+            checked_out = pool.checkedout()
+            result[name] = {
+                'size': pool.size(),
+                'capacity': capacity,
+                'checked_out': checked_out,
+                'overflow': max(pool.overflow(), 0),
+                'saturation': checked_out / capacity if capacity else 0.0,
+                'timeouts': self.timeouts[name],
+                'checkout_wait': self.waits[name].snapshot(),
+            }
+        return result
+
+    def prometheus_lines(self):
+        """Returns the pool metrics as Prometheus text lines."""
+        snapshot = self.snapshot()
+        lines = []
+        gauges = [
+            ('uap_db_pool_checked_out', 'checked_out', 'gauge', 'Connections currently checked out'),
+            ('uap_db_pool_capacity', 'capacity', 'gauge', 'Pool size plus maximum overflow'),
+            ('uap_db_pool_saturation', 'saturation', 'gauge', 'Checked-out connections as a fraction of capacity'),
+            ('uap_db_pool_timeouts_total', 'timeouts', 'counter', 'Checkouts that timed out waiting for a connection'),
+        ]
+        for name, key, kind, description in gauges:
+            lines.append(f'# HELP {name} {description}.')
+            lines.append(f'# TYPE {name} {kind}')
+            for pool_name, state in snapshot.items():
+                lines.append(f'{name}{{pool="{pool_name}"}} {state[key]}')
+        lines.append('# HELP uap_db_pool_checkout_wait_seconds Time spent waiting to check out a connection.')
+        lines.append('# TYPE uap_db_pool_checkout_wait_seconds histogram')
+        for pool_name, state in snapshot.items():
+            prometheus_histogram(lines, 'uap_db_pool_checkout_wait_seconds', {'pool': pool_name}, state['checkout_wait'])
+        return lines
+
+
+pool_metrics = PoolMetrics()
+
+
+class InstrumentedQueuePool(QueuePool):
+    """QueuePool that reports checkout waits and timeouts to pool_metrics."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.metrics_name = self._orig_logging_name or 'primary'
+        pool_metrics.register(self.metrics_name, self)
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_metrics.observe(self.metrics_name, time.perf_counter() - start, timed_out=True)
+            raise
+        pool_metrics.observe(self.metrics_name, time.perf_counter() - start)
+        return connection
+
+
+# Function to build the SQLAlchemy engine options for a database URI from the app config
+def engine_options(config, uri, name='primary'):
+    backend = make_url(uri).get_backend_name()
+    options = {
+        'pool_pre_ping': config.get('DB_POOL_PRE_PING', True),
+        'pool_logging_name': name,
+    }
+    if config.get('DB_POOL_RECYCLE'):
+        options['pool_recycle'] = config['DB_POOL_RECYCLE']
+    if backend == 'sqlite':
+        # SQLite picks its own pool class; size, overflow and statement timeouts do not apply
+        return options
+
+    options.update(
+        poolclass=InstrumentedQueuePool,
+        pool_size=config.get('DB_POOL_SIZE', 10),
+        max_overflow=config.get('DB_MAX_OVERFLOW', 20),
+        pool_timeout=config.get('DB_POOL_TIMEOUT', 30),
+    )
+    timeout = config.get('DB_STATEMENT_TIMEOUT')
+    if timeout:
+        if backend == 'postgresql':
+            options['connect_args'] = {'options': f'-c statement_timeout={int(timeout)}'}
+        elif backend == 'mysql':
+            options['connect_args'] = {'init_command': f'SET SESSION max_execution_time={int(timeout)}'}
+    return options
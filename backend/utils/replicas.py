@@ -0,0 +1,252 @@
+#backend/utils/replicas.py
+#
+# Read-replica routing.
+#
+# db uses RoutingSession, which sends plain SELECTs issued while handling a read-only request
+# to one of the SQLALCHEMY_REPLICA_URIS engines, in round-robin order. A request is read-only
+# when it is a GET/HEAD to a blueprint listed in REPLICA_READ_BLUEPRINTS, or its view is
+# decorated with @use_replica (and not @use_primary). Everything else stays on the primary:
+# flushes, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE, reads after the request has written,
+# and code wrapped in on_primary().
+#
+# Read-your-writes: a successful write request sets a short-lived cookie (and, for
+# authenticated users, an in-process marker), and the client's reads go to the primary until
+# it expires, so users see their own changes despite replication lag.
+#
+# Replicas whose connections fail are taken out of rotation and re-admitted once a
+# `SELECT 1` succeeds. The ping runs in a background thread, at most one per replica and at
+# most every REPLICA_HEALTH_CHECK_INTERVAL seconds, so requests never wait on a dead host.
+# With no healthy replica, reads fall back to the primary.
+
+import itertools
+import threading
+import time
+from contextlib import contextmanager
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy.session import Session
+from sqlalchemy import create_engine, event, text
+
+# Cookie marking a client that wrote recently
+READ_YOUR_WRITES_COOKIE = 'uap_primary_until'
+
+# Marker for "no replica chosen yet in this request" (None means the primary)
+_UNCHOSEN = object()
+
+WRITE_METHODS = {'POST', 'PUT', 'PATCH', 'DELETE'}
+
+
+# Decorator routing a view's reads to a replica
+def use_replica(f):
+    f.use_replica = True
+    return f
+
+# Decorator keeping a view's reads on the primary
+def use_primary(f):
+    f.use_replica = False
+    return f
+
+# Context manager keeping reads on the primary, e.g. for data that must not lag
+@contextmanager
+def on_primary():
+    if not has_request_context():
+        yield
+        return
+    previous = g.get('use_replica', False)
+    g.use_replica = False
+    try:
+        yield
+    finally:
+        g.use_replica = previous
+
+
+class Replica:
+    """A replica engine and its health."""
+
+    def __init__(self, name, engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = True
+        self.retry_at = 0.0
+        self.checking = False
+        self.reads = 0
+
+
+class ReplicaSet:
+    """Round-robin selection over the healthy replicas."""
+
+    def __init__(self, replicas, check_interval):
+        self.replicas = replicas
+        self.check_interval = check_interval
+        self.cycle = itertools.cycle(replicas)
+        self.lock = threading.Lock()
+        self.primary_fallbacks = 0
+        for replica in replicas:
+            event.listen(replica.engine, 'handle_error', self._on_error(replica))
+
+    def _on_error(self, replica):
+        def handle_error(context):
+            if context.is_disconnect:
+                self.mark_unhealthy(replica, context.original_exception)
+        return handle_error
+
+    def mark_unhealthy(self, replica, error):
+        with self.lock:
+            replica.healthy = False
+            replica.retry_at = time.monotonic() + self.check_interval
+        current_app.logger.warning(f"Replica {replica.name} taken out of rotation: {error}")
+
+    def check(self, replica, app):
+        """Pings an unhealthy replica and re-admits it if it answers (runs in a background thread)."""
+        try:
+            with replica.engine.connect() as connection:
+                connection.execute(text('SELECT 1'))
+        except Exception as e:
+            with self.lock:
+                replica.retry_at = time.monotonic() + self.check_interval
+                replica.checking = False
+            app.logger.warning(f"Replica {replica.name} still unavailable: {e}")
+            return False
+        with self.lock:
+            replica.healthy = True
+            replica.checking = False
+        app.logger.info(f"Replica {replica.name} back in rotation")
+        return True
+
+    def choose(self):
+        """Returns the next healthy replica, or None."""
+        due = []
+        chosen = None
+        with self.lock:
+            for _ in range(len(self.replicas)):
+                replica = next(self.cycle)
+                if replica.healthy:
+                    replica.reads += 1
+                    chosen = replica
+                    break
+                if not replica.checking and time.monotonic() >= replica.retry_at:
+                    replica.checking = True
+                    due.append(replica)
+            if chosen is None:
+                self.primary_fallbacks += 1
+        app = current_app._get_current_object()
+        for replica in due:
+            threading.Thread(target=self.check, args=(replica, app), name=f'{replica.name}-check', daemon=True).start()
+        return chosen
+
+    def prometheus_lines(self):
+        """Returns replica health and routing counters as Prometheus text lines."""
+        lines = [
+            '# HELP uap_db_replica_up Whether a replica is in rotation.',
+            '# TYPE uap_db_replica_up gauge',
+        ]
+        lines.extend(f'uap_db_replica_up{{replica="{r.name}"}} {int(r.healthy)}' for r in self.replicas)
+        lines.append('# HELP uap_db_replica_reads_total Replica selections for read-only requests.')
+        lines.append('# TYPE uap_db_replica_reads_total counter')
+        lines.extend(f'uap_db_replica_reads_total{{replica="{r.name}"}} {r.reads}' for r in self.replicas)
+        lines.append('# HELP uap_db_replica_fallbacks_total Reads sent to the primary because no replica was healthy.')
+        lines.append('# TYPE uap_db_replica_fallbacks_total counter')
+        lines.append(f'uap_db_replica_fallbacks_total {self.primary_fallbacks}')
+        return lines
+
+
+class RoutingSession(Session):
+    """Session sending reads of read-only requests to a replica."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if self._flushing or not _is_plain_select(clause):
+            self.info['wrote'] = True
+        elif bind is None and not self.info.get('wrote') and has_request_context():
+            replicas = current_app.extensions.get('replica_router')
+            if replicas is not None and _reads_from_replica():
+                # One replica per request: the first read picks it, later reads reuse it
+                replica = g.get('replica', _UNCHOSEN)
+                if replica is _UNCHOSEN:
+                    replica = g.replica = replicas.choose()
+                if replica is not None and replica.healthy:
+                    return replica.engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+# Function to check whether a statement is a SELECT without row locks
+def _is_plain_select(clause):
+    return clause is not None and getattr(clause, 'is_select', False) and getattr(clause, '_for_update_arg', None) is None
+
+# Function to check whether the current request may read from a replica
+def _reads_from_replica():
+    if not g.get('use_replica', False):
+        return False
+    user = g.get('current_user')
+    if user is not None and replica_router.wrote_recently(user.id):
+        return False
+    return True
+
+
+class ReplicaRouter:
+    """Flask extension creating the replica engines and the per-request routing decision."""
+
+    def __init__(self, app=None):
+        self.recent_writers = {}  # user id -> time until which their reads use the primary
+        self.lock = threading.Lock()
+        self.window = 5
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        uris = app.config.get('SQLALCHEMY_REPLICA_URIS') or []
+        if not uris:
+            return
+        # Imported here so app.py can import RoutingSession before db exists
+        from app.utils.pool import engine_options
+
+        self.window = app.config.get('REPLICA_READ_YOUR_WRITES_WINDOW', 5)
+        self.blueprints = set(app.config.get('REPLICA_READ_BLUEPRINTS', ()))
+        replicas = []
+        for i, uri in enumerate(uris):
+            name = f'replica-{i}'
+            replicas.append(Replica(name, create_engine(uri, **engine_options(app.config, uri, name))))
+        replica_set = ReplicaSet(replicas, app.config.get('REPLICA_HEALTH_CHECK_INTERVAL', 10))
+        app.extensions['replica_router'] = replica_set
+        app.before_request(self._route_request)
+        app.after_request(self._remember_write)
+
+        from app.utils.metrics import request_metrics
+        request_metrics.register_collector(replica_set.prometheus_lines)
+
+    def wrote_recently(self, user_id):
+        with self.lock:
+            return self.recent_writers.get(user_id, 0) > time.time()
+
+    def _route_request(self):
+        g.use_replica = False
+        if request.method not in ('GET', 'HEAD'):
+            return
+        view = current_app.view_functions.get(request.endpoint)
+        marked = getattr(view, 'use_replica', None)
+        if marked is None:
+            marked = request.blueprint in self.blueprints
+        if not marked:
+            return
+        try:
+            if float(request.cookies.get(READ_YOUR_WRITES_COOKIE, 0)) > time.time():
+                return
+        except ValueError:
+            pass
+        g.use_replica = True
+
+    def _remember_write(self, response):
+        if request.method in WRITE_METHODS and response.status_code < 400:
+            until = time.time() + self.window
+            response.set_cookie(READ_YOUR_WRITES_COOKIE, str(until), max_age=self.window,
+                                httponly=True, samesite='Lax')
+            user = g.get('current_user')
+            if user is not None:
+                with self.lock:
+                    self.recent_writers[user.id] = until
+                    if len(self.recent_writers) > 10000:
+                        now = time.time()
+                        self.recent_writers = {k: v for k, v in self.recent_writers.items() if v > now}
+        return response
+
+
+replica_router = ReplicaRouter()
@@ -0,0 +1,211 @@
+#backend/utils/response_cache.py
+#
+# Response cache with ETags for rarely changing catalog endpoints.
+#
+# Views decorated with @cached_response(Model) are cached per route and query string. Each
+# cached table has a version counter (stat_counters scope 'table_version') that every flush
+# touching the table bumps in the same transaction, and the version is part of both the cache
+# key and the strong ETag. A request whose If-None-Match matches the current ETag gets a 304
+# without running the view or querying the database; other hits are served from the cache
+# backend. Versions are re-read from the database at most every TABLE_VERSION_REFRESH_INTERVAL
+# seconds per process, and immediately after a local commit that changed a cached table.
+#
+# Backends: 'memory' (per-process LRU) or 'redis' (any Redis-compatible server, shared by
+# all workers; needs the redis package).
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from functools import wraps
+
+from flask import Response, make_response, request
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import StatCounter
+from app.utils.replicas import on_primary
+from app.utils.stats import bump_counters
+
+# stat_counters scope holding the table versions
+VERSION_SCOPE = 'table_version'
+
+# Tables whose responses are cached (and whose writes bump a version)
+CACHED_TABLES = set()
+
+
+class MemoryCacheBackend:
+    """Thread-safe in-process LRU cache."""
+
+    def __init__(self, max_entries=1024):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        with self.lock:
+            self.entries[key] = value
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+
+class RedisCacheBackend:
+    """Cache stored in a Redis-compatible server."""
+
+    def __init__(self, url, prefix='uap:response:'):
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("RESPONSE_CACHE_BACKEND 'redis' requires the redis package")
+        self.client = redis.Redis.from_url(url)
+        self.prefix = prefix
+
+    def get(self, key):
+        return self.client.get(self.prefix + key)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.prefix + key, value, ex=ttl)
+
+    def clear(self):
+        for key in self.client.scan_iter(self.prefix + '*'):
+            self.client.delete(key)
+
+
+class TableVersions:
+    """Per-process view of the table version counters."""
+
+    def __init__(self, refresh_interval=1):
+        self.refresh_interval = refresh_interval
+        self.versions = {}
+        self.next_refresh = 0.0
+        self.lock = threading.Lock()
+
+    def get(self, table):
+        if time.monotonic() >= self.next_refresh:
+            with self.lock:
+                if time.monotonic() >= self.next_refresh:
+                    self._refresh()
+        return self.versions.get(table, 0)
+
+    def _refresh(self):
+        with on_primary():
+            rows = (db.session.query(StatCounter.bucket, StatCounter.value)
+                    .filter(StatCounter.scope == VERSION_SCOPE)
+                    .all())
+        self.versions = dict(rows)
+        self.next_refresh = time.monotonic() + self.refresh_interval
+
+    def expire(self):
+        self.next_refresh = 0.0
+
+
+table_versions = TableVersions()
+
+
+# Function to bump table versions in a session's transaction (for Core writes the hooks miss)
+def bump_table_versions(session, tables):
+    bump_counters(session.connection(), {(VERSION_SCOPE, table): 1 for table in tables})
+    session.info['table_versions_bumped'] = True
+
+# Session hooks: bump the versions of cached tables written by a flush, re-read them on commit
+def _on_flush(session, flush_context):
+    tables = set()
+    for obj in session.new | session.deleted:
+        tables.add(obj.__table__.name)
+    for obj in session.dirty:
+        if session.is_modified(obj):
+            tables.add(obj.__table__.name)
+    tables &= CACHED_TABLES
+    if tables:
+        bump_counters(session.connection(), {(VERSION_SCOPE, table): 1 for table in tables})
+        session.info['table_versions_bumped'] = True
+
+def _on_commit(session):
+    if session.info.pop('table_versions_bumped', False):
+        table_versions.expire()
+
+def _on_rollback(session, previous_transaction):
+    session.info.pop('table_versions_bumped', None)
+
+# Function to build the cache key of the current request
+def _request_key():
+    args = '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+    return f'{request.path}?{args}'
+
+
+# Decorator caching a view's successful responses until the model's table changes
+def cached_response(model):
+    table = model.__tablename__
+    CACHED_TABLES.add(table)
+
+    def decorator(f):
+        @wraps(f)
+        def decorated(*args, **kwargs):
+            version = table_versions.get(table)
+            key = f'{table}:{version}:{_request_key()}'
+            etag = hashlib.sha1(key.encode()).hexdigest()
+
+            if request.if_none_match.contains(etag):
+                response = Response(status=304)
+                response.set_etag(etag)
+                return response
+
+            cached = response_cache.backend.get(key)
+            if cached is not None:
+                mimetype, _, body = cached.partition(b'\n')
+                response = Response(body, mimetype=mimetype.decode())
+            else:
+                # Read on the primary so a lagging replica cannot be cached under the new version
+                with on_primary():
+                    response = make_response(f(*args, **kwargs))
+                if response.status_code != 200 or response.is_streamed:
+                    return response
+                response_cache.backend.set(key, response.mimetype.encode() + b'\n' + response.get_data(),
+                                           response_cache.ttl)
+            response.set_etag(etag)
+            response.headers['Cache-Control'] = 'no-cache'
+            return response
+        return decorated
+    return decorator
+
+
+class ResponseCache:
+    """Flask extension configuring the cache backend and the version hooks."""
+
+    def __init__(self, app=None):
+        self.backend = MemoryCacheBackend()
+        self.ttl = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        backend = app.config.get('RESPONSE_CACHE_BACKEND', 'memory')
+        if backend == 'redis':
+            self.backend = RedisCacheBackend(app.config['RESPONSE_CACHE_URL'])
+        elif backend == 'memory':
+            self.backend = MemoryCacheBackend(app.config.get('RESPONSE_CACHE_SIZE', 1024))
+        else:
+            raise ValueError(f"Unknown RESPONSE_CACHE_BACKEND: {backend}")
+        self.ttl = app.config.get('RESPONSE_CACHE_TTL')
+        table_versions.refresh_interval = app.config.get('TABLE_VERSION_REFRESH_INTERVAL', 1)
+        if not event.contains(Session, 'after_flush', _on_flush):
+            event.listen(Session, 'after_flush', _on_flush)
+            event.listen(Session, 'after_commit', _on_commit)
+            event.listen(Session, 'after_soft_rollback', _on_rollback)
+        app.extensions['response_cache'] = self
+
+
+response_cache = ResponseCache()
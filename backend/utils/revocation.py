@@ -0,0 +1,178 @@
+#backend/utils/revocation.py
+#
+# Shared revoked-token denylist.
+#
+# Revoked token IDs (JWT `jti` claims) are stored in the revoked_tokens table until the token
+# would have expired anyway. Each worker process keeps a Bloom filter of the revoked IDs, so
+# the common "not revoked" answer costs a few hash computations and no database query; only
+# a Bloom filter hit is confirmed against the table. A maintenance thread per process
+# refreshes the filter incrementally from a high-water mark on revoked_at every
+# REVOCATION_REFRESH_INTERVAL seconds, and prunes expired rows (rebuilding the filter) every
+# REVOCATION_PRUNE_INTERVAL seconds, with its own session; requests never run maintenance
+# and never commit. Until the first filter is loaded, lookups go to the table directly.
+
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+from sqlalchemy.exc import IntegrityError
+
+from app import db
+from app.models import RevokedToken
+
+# Overlap applied to the high-water mark so rows committed out of revoked_at order are not missed
+REFRESH_LOOKBACK = timedelta(seconds=30)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings."""
+
+    def __init__(self, capacity, error_rate):
+        self.capacity = max(int(capacity), 1)
+        self.error_rate = error_rate
+        self.size = max(int(-self.capacity * math.log(error_rate) / math.log(2) ** 2), 8)
+        self.hashes = max(int(round(self.size / self.capacity * math.log(2))), 1)
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, value):
+        digest = hashlib.blake2b(value.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        return [(h1 + i * h2) % self.size for i in range(self.hashes)]
+
+    def add(self, value):
+        if value in self:
+            return
+        for position in self._positions(value):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, value):
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(value))
+
+
+class RevocationList:
+    """Per-process view of the revoked_tokens table."""
+
+    def __init__(self):
+        self.app = None
+        self.capacity = 100000
+        self.error_rate = 0.001
+        self.refresh_interval = 2
+        self.prune_interval = 3600
+        self.lock = threading.Lock()
+        self.bloom = None
+        self.high_water = None
+        self.next_prune = 0.0
+        self.db_checks = 0
+        self.thread = None
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        # The maintenance thread belongs to the parent
+        self.lock = threading.Lock()
+        self.thread = None
+
+    def configure(self, capacity, error_rate, refresh_interval, prune_interval):
+        with self.lock:
+            self.capacity = capacity
+            self.error_rate = error_rate
+            self.refresh_interval = refresh_interval
+            self.prune_interval = prune_interval
+            self.bloom = None
+
+    def _rebuild(self):
+        now = datetime.utcnow()
+        rows = (db.session.query(RevokedToken.jti, RevokedToken.revoked_at)
+                .filter(RevokedToken.expires_at > now)
+                .all())
+        bloom = BloomFilter(max(self.capacity, 2 * len(rows)), self.error_rate)
+        high_water = None
+        for jti, revoked_at in rows:
+            bloom.add(jti)
+            if high_water is None or revoked_at > high_water:
+                high_water = revoked_at
+        self.bloom = bloom
+        self.high_water = high_water
+
+    def _refresh(self):
+        if self.bloom is None:
+            self._rebuild()
+            return
+        query = db.session.query(RevokedToken.jti, RevokedToken.revoked_at)
+        if self.high_water is not None:
+            query = query.filter(RevokedToken.revoked_at >= self.high_water - REFRESH_LOOKBACK)
+        for jti, revoked_at in query:
+            self.bloom.add(jti)
+            if self.high_water is None or revoked_at > self.high_water:
+                self.high_water = revoked_at
+        if self.bloom.count > self.bloom.capacity:
+            self._rebuild()  # Resize before the false-positive rate degrades
+
+    def _ensure_thread(self):
+        if self.thread is not None or self.app is None:
+            return
+        with self.lock:
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._maintain, name='revocation-maintenance', daemon=True)
+                self.thread.start()
+
+    def _maintain(self):
+        # Runs in the maintenance thread, with a session of its own
+        while True:
+            with self.app.app_context():
+                try:
+                    with self.lock:
+                        now = time.monotonic()
+                        if now >= self.next_prune:
+                            self.prune()
+                            self.next_prune = now + self.prune_interval
+                        else:
+                            self._refresh()
+                except Exception as e:
+                    self.app.logger.error(f"Revocation list maintenance failed: {e}")
+                finally:
+                    db.session.remove()
+            time.sleep(self.refresh_interval)
+
+    def prune(self):
+        """Deletes expired rows and rebuilds the filter from the remaining ones."""
+        try:
+            RevokedToken.query.filter(RevokedToken.expires_at <= datetime.utcnow()).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception:
+            db.session.rollback()
+            raise
+        self._rebuild()
+
+    def _in_table(self, jti):
+        self.db_checks += 1
+        return db.session.query(RevokedToken.id).filter(RevokedToken.jti == jti).first() is not None
+
+    def is_revoked(self, jti):
+        """Returns whether a token ID is revoked; queries the database only on Bloom filter hits."""
+        self._ensure_thread()
+        bloom = self.bloom
+        if bloom is not None and jti not in bloom:
+            return False
+        return self._in_table(jti)
+
+    def revoke(self, jti, user_id, expires_at):
+        """Records a revoked token ID until it expires."""
+        try:
+            db.session.add(RevokedToken(jti=jti, user_id=user_id, expires_at=expires_at))
+            db.session.commit()
+        except IntegrityError:
+            db.session.rollback()  # Already revoked
+        self._ensure_thread()
+        bloom = self.bloom
+        if bloom is not None:
+            bloom.add(jti)
+
+
+revocation_list = RevocationList()
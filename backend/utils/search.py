@@ -0,0 +1,281 @@
+#backend/utils/search.py
+#
+# Search engine layer used by the search and admin blueprints.
+#
+# Text search over institutions, applications and users goes through a pluggable backend:
+# a pg_trgm GIN index when running on PostgreSQL, or an in-process trigram inverted index
+# for SQLite and development. Both backends match case-insensitive substrings (the same
+# semantics as the old ILIKE filters) and rank matches by pg_trgm similarity, so they
+# return the same ranked results. The in-process index is built by one background thread on
+# first use and kept current with the writes committed by its own process (see
+# utils/live_index.py); writes from other workers or bulk SQL show up after the full rebuild
+# started every SEARCH_REBUILD_INTERVAL seconds while the previous index keeps serving.
+
+import heapq
+import re
+import time
+from collections import defaultdict
+
+from sqlalchemy import func, or_, text
+
+from app import db
+from app.models import User, Institution, Application, SERIALIZERS
+from app.utils.fuzzy import FUZZY_FIELDS, fuzzy_index
+from app.utils.live_index import LiveIndex
+
+# Columns indexed for each searchable model
+SEARCH_FIELDS = {
+    Institution: ('name', 'location'),
+    Application: ('program',),
+    User: ('username', 'email'),
+}
+
+# pg_trgm treats runs of alphanumerics as words
+_WORD_RE = re.compile(r'[^\W_]+')
+
+
+# Function to extract the trigram set pg_trgm would build for a string
+def trigrams(value):
+    """Returns the pg_trgm trigram set of a string."""
+    grams = set()
+    for word in _WORD_RE.findall(value.lower()):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+# Function to compute pg_trgm similarity between two trigram sets
+def trigram_similarity(grams_a, grams_b):
+    """Returns shared trigrams over the union, as pg_trgm's similarity() does."""
+    if not grams_a or not grams_b:
+        return 0.0
+    shared = len(grams_a & grams_b)
+    return shared / (len(grams_a) + len(grams_b) - shared)
+
+# Function to list the raw 3-character windows of a lowercased string
+def _windows(value):
+    return {value[i:i + 3] for i in range(len(value) - 2)}
+
+# Function to check whether a request asked for typo-tolerant matching (?fuzzy=1)
+def wants_fuzzy(args):
+    return args.get('fuzzy', '').lower() in ('1', 'true', 'yes')
+
+# Function to escape LIKE wildcards so the query is matched literally
+def _escape_like(query):
+    return query.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+
+
+class NgramIndex:
+    """In-process trigram inverted index over the searchable columns of one model."""
+
+    def __init__(self, fields):
+        self.fields = fields
+        self.rows = {}                      # row id -> tuple of field values
+        self.value_rows = defaultdict(set)  # lowercased value -> row ids
+        self.postings = defaultdict(set)    # 3-char window -> lowercased values
+
+    def add(self, row_id, values):
+        self.remove(row_id)
+        self.rows[row_id] = values
+        for key in {value.lower() for value in values if value}:
+            if key not in self.value_rows:
+                for gram in _windows(key):
+                    self.postings[gram].add(key)
+            self.value_rows[key].add(row_id)
+
+    def remove(self, row_id):
+        values = self.rows.pop(row_id, None)
+        if values is None:
+            return
+        for key in {value.lower() for value in values if value}:
+            row_ids = self.value_rows.get(key)
+            if row_ids is None:
+                continue
+            row_ids.discard(row_id)
+            if row_ids:
+                continue
+            del self.value_rows[key]
+            for gram in _windows(key):
+                keys = self.postings.get(gram)
+                if keys is not None:
+                    keys.discard(key)
+                    if not keys:
+                        del self.postings[gram]
+
+    def search(self, query, limit):
+        """Returns up to `limit` row ids containing the query, best match first."""
+        needle = query.lower()
+        if len(needle) >= 3:
+            # Every window of the query must occur in a matching value, so only values
+            # on the shortest posting lists are ever looked at.
+            lists = sorted((self.postings.get(gram, ()) for gram in _windows(needle)), key=len)
+            if not lists[0]:
+                return []
+            candidates = set(lists[0]).intersection(*lists[1:])
+        else:
+            candidates = self.value_rows.keys()
+
+        matched = set()
+        for key in candidates:
+            if needle in key:
+                matched.update(self.value_rows[key])
+
+        query_grams = trigrams(query)
+        scores = {}
+
+        def score(value):
+            if not value:
+                return 0.0
+            if value not in scores:
+                scores[value] = trigram_similarity(query_grams, trigrams(value))
+            return scores[value]
+
+        return heapq.nsmallest(
+            limit, matched,
+            key=lambda row_id: (-max(score(value) for value in self.rows[row_id]), row_id)
+        )
+
+
+class NgramSearchBackend(LiveIndex):
+    """Serves searches from per-process trigram indexes kept in sync with committed writes."""
+
+    name = 'ngram'
+    changes_key = 'search_index_changes'
+
+    def __init__(self):
+        super().__init__()
+        self.rebuild_interval = 300
+        self.listen()
+
+    def load(self):
+        indexes = {}
+        for model, fields in SEARCH_FIELDS.items():
+            index = NgramIndex(fields)
+            columns = [getattr(model, field) for field in fields]
+            for row in db.session.query(model.id, *columns).yield_per(1000):
+                index.add(row[0], tuple(row[1:]))
+            indexes[model] = index
+        return indexes
+
+    def apply(self, indexes, changes):
+        for model, row_id, values in changes:
+            if values is None:
+                indexes[model].remove(row_id)
+            else:
+                indexes[model].add(row_id, values)
+
+    def create_indexes(self):
+        self.build()
+
+    def search(self, model, query, limit):
+        indexes = self.current()
+        if indexes is None:
+            raise RuntimeError("The search index could not be built")
+        if time.monotonic() - self.built_at > self.rebuild_interval:
+            self.refresh()  # Catches up with writes made by other processes
+        with self.lock:
+            ids = indexes[model].search(query, limit)
+        if not ids:
+            return []
+        rows = {row.id: row for row in SERIALIZERS[model].query().filter(model.id.in_(ids))}
+        return [rows[row_id] for row_id in ids if row_id in rows]
+
+    def _record_changes(self, session, flush_context):
+        changes = session.info.setdefault(self.changes_key, [])
+        for obj in session.new | session.dirty:
+            fields = SEARCH_FIELDS.get(type(obj))
+            if fields:
+                changes.append((type(obj), obj.id, tuple(getattr(obj, f) for f in fields)))
+        for obj in session.deleted:
+            if type(obj) in SEARCH_FIELDS:
+                changes.append((type(obj), obj.id, None))
+
+
+class PostgresTrigramSearchBackend:
+    """Serves searches from pg_trgm GIN indexes; ILIKE '%q%' can use them directly."""
+
+    name = 'postgres'
+
+    def invalidate(self):
+        pass  # The database maintains its own indexes
+
+    def create_indexes(self):
+        db.session.execute(text('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+        for model, fields in SEARCH_FIELDS.items():
+            table = model.__tablename__
+            for field in fields:
+                db.session.execute(text(
+                    f'CREATE INDEX IF NOT EXISTS ix_{table}_{field}_trgm '
+                    f'ON {table} USING gin ({field} gin_trgm_ops)'
+                ))
+        db.session.commit()
+
+    def search(self, model, query, limit):
+        columns = [getattr(model, field) for field in SEARCH_FIELDS[model]]
+        pattern = f'%{_escape_like(query)}%'
+        scores = [func.similarity(column, query) for column in columns]
+        rank = scores[0] if len(scores) == 1 else func.greatest(*scores)
+        return (SERIALIZERS[model].query()
+                .filter(or_(*[column.ilike(pattern, escape='\\') for column in columns]))
+                .order_by(rank.desc(), model.id)
+                .limit(limit)
+                .all())
+
+
+BACKENDS = {
+    NgramSearchBackend.name: NgramSearchBackend,
+    PostgresTrigramSearchBackend.name: PostgresTrigramSearchBackend,
+}
+
+
+class SearchEngine:
+    """Flask extension choosing a search backend from SEARCH_BACKEND ('auto', 'postgres', 'ngram')."""
+
+    def __init__(self, app=None):
+        self.backend = None
+        self.limit = 50
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        name = app.config.get('SEARCH_BACKEND', 'auto')
+        if name == 'auto':
+            uri = app.config.get('SQLALCHEMY_DATABASE_URI', '')
+            name = 'postgres' if uri.startswith('postgresql') else 'ngram'
+        if name not in BACKENDS:
+            raise ValueError(f"Unknown search backend: {name}")
+        if isinstance(self.backend, LiveIndex):
+            self.backend.unlisten()  # Its hooks would take the changes staged for the new one
+        self.backend = BACKENDS[name]()
+        self.backend.app = app
+        if isinstance(self.backend, LiveIndex):
+            self.backend.rebuild_interval = app.config.get('SEARCH_REBUILD_INTERVAL', self.backend.rebuild_interval)
+        self.limit = app.config.get('SEARCH_RESULT_LIMIT', self.limit)
+        fuzzy_index.init_app(app)
+        app.extensions['search_engine'] = self
+
+        @app.cli.command('create-search-indexes')
+        def create_search_indexes():
+            """Create the trigram indexes (or rebuild the in-process index)."""
+            self.backend.create_indexes()
+            print(f"Search indexes ready ({self.backend.name} backend).")
+
+    def invalidate(self):
+        """Discards any in-process index state after writes made outside the ORM."""
+        if self.backend is not None:
+            self.backend.invalidate()
+        fuzzy_index.invalidate()
+
+    def search(self, model, query, limit=None, fuzzy=False):
+        """Returns serializer row tuples of the matching rows, best match first.
+
+        With fuzzy=True, users and institutions are matched by edit distance (utils/fuzzy.py).
+        """
+        if fuzzy and model in FUZZY_FIELDS:
+            rows = fuzzy_index.search(model, query, limit or self.limit)
+            if rows is not None:
+                return rows
+            # The fuzzy index is still being built; answer with substring matches meanwhile
+        return self.backend.search(model, query, limit or self.limit)
+
+
+search_engine = SearchEngine()
@@ -0,0 +1,264 @@
+#backend/utils/stats.py
+#
+# Materialized system statistics.
+#
+# Row counts are kept in the stat_counters table instead of being recomputed with COUNT(*).
+# Every flush that inserts, deletes or updates users, institutions or applications bumps the
+# matching counters inside the same transaction, so the counters commit or roll back together
+# with the rows they describe. Applications are additionally counted per status, per
+# institution and per program. A reconciliation job recomputes every counter from the base
+# tables to repair drift from writes that bypass the ORM; it locks stat_counters first and
+# then upserts the recomputed values, so bumps made while it runs are not lost. Rows that
+# predate the counters are counted by migration 6f2a9c4e8b15.
+
+import threading
+import time
+
+import click
+from sqlalchemy import event, false, func, inspect, text
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app import db
+from app.models import User, Institution, Application, StatCounter
+
+# Scopes whose totals are tracked for each model
+TOTAL_SCOPES = {
+    User: 'users',
+    Institution: 'institutions',
+    Application: 'applications',
+}
+
+# Application columns broken down into per-value counters
+APPLICATION_BREAKDOWNS = {
+    'status': 'applications.status',
+    'institution_id': 'applications.institution',
+    'program': 'applications.program',
+}
+
+
+# Function to compute the counter buckets of an application's column values
+def _application_buckets(values):
+    buckets = []
+    for field, scope in APPLICATION_BREAKDOWNS.items():
+        value = values.get(field)
+        if field == 'status' and value is None:
+            value = 'pending'
+        if value is not None:
+            buckets.append((scope, str(value)))
+    return buckets
+
+# Function to add a delta to a counter in a dict of pending deltas
+def _add(deltas, scope, bucket, delta):
+    key = (scope, bucket)
+    deltas[key] = deltas.get(key, 0) + delta
+
+# Function to collect counter deltas for the objects of one flush
+def collect_deltas(session):
+    deltas = {}
+    for obj in session.new:
+        scope = TOTAL_SCOPES.get(type(obj))
+        if scope is None:
+            continue
+        _add(deltas, scope, '', 1)
+        if isinstance(obj, Application):
+            values = {field: getattr(obj, field) for field in APPLICATION_BREAKDOWNS}
+            for bucket in _application_buckets(values):
+                _add(deltas, *bucket, 1)
+
+    for obj in session.deleted:
+        scope = TOTAL_SCOPES.get(type(obj))
+        if scope is None:
+            continue
+        _add(deltas, scope, '', -1)
+        if isinstance(obj, Application):
+            state = inspect(obj)
+            values = {}
+            for field in APPLICATION_BREAKDOWNS:
+                history = state.attrs[field].history
+                values[field] = history.deleted[0] if history.deleted else getattr(obj, field)
+            for bucket in _application_buckets(values):
+                _add(deltas, *bucket, -1)
+
+    for obj in session.dirty:
+        if not isinstance(obj, Application):
+            continue
+        state = inspect(obj)
+        for field, scope in APPLICATION_BREAKDOWNS.items():
+            history = state.attrs[field].history
+            # The previous value is loaded on assignment (see _keep_previous_value); without
+            # it there is nothing safe to decrement, and reconciliation repairs the counter.
+            if not history.added or not history.deleted:
+                continue
+            old, new = history.deleted[0], history.added[0]
+            if old != new:
+                if old is not None:
+                    _add(deltas, scope, str(old), -1)
+                if new is not None:
+                    _add(deltas, scope, str(new), 1)
+
+    return {key: delta for key, delta in deltas.items() if delta}
+
+# Function to apply counter deltas on a connection with one upsert per counter
+def bump_counters(connection, deltas):
+    """Adds the deltas ({(scope, bucket): delta}) to the counters, inside the caller's transaction."""
+    if not deltas:
+        return
+    table = StatCounter.__table__
+    params = [{'scope': scope, 'bucket': bucket, 'value': delta}
+              for (scope, bucket), delta in deltas.items()]
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.bucket],
+            set_={'value': table.c.value + stmt.excluded.value},
+        )
+        connection.execute(stmt, params)
+        return
+
+    for row in params:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.scope == row['scope'], table.c.bucket == row['bucket'])
+            .values(value=table.c.value + row['value'])
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert(), [row])
+
+# Attribute hook: registered with active_history so assigning a breakdown column of an expired
+# application loads the value it replaces
+def _keep_previous_value(target, value, oldvalue, initiator):
+    pass
+
+# Session hook: bump counters in the same transaction as the flushed rows
+def _on_flush(session, flush_context):
+    deltas = collect_deltas(session)
+    if deltas:
+        bump_counters(session.connection(), deltas)
+
+# Function to block concurrent writes to a table until the caller's transaction ends
+def lock_table(connection, table):
+    """Taken before recomputing a denormalized table, so no increment lands between the
+    recount and the write (a plain DELETE + INSERT would lose it or hit the primary key)."""
+    if connection.dialect.name == 'postgresql':
+        # Conflicts with the ROW EXCLUSIVE lock of every INSERT/UPDATE, readers are not blocked
+        connection.execute(text(f'LOCK TABLE {table.name} IN SHARE ROW EXCLUSIVE MODE'))
+    else:
+        # A no-op write takes SQLite's database write lock for the rest of the transaction
+        connection.execute(table.update().where(false()).values({table.c[column.name]: column
+                                                                 for column in table.primary_key.columns}))
+
+# Function to overwrite the counters of some scopes inside the caller's (locked) transaction
+def replace_counters(connection, scopes, counters):
+    """Sets the counters ({(scope, bucket): value}); other buckets of the scopes become 0."""
+    table = StatCounter.__table__
+    connection.execute(table.update().where(table.c.scope.in_(scopes)).values(value=0))
+    params = [{'scope': scope, 'bucket': bucket, 'value': value}
+              for (scope, bucket), value in counters.items()]
+    if not params:
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ('postgresql', 'sqlite'):
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[table.c.scope, table.c.bucket],
+            set_={'value': stmt.excluded.value},
+        )
+        connection.execute(stmt, params)
+        return
+
+    for row in params:
+        updated = connection.execute(
+            table.update()
+            .where(table.c.scope == row['scope'], table.c.bucket == row['bucket'])
+            .values(value=row['value'])
+        )
+        if not updated.rowcount:
+            connection.execute(table.insert(), [row])
+
+# Function to recompute every counter from the base tables
+def reconcile_stats():
+    """Rebuilds stat_counters from COUNT(*) queries; returns the number of counters written."""
+    try:
+        connection = db.session.connection()
+        lock_table(connection, StatCounter.__table__)
+
+        counters = {}
+        for model, scope in TOTAL_SCOPES.items():
+            counters[(scope, '')] = db.session.query(func.count(model.id)).scalar()
+        for field, scope in APPLICATION_BREAKDOWNS.items():
+            column = getattr(Application, field)
+            if field == 'status':
+                column = func.coalesce(column, 'pending')
+            for value, count in db.session.query(column, func.count(Application.id)).group_by(column):
+                if value is not None:
+                    counters[(scope, str(value))] = count
+
+        scopes = list(TOTAL_SCOPES.values()) + list(APPLICATION_BREAKDOWNS.values())
+        replace_counters(connection, scopes, counters)
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        raise e
+    return len(counters)
+
+# Function to read the counters of one scope as a dict of bucket -> value
+def read_counters(scope):
+    rows = db.session.query(StatCounter.bucket, StatCounter.value).filter(StatCounter.scope == scope)
+    return {bucket: value for bucket, value in rows if value}
+
+# Function to read the total counters
+def read_totals():
+    rows = db.session.query(StatCounter.scope, StatCounter.value).filter(
+        StatCounter.scope.in_(TOTAL_SCOPES.values()), StatCounter.bucket == ''
+    )
+    totals = dict.fromkeys(TOTAL_SCOPES.values(), 0)
+    totals.update(rows)
+    return totals
+
+
+class SystemStats:
+    """Flask extension registering the counter hooks and the reconciliation job."""
+
+    def __init__(self, app=None):
+        self.thread = None
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        if not event.contains(Session, 'after_flush', _on_flush):
+            event.listen(Session, 'after_flush', _on_flush)
+            for field in APPLICATION_BREAKDOWNS:
+                event.listen(getattr(Application, field), 'set', _keep_previous_value, active_history=True)
+        app.extensions['system_stats'] = self
+
+        @app.cli.command('reconcile-stats')
+        def reconcile_stats_command():
+            """Recompute the materialized statistics counters."""
+            click.echo(f"Reconciled {reconcile_stats()} counters.")
+
+        interval = app.config.get('STATS_RECONCILE_INTERVAL', 0)
+        if interval and self.thread is None:
+            self.thread = threading.Thread(
+                target=self._reconcile_forever, args=(app, interval),
+                name='stats-reconciler', daemon=True,
+            )
+            self.thread.start()
+
+    def _reconcile_forever(self, app, interval):
+        while True:
+            time.sleep(interval)
+            with app.app_context():
+                try:
+                    reconcile_stats()
+                except Exception as e:
+                    db.session.rollback()
+                    app.logger.error(f"Statistics reconciliation failed: {e}")
+
+
+system_stats = SystemStats()
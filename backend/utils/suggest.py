@@ -0,0 +1,277 @@
+#backend/utils/suggest.py
+#
+# Typeahead suggestions for institutions, locations and programs.
+#
+# Suggestions are served from an in-process sorted array of (key, entry) pairs searched with
+# bisect: every word start of a name is a key, so "harv" finds "Harvard University" and
+# "uni" finds "Open University". Matches are ranked by popularity, taken from the
+# materialized application counters (per institution, per program, and summed per location).
+# Committed institution and application writes update the index incrementally through
+# session hooks: new applications raise the popularity of their institution, location and
+# program, deleted ones lower it, and moving an application to another program or
+# institution does both. Popularity is also refreshed by a full rebuild every
+# SUGGEST_REBUILD_INTERVAL seconds, run by one background thread while the previous index
+# keeps serving (see utils/live_index.py); a change committed in the instant between the
+# database commit and its hook can be counted twice by a build, and the next rebuild
+# corrects it. The first lookup waits at most SUGGEST_INDEX_WAIT seconds for the initial
+# build and otherwise returns None. A build appends every key and sorts once. Results for one- and
+# two-character prefixes, whose ranges are the widest, are memoized; adding, removing or
+# re-ranking an entry forgets the memoized prefixes of its keys.
+
+import bisect
+import heapq
+import re
+import time
+
+from sqlalchemy import inspect
+
+from app import db
+from app.models import Application, Institution
+from app.utils.live_index import LiveIndex
+from app.utils.stats import read_counters
+
+SUGGESTION_TYPES = ('institution', 'location', 'program')
+
+# Prefixes up to this length have their results memoized
+MEMO_PREFIX_LENGTH = 2
+
+_WORD_START_RE = re.compile(r'(?:^|(?<=[^\w]))\w', re.UNICODE)
+
+
+# Function to normalize text for prefix matching
+def normalize(value):
+    return ' '.join(value.lower().split())
+
+# Function to list the keys of a text: the normalized text from each word start on
+def prefix_keys(value):
+    text = normalize(value)
+    return {text[match.start():] for match in _WORD_START_RE.finditer(text)}
+
+
+class PrefixIndex:
+    """Sorted (key, entry) pairs with popularity-ranked prefix lookups."""
+
+    def __init__(self, loading=False):
+        self.items = []      # sorted (key, entry) pairs
+        self.entries = {}    # entry -> [display text, popularity, reference count]
+        self.memo = {}
+        self.loading = loading  # While loading, keys are appended and sorted once by finish()
+
+    def finish(self):
+        """Sorts the keys appended while loading."""
+        self.items.sort()
+        self.loading = False
+
+    def _forget(self, text):
+        # Drops the memoized results of every short prefix the entry's keys start with
+        if not self.memo:
+            return
+        prefixes = {key[:length] for key in prefix_keys(text) for length in range(1, MEMO_PREFIX_LENGTH + 1)}
+        for memo_key in [memo_key for memo_key in self.memo if memo_key[0] in prefixes]:
+            del self.memo[memo_key]
+
+    def add(self, entry, text, popularity=0):
+        """Adds a reference to an entry; the first reference inserts its keys."""
+        current = self.entries.get(entry)
+        if current is not None:
+            current[2] += 1
+            return
+        self.entries[entry] = [text, popularity, 1]
+        if self.loading:
+            self.items.extend((key, entry) for key in prefix_keys(text))
+            return
+        for key in prefix_keys(text):
+            bisect.insort(self.items, (key, entry))
+        self._forget(text)
+
+    def remove(self, entry):
+        """Drops a reference to an entry; the last reference removes its keys."""
+        current = self.entries.get(entry)
+        if current is None:
+            return
+        current[2] -= 1
+        if current[2] > 0:
+            return
+        del self.entries[entry]
+        for key in prefix_keys(current[0]):
+            i = bisect.bisect_left(self.items, (key, entry))
+            if i < len(self.items) and self.items[i] == (key, entry):
+                del self.items[i]
+        self._forget(current[0])
+
+    def bump(self, entry, delta):
+        current = self.entries.get(entry)
+        if current is not None and delta:
+            current[1] += delta
+            self._forget(current[0])
+
+    def suggest(self, prefix, limit, kinds=None):
+        """Returns up to `limit` (entry, text, popularity), most popular first."""
+        needle = normalize(prefix)
+        if not needle:
+            return []
+        memo_key = (needle, kinds, limit) if len(needle) <= MEMO_PREFIX_LENGTH else None
+        if memo_key in self.memo:
+            return self.memo[memo_key]
+
+        lo = bisect.bisect_left(self.items, (needle,))
+        hi = bisect.bisect_left(self.items, (needle + '\uffff',), lo)
+        matched = {entry for _, entry in self.items[lo:hi] if kinds is None or entry[0] in kinds}
+        best = heapq.nsmallest(limit, matched,
+                               key=lambda entry: (-self.entries[entry][1], self.entries[entry][0]))
+        results = [(entry, self.entries[entry][0], self.entries[entry][1]) for entry in best]
+        if memo_key is not None:
+            self.memo[memo_key] = results
+        return results
+
+
+# Function to add an institution and a reference to its location
+def _add_institution(index, locations, institution_id, name, location, popularity):
+    index.add(('institution', institution_id), name, popularity)
+    if location:
+        key = normalize(location)
+        index.add(('location', key), location)
+        index.bump(('location', key), popularity)
+        locations[institution_id] = key
+
+# Function to remove an institution and its location reference; returns its popularity
+def _remove_institution(index, locations, institution_id):
+    entry = index.entries.get(('institution', institution_id))
+    if entry is None:
+        return 0
+    popularity = entry[1]
+    key = locations.pop(institution_id, None)
+    if key is not None:
+        index.bump(('location', key), -popularity)
+        index.remove(('location', key))
+    index.remove(('institution', institution_id))
+    return popularity
+
+# Function to count a new application towards its institution, location and program
+def _add_application(index, locations, institution_id, program):
+    index.bump(('institution', institution_id), 1)
+    if institution_id in locations:
+        index.bump(('location', locations[institution_id]), 1)
+    key = normalize(program)
+    if ('program', key) not in index.entries:
+        index.add(('program', key), program)
+    index.bump(('program', key), 1)
+
+# Function to discount a deleted or moved application; a program nobody applies to is dropped
+def _remove_application(index, locations, institution_id, program):
+    index.bump(('institution', institution_id), -1)
+    if institution_id in locations:
+        index.bump(('location', locations[institution_id]), -1)
+    entry = ('program', normalize(program))
+    index.bump(entry, -1)
+    if entry in index.entries and index.entries[entry][1] <= 0:
+        index.remove(entry)
+
+# Function to read the institution and program an application had before the flush
+def _previous_values(obj):
+    state = inspect(obj)
+    values = []
+    for field in ('institution_id', 'program'):
+        history = state.attrs[field].history
+        values.append(history.deleted[0] if history.deleted else getattr(obj, field))
+    return tuple(values)
+
+
+class SuggestionIndex(LiveIndex):
+    """Per-process suggestion index kept in sync with committed writes."""
+
+    name = 'suggestion'
+    changes_key = 'suggestion_changes'
+
+    def __init__(self):
+        super().__init__()
+        self.rebuild_interval = 300
+        self.wait = 5
+
+    def init_app(self, app):
+        self.app = app
+        self.rebuild_interval = app.config.get('SUGGEST_REBUILD_INTERVAL', self.rebuild_interval)
+        self.wait = app.config.get('SUGGEST_INDEX_WAIT', self.wait)
+        app.extensions['suggestion_index'] = self
+        self.listen()
+
+    def load(self):
+        """Returns (index, {institution id: location key})."""
+        by_institution = read_counters('applications.institution')
+        by_program = read_counters('applications.program')
+        index = PrefixIndex(loading=True)
+        locations = {}
+        for institution_id, name, location in db.session.query(Institution.id, Institution.name, Institution.location):
+            _add_institution(index, locations, institution_id, name, location,
+                             by_institution.get(str(institution_id), 0))
+        for (program,) in db.session.query(Application.program).distinct():
+            if not program:
+                continue
+            entry = ('program', normalize(program))
+            if entry in index.entries:
+                index.bump(entry, by_program.get(program, 0))  # Spelling variants of one program
+            else:
+                index.add(entry, program, by_program.get(program, 0))
+        index.finish()
+        return index, locations
+
+    def apply(self, state, changes):
+        index, locations = state
+        for change, ref, values in changes:
+            if change == 'add_application':
+                _add_application(index, locations, ref, values)
+                continue
+            if change == 'remove_application':
+                _remove_application(index, locations, ref, values)
+                continue
+            popularity = _remove_institution(index, locations, ref)
+            if change == 'add_institution':
+                _add_institution(index, locations, ref, *values, popularity)
+
+    def suggest(self, prefix, limit, kinds=None):
+        """Returns suggestion dicts for a prefix, most popular first.
+
+        Returns None while the index is not built yet (or its build failed).
+        """
+        state = self.current(timeout=self.wait)
+        if state is None:
+            return None
+        if time.monotonic() - self.built_at > self.rebuild_interval:
+            self.refresh()  # Popularity catches up in the background
+        with self.lock:
+            results = state[0].suggest(prefix, limit, kinds)
+        suggestions = []
+        for (kind, ref), text, popularity in results:
+            suggestion = {'type': kind, 'text': text, 'popularity': popularity}
+            if kind == 'institution':
+                suggestion['id'] = ref
+            suggestions.append(suggestion)
+        return suggestions
+
+    def _record_changes(self, session, flush_context):
+        changes = session.info.setdefault(self.changes_key, [])
+        for obj in session.deleted:
+            if isinstance(obj, Institution):
+                changes.append(('remove_institution', obj.id, None))
+            elif isinstance(obj, Application):
+                institution_id, program = _previous_values(obj)
+                if program:
+                    changes.append(('remove_application', institution_id, program))
+        for obj in session.new:
+            if isinstance(obj, Application) and obj.program:
+                changes.append(('add_application', obj.institution_id, obj.program))
+        for obj in session.dirty:
+            if isinstance(obj, Application) and session.is_modified(obj):
+                previous = _previous_values(obj)
+                if previous == (obj.institution_id, obj.program):
+                    continue
+                if previous[1]:
+                    changes.append(('remove_application', *previous))
+                if obj.program:
+                    changes.append(('add_application', obj.institution_id, obj.program))
+        for obj in session.new | session.dirty:
+            if isinstance(obj, Institution):
+                changes.append(('add_institution', obj.id, (obj.name, obj.location)))
+
+
+suggestion_index = SuggestionIndex()
@@ -0,0 +1,105 @@
+#backend/utils/token_cache.py
+#
+# In-process cache of verified access tokens for requires_auth.
+#
+# Entries are keyed by the SHA-256 digest of the raw token (the token itself is never kept)
+# and hold the decoded claims plus a slim principal of the user, so a cache hit skips both
+# the signature verification and the user lookup. Entries expire after AUTH_TOKEN_CACHE_TTL
+# seconds or when the token expires, whichever comes first, and are evicted least recently
+# used beyond AUTH_TOKEN_CACHE_SIZE. Logout, revocation and user updates/deletes drop the
+# affected entries immediately. Every invalidation bumps a generation counter; a put()
+# whose load started before the latest invalidation is skipped, so a principal read before
+# an update cannot be cached after it.
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict, namedtuple
+
+# The slice of a user that protected routes need
+Principal = namedtuple('Principal', ['id', 'username', 'email', 'role'])
+
+
+# Function to compute the cache key of a raw token
+def token_digest(token):
+    return hashlib.sha256(token.encode()).digest()
+
+
+class TokenCache:
+    """Thread-safe LRU/TTL cache of verified tokens."""
+
+    def __init__(self, max_size=10000, ttl=60):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # digest -> (expires_at, claims, principal)
+        self.by_user = {}             # user id -> set of digests
+        self.lock = threading.Lock()
+        self.generation = 0           # bumped by every invalidation
+        self.hits = 0
+        self.misses = 0
+
+    def configure(self, max_size, ttl):
+        with self.lock:
+            self.max_size = max_size
+            self.ttl = ttl
+            self._clear()
+
+    def get(self, digest):
+        """Returns (claims, principal) for a cached token, or None."""
+        with self.lock:
+            entry = self.entries.get(digest)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[0] <= time.time():
+                self._drop(digest)
+                self.misses += 1
+                return None
+            self.entries.move_to_end(digest)
+            self.hits += 1
+            return entry[1], entry[2]
+
+    def put(self, digest, claims, principal, generation=None):
+        """Caches a verified token; skipped if an invalidation happened since `generation` was read."""
+        expires_at = min(time.time() + self.ttl, claims.get('exp', float('inf')))
+        with self.lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._drop(digest)
+            self.entries[digest] = (expires_at, claims, principal)
+            self.by_user.setdefault(principal.id, set()).add(digest)
+            while len(self.entries) > self.max_size:
+                self._drop(next(iter(self.entries)))
+
+    def invalidate(self, digest):
+        with self.lock:
+            self.generation += 1
+            self._drop(digest)
+
+    def invalidate_user(self, user_id):
+        with self.lock:
+            self.generation += 1
+            for digest in list(self.by_user.get(user_id, ())):
+                self._drop(digest)
+
+    def clear(self):
+        with self.lock:
+            self._clear()
+
+    def _clear(self):
+        self.generation += 1
+        self.entries.clear()
+        self.by_user.clear()
+
+    def _drop(self, digest):
+        entry = self.entries.pop(digest, None)
+        if entry is None:
+            return
+        digests = self.by_user.get(entry[2].id)
+        if digests is not None:
+            digests.discard(digest)
+            if not digests:
+                del self.by_user[entry[2].id]
+
+
+token_cache = TokenCache()
@@ -1,7 +1,10 @@
-from werkzeug.security import generate_password_hash, check_password_hash
+# #backend/app/utils/utils.py
+#
+from app.utils.passwords import password_hasher
 
+# Hashing runs in the password hasher's process pool (see utils/passwords.py)
 def hash_password(password):
-    return generate_password_hash(password)
+    return password_hasher.hash(password)
 
 def verify_password(stored_hash, password):
-    return check_password_hash(stored_hash, password)
+    return password_hasher.verify(stored_hash, password)
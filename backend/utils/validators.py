@@ -1,5 +1,5 @@
 import re
-from werkzeug.security import check_password_hash
+from app.utils.passwords import password_hasher
 
 # Function to validate email format
 def validate_email(email):
@@ -27,7 +27,7 @@ def validate_password(password):
 # Function to compare password with its hashed value
 def validate_password_match(stored_password_hash, password):
     """Validates if the given password matches the stored password hash."""
-    return check_password_hash(stored_password_hash, password)
+    return password_hasher.verify(stored_password_hash, password)
 
 # Function to validate that a string is not empty
 def validate_not_empty(value):
@@ -89,19 +89,6 @@ def validate_search_query(query):
     if not validate_not_empty(query):
         return False, "Query is required"
     return True, "Validation successful"
-        (Institution.location.ilike(f'%{query}%'))
-    ).all()
-#
-#     # Serialize the results
-     institutions_data = [{
-            'id': institution.id,
-            'name': institution.name,
-            'location': institution.location,
-            'description': institution.description
-        } for institution in institutions]
-
-    return jsonify(institutions_data), 200
-
 
 
 # Function to validate user input for updating user details
@@ -153,28 +140,4 @@ def validate_delete_user_data(user_id):
     if not user_id:
         return False, "User ID is required"
     return True, "Validation successful"
-    (Institution.location.ilike(f'%{query}%'))
-    ).all()
-
-#     # Serialize the results
-    institutions_data = [{
-        'id': institution.id,
-        'name': institution.name,
-        'location': institution.location,
-        'description': institution.description
-    } for institution in institutions]
-
-    return jsonify(institutions_data), 200
-
-# # Function to validate user input for updating user details
-def validate_update_user_data(username, email, password):
-    """Validates data for updating user details."""
-    if not validate_not_empty(username):
-        return False, "Username is required"
-    if not validate_email(email):
-        return False, "Invalid email address"
-    if not validate_password(password):
-        return False, "Password must be at least 8 characters and contain at least one uppercase letter, one lowercase letter, one number, and one special character"
-    return True, "Validation successful"
-
     
@@ -0,0 +1,293 @@
+#backend/utils/write_buffer.py
+#
+# Write-coalescing buffer for high-frequency event tables (comment votes and resource/material
+# access logs).
+#
+# write_buffer.add() queues a row in the worker process instead of committing it. A background
+# thread flushes the queued rows with one multi-row INSERT per table and chunk whenever
+# WRITE_BUFFER_BATCH_SIZE rows are waiting or WRITE_BUFFER_FLUSH_INTERVAL seconds have passed,
+# so a lecture's worth of clicks costs a handful of transactions instead of one each. Access
+# logs are append-only. Votes are keyed by UPSERT_KEYS (one vote per user and comment or
+# reply): a flush keeps each user's latest queued vote and writes it with INSERT ... ON
+# CONFLICT DO UPDATE SET vote = excluded.vote, so repeating a vote never adds to a score. When
+# WRITE_BUFFER_CAPACITY rows are waiting, add() blocks for up to WRITE_BUFFER_PUT_TIMEOUT
+# seconds while the flusher catches up and then raises WriteBufferFull (backpressure: callers
+# answer 503 rather than letting memory grow without bound). Queued rows are flushed at
+# interpreter exit.
+#
+# A chunk the database rejects is retried row by row, so one bad row (e.g. a deleted comment)
+# loses only itself. When the database is unreachable instead (connection errors, locked
+# SQLite file), the unwritten rows go back to the front of the buffer and the flusher waits
+# WRITE_BUFFER_FLUSH_INTERVAL seconds before retrying; producers see backpressure meanwhile.
+#
+# Buffered rows are not visible to reads until flushed, and rows still queued when a worker is
+# killed with SIGKILL are lost; only use the buffer for tables where that is acceptable.
+
+import atexit
+import logging
+import os
+import threading
+import time
+
+from flask import jsonify
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.exc import DBAPIError, DisconnectionError, InterfaceError, OperationalError
+
+from app import db
+from app.models import CourseMaterialAccess, PollCommentReplyVote, PollCommentVote, ResourceAccess
+
+logger = logging.getLogger(__name__)
+
+# Models whose rows may be buffered
+BUFFERED_MODELS = (PollCommentVote, PollCommentReplyVote, ResourceAccess, CourseMaterialAccess)
+
+# Unique keys of the buffered models that hold one row per key; the other columns of a queued
+# row replace those of the stored one
+UPSERT_KEYS = {
+    PollCommentVote.__table__.name: ('comment_id', 'user_id'),
+    PollCommentReplyVote.__table__.name: ('reply_id', 'user_id'),
+}
+
+# Bound parameters per INSERT statement (SQLite allows 32766, PostgreSQL 65535)
+MAX_PARAMETERS = 30000
+
+
+class WriteBufferFull(Exception):
+    """Raised by WriteBuffer.add() when the buffer stays full for the whole put timeout."""
+
+
+# Function to tell a database outage from a rejected row
+def is_transient(error):
+    if isinstance(error, (OperationalError, InterfaceError, DisconnectionError)):
+        return True
+    return isinstance(error, DBAPIError) and error.connection_invalidated
+
+
+class WriteBuffer:
+    """Per-process buffer of rows flushed with multi-row INSERTs by a background thread."""
+
+    def __init__(self, app=None):
+        self.app = None
+        self.batch_size = 500
+        self.flush_interval = 1.0
+        self.capacity = 10000
+        self.put_timeout = 2.0
+        self.tables = {model.__table__.name: model.__table__ for model in BUFFERED_MODELS}
+        self.pending = {}  # table name -> [row dicts]
+        self.size = 0
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.thread = None
+        self.stopping = False
+        self.retry_at = 0.0  # Flushes wait until then after an outage
+        self.stats = {'buffered': 0, 'flushed': 0, 'dropped': 0, 'requeued': 0, 'rejected': 0, 'flushes': 0}
+        if hasattr(os, 'register_at_fork'):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+        if app is not None:
+            self.init_app(app)
+
+    def init_app(self, app):
+        self.app = app
+        self.batch_size = app.config.get('WRITE_BUFFER_BATCH_SIZE', self.batch_size)
+        self.flush_interval = app.config.get('WRITE_BUFFER_FLUSH_INTERVAL', self.flush_interval)
+        self.capacity = max(app.config.get('WRITE_BUFFER_CAPACITY', self.capacity), self.batch_size)
+        self.put_timeout = app.config.get('WRITE_BUFFER_PUT_TIMEOUT', self.put_timeout)
+        if 'write_buffer' not in app.extensions:
+            atexit.register(self.close)
+        app.extensions['write_buffer'] = self
+        app.register_error_handler(WriteBufferFull, self._full_response)
+
+    @staticmethod
+    def _full_response(error):
+        response = jsonify({"msg": "The server is busy, please try again shortly"})
+        response.headers['Retry-After'] = '1'
+        return response, 503
+
+    def _ensure_thread(self):
+        # Started lazily so that pre-forking servers give each worker its own flusher
+        if self.thread is None:
+            self.stopping = False
+            self.thread = threading.Thread(target=self._run, name='write-buffer', daemon=True)
+            self.thread.start()
+
+    def _reset_after_fork(self):
+        # Rows inherited from the parent are flushed by the parent
+        self.condition = threading.Condition()
+        self.flush_lock = threading.Lock()
+        self.pending, self.size = {}, 0
+        self.thread = None
+
+    def add(self, model, **values):
+        """Queues one row of a buffered model (raises WriteBufferFull under sustained overload)."""
+        table = model.__table__
+        if table.name not in self.tables:
+            raise ValueError(f"{model.__name__} is not a buffered model")
+        with self.condition:
+            self._ensure_thread()
+            if self.size >= self.capacity:
+                self.condition.notify_all()
+                deadline = time.monotonic() + self.put_timeout
+                while self.size >= self.capacity:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.stats['rejected'] += 1
+                        raise WriteBufferFull(f"Write buffer is full ({self.capacity} rows)")
+                    self.condition.wait(remaining)
+            self.pending.setdefault(table.name, []).append(values)
+            self.size += 1
+            self.stats['buffered'] += 1
+            if self.size >= self.batch_size:
+                self.condition.notify_all()
+
+    def _run(self):
+        while True:
+            with self.condition:
+                if self.size < self.batch_size and not self.stopping:
+                    self.condition.wait(self.flush_interval)
+                while not self.stopping and time.monotonic() < self.retry_at:
+                    self.condition.wait(self.retry_at - time.monotonic())
+                if self.stopping:
+                    return
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write buffer flush failed")
+
+    def _take(self):
+        with self.condition:
+            pending, self.pending, self.size = self.pending, {}, 0
+            self.condition.notify_all()  # Wake producers waiting for space
+        return pending
+
+    def _requeue(self, pending):
+        # Puts unwritten rows back in front of the rows queued since
+        with self.condition:
+            for name, rows in pending.items():
+                self.pending[name] = rows + self.pending.get(name, [])
+                self.size += len(rows)
+                self.stats['requeued'] += len(rows)
+            self.retry_at = time.monotonic() + self.flush_interval
+
+    def flush(self):
+        """Writes every queued row; returns the number of rows inserted."""
+        with self.flush_lock:
+            pending = self._take()
+            if not pending:
+                return 0
+            inserted = 0
+            unwritten = {}
+            with self.app.app_context():
+                for name, rows in pending.items():
+                    if unwritten:
+                        unwritten[name] = rows  # The database is unreachable; keep the rest
+                        continue
+                    count, leftover = self._insert(self.tables[name], rows)
+                    inserted += count
+                    if leftover:
+                        unwritten[name] = leftover
+            if unwritten:
+                self._requeue(unwritten)
+                logger.warning("Database unavailable, %d buffered rows requeued",
+                               sum(len(rows) for rows in unwritten.values()))
+            if inserted:
+                self.stats['flushes'] += 1
+            self.stats['flushed'] += inserted
+            return inserted
+
+    def _statement(self, table, rows):
+        keys = UPSERT_KEYS.get(table.name)
+        dialect = db.engine.dialect.name
+        if keys is None or dialect not in ('postgresql', 'sqlite'):
+            # Elsewhere a repeated vote is rejected by the unique constraint and dropped
+            return table.insert().values(rows)
+        insert = postgresql.insert if dialect == 'postgresql' else sqlite.insert
+        stmt = insert(table).values(rows)
+        return stmt.on_conflict_do_update(
+            index_elements=[table.c[key] for key in keys],
+            set_={name: stmt.excluded[name] for name in rows[0] if name not in keys},
+        )
+
+    def _insert(self, table, rows):
+        """Returns (rows inserted, rows left unwritten by a database outage)."""
+        keys = UPSERT_KEYS.get(table.name)
+        if keys is not None:
+            # One row per key and statement (PostgreSQL cannot update a row twice in one
+            # INSERT); the latest queued row wins
+            rows = list({tuple(row.get(key) for key in keys): row for row in rows}.values())
+        # Rows are grouped by key set so each chunk is a single INSERT ... VALUES (...), (...)
+        groups = {}
+        for row in rows:
+            groups.setdefault(tuple(sorted(row)), []).append(row)
+        chunks = []
+        for keys, group in groups.items():
+            chunk_size = max(1, MAX_PARAMETERS // max(1, len(keys)))
+            chunks.extend(group[start:start + chunk_size] for start in range(0, len(group), chunk_size))
+
+        inserted = 0
+        for i, chunk in enumerate(chunks):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(self._statement(table, chunk))
+                inserted += len(chunk)
+                continue
+            except Exception as e:
+                if is_transient(e):
+                    return inserted, [row for rest in chunks[i:] for row in rest]
+            # Retry row by row so one bad row (e.g. a deleted comment) loses only itself
+            count, leftover = self._insert_each(table, chunk)
+            inserted += count
+            if leftover:
+                return inserted, leftover + [row for rest in chunks[i + 1:] for row in rest]
+        return inserted, []
+
+    def _insert_each(self, table, rows):
+        inserted = 0
+        for i, row in enumerate(rows):
+            try:
+                with db.engine.begin() as connection:
+                    connection.execute(self._statement(table, [row]))
+                inserted += 1
+            except Exception as e:
+                if is_transient(e):
+                    return inserted, rows[i:]
+                self.stats['dropped'] += 1
+                logger.warning("Dropped buffered %s row %r: %s", table.name, row, e)
+        return inserted, []
+
+    def close(self):
+        """Stops the flusher and writes the remaining rows (called at exit)."""
+        with self.condition:
+            thread, self.stopping = self.thread, True
+            self.condition.notify_all()
+        if thread is not None:
+            thread.join(timeout=self.flush_interval + 5)
+        self.thread = None
+        if self.app is not None:
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Write buffer flush at shutdown failed")
+            if self.size:
+                logger.error("Write buffer closed with %d rows not written", self.size)
+
+    def prometheus_lines(self):
+        """Returns the buffer counters as Prometheus text lines."""
+        lines = ['# HELP uap_write_buffer_pending Rows waiting to be flushed.',
+                 '# TYPE uap_write_buffer_pending gauge',
+                 f'uap_write_buffer_pending {self.size}']
+        counters = [
+            ('uap_write_buffer_rows_total', 'buffered', 'Rows added to the buffer'),
+            ('uap_write_buffer_flushed_rows_total', 'flushed', 'Rows inserted by flushes'),
+            ('uap_write_buffer_dropped_rows_total', 'dropped', 'Rows the database rejected'),
+            ('uap_write_buffer_requeued_rows_total', 'requeued', 'Rows put back after a database outage'),
+            ('uap_write_buffer_rejected_total', 'rejected', 'Adds refused because the buffer stayed full'),
+            ('uap_write_buffer_flushes_total', 'flushes', 'Flushes that wrote at least one row'),
+        ]
+        for name, key, description in counters:
+            lines.append(f'# HELP {name} {description}.')
+            lines.append(f'# TYPE {name} counter')
+            lines.append(f'{name} {self.stats[key]}')
+        return lines
+
+
+write_buffer = WriteBuffer()
@@ -0,0 +1,42 @@
+"""Allow one vote per user on each poll comment and reply
+
+Revision ID: 2d7b4e8a1c39
+Revises: 9c3f7a1d5e62
+Create Date: 2026-10-18 21:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '2d7b4e8a1c39'
+down_revision = '9c3f7a1d5e62'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep each user's latest vote on a comment or reply
+    op.execute(
+        "DELETE FROM poll_comment_votes WHERE id NOT IN "
+        "(SELECT MAX(id) FROM poll_comment_votes GROUP BY user_id, comment_id)"
+    )
+    op.execute(
+        "DELETE FROM poll_comment_reply_votes WHERE id NOT IN "
+        "(SELECT MAX(id) FROM poll_comment_reply_votes GROUP BY user_id, reply_id)"
+    )
+
+    with op.batch_alter_table('poll_comment_votes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_poll_comment_votes_user_comment', ['user_id', 'comment_id'])
+
+    with op.batch_alter_table('poll_comment_reply_votes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_poll_comment_reply_votes_user_reply', ['user_id', 'reply_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('poll_comment_reply_votes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_poll_comment_reply_votes_user_reply', type_='unique')
+
+    with op.batch_alter_table('poll_comment_votes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_poll_comment_votes_user_comment', type_='unique')
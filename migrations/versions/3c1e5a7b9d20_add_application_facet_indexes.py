@@ -0,0 +1,30 @@
+"""Add composite indexes for faceted application search
+
+Revision ID: 3c1e5a7b9d20
+Revises: 1a0f6d2c9e47
+Create Date: 2026-10-18 10:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3c1e5a7b9d20'
+down_revision = '1a0f6d2c9e47'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_status_date', ['status', 'application_date'], unique=False)
+        batch_op.create_index('ix_applications_institution_status_date', ['institution_id', 'status', 'application_date'], unique=False)
+        batch_op.create_index('ix_applications_program_status_date', ['program', 'status', 'application_date'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_index('ix_applications_program_status_date')
+        batch_op.drop_index('ix_applications_institution_status_date')
+        batch_op.drop_index('ix_applications_status_date')
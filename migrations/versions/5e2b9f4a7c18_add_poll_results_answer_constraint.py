@@ -0,0 +1,34 @@
+"""Add a unique constraint on poll result answers for the vote tally upsert
+
+Revision ID: 5e2b9f4a7c18
+Revises: 8a4d2c6e1f53
+Create Date: 2026-10-18 15:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5e2b9f4a7c18'
+down_revision = '8a4d2c6e1f53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Rebuild the tallies from the votes so duplicate answer rows cannot block the constraint
+    op.execute("DELETE FROM poll_results")
+    op.execute(
+        "INSERT INTO poll_results (poll_id, question_id, answer_text, vote_count) "
+        "SELECT poll_id, question_id, answer_text, COUNT(*) FROM poll_votes "
+        "GROUP BY poll_id, question_id, answer_text"
+    )
+
+    with op.batch_alter_table('poll_results', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_poll_results_answer', ['question_id', 'answer_text'])
+
+
+def downgrade():
+    with op.batch_alter_table('poll_results', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_poll_results_answer', type_='unique')
@@ -0,0 +1,50 @@
+"""Backfill the statistics counters from the base tables
+
+Revision ID: 6f2a9c4e8b15
+Revises: 2d7b4e8a1c39
+Create Date: 2026-10-18 22:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '6f2a9c4e8b15'
+down_revision = '2d7b4e8a1c39'
+branch_labels = None
+depends_on = None
+
+# Scopes maintained by utils/stats.py
+SCOPES = ('users', 'institutions', 'applications',
+          'applications.status', 'applications.institution', 'applications.program')
+
+
+def upgrade():
+    # Rows written before the counters existed were never counted; recount everything once
+    op.execute("DELETE FROM stat_counters WHERE scope IN ({})".format(
+        ', '.join(f"'{scope}'" for scope in SCOPES)))
+    for scope, table in (('users', 'users'), ('institutions', 'institutions'), ('applications', 'applications')):
+        op.execute(
+            f"INSERT INTO stat_counters (scope, bucket, value) SELECT '{scope}', '', COUNT(*) FROM {table}"
+        )
+    op.execute(
+        "INSERT INTO stat_counters (scope, bucket, value) "
+        "SELECT 'applications.status', COALESCE(status, 'pending'), COUNT(*) FROM applications "
+        "GROUP BY COALESCE(status, 'pending')"
+    )
+    op.execute(
+        "INSERT INTO stat_counters (scope, bucket, value) "
+        "SELECT 'applications.institution', CAST(institution_id AS VARCHAR(255)), COUNT(*) FROM applications "
+        "GROUP BY institution_id"
+    )
+    op.execute(
+        "INSERT INTO stat_counters (scope, bucket, value) "
+        "SELECT 'applications.program', program, COUNT(*) FROM applications "
+        "GROUP BY program"
+    )
+
+
+def downgrade():
+    # The counters are kept by the application from here on; nothing to undo
+    pass
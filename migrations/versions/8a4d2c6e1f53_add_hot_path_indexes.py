@@ -0,0 +1,65 @@
+"""Add foreign key, composite and partial indexes for hot query paths
+
+Revision ID: 8a4d2c6e1f53
+Revises: 3c1e5a7b9d20
+Create Date: 2026-10-18 14:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8a4d2c6e1f53'
+down_revision = '3c1e5a7b9d20'
+branch_labels = None
+depends_on = None
+
+PENDING = sa.text("status = 'pending'")
+
+
+def upgrade():
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.create_index('ix_applications_user_date', ['user_id', 'application_date'], unique=False)
+        batch_op.create_index('ix_applications_pending', ['institution_id', 'application_date'], unique=False,
+                              postgresql_where=PENDING, sqlite_where=PENDING)
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.create_index('ix_courses_institution_id', ['institution_id'], unique=False)
+
+    with op.batch_alter_table('enrollments', schema=None) as batch_op:
+        batch_op.create_index('ix_enrollments_user_id', ['user_id'], unique=False)
+        batch_op.create_index('ix_enrollments_course_id', ['course_id'], unique=False)
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.create_index('ix_messages_sender_date', ['sender_id', 'send_date'], unique=False)
+        batch_op.create_index('ix_messages_recipient_date', ['recipient_id', 'send_date'], unique=False)
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.create_index('ix_notifications_user_date', ['user_id', 'notification_date'], unique=False)
+
+    with op.batch_alter_table('revoked_tokens', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_revoked_tokens_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('revoked_tokens', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_revoked_tokens_user_id'))
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_user_date')
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_recipient_date')
+        batch_op.drop_index('ix_messages_sender_date')
+
+    with op.batch_alter_table('enrollments', schema=None) as batch_op:
+        batch_op.drop_index('ix_enrollments_course_id')
+        batch_op.drop_index('ix_enrollments_user_id')
+
+    with op.batch_alter_table('courses', schema=None) as batch_op:
+        batch_op.drop_index('ix_courses_institution_id')
+
+    with op.batch_alter_table('applications', schema=None) as batch_op:
+        batch_op.drop_index('ix_applications_pending')
+        batch_op.drop_index('ix_applications_user_date')
@@ -0,0 +1,38 @@
+"""Allow one poll vote per user and question
+
+Revision ID: 9c3f7a1d5e62
+Revises: f1c6a9d3b582
+Create Date: 2026-10-18 19:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9c3f7a1d5e62'
+down_revision = 'f1c6a9d3b582'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Keep each user's first vote per question, then rebuild the tallies from what is left
+    op.execute(
+        "DELETE FROM poll_votes WHERE id NOT IN "
+        "(SELECT MIN(id) FROM poll_votes GROUP BY user_id, question_id)"
+    )
+    op.execute("DELETE FROM poll_results")
+    op.execute(
+        "INSERT INTO poll_results (poll_id, question_id, answer_text, vote_count) "
+        "SELECT poll_id, question_id, answer_text, COUNT(*) FROM poll_votes "
+        "GROUP BY poll_id, question_id, answer_text"
+    )
+
+    with op.batch_alter_table('poll_votes', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_poll_votes_user_question', ['user_id', 'question_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('poll_votes', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_poll_votes_user_question', type_='unique')
@@ -0,0 +1,41 @@
+"""Add notification read state, unread index and unread counters
+
+Revision ID: d4a8c2b6e791
+Revises: b7d3e1f9a240
+Create Date: 2026-10-18 17:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd4a8c2b6e791'
+down_revision = 'b7d3e1f9a240'
+branch_labels = None
+depends_on = None
+
+UNREAD = sa.text('read_at IS NULL')
+
+
+def upgrade():
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('read_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_notifications_unread', ['user_id', 'notification_date'], unique=False,
+                              postgresql_where=UNREAD, sqlite_where=UNREAD)
+
+    # Every existing notification starts unread
+    op.execute("DELETE FROM stat_counters WHERE scope = 'notifications.unread'")
+    op.execute(
+        "INSERT INTO stat_counters (scope, bucket, value) "
+        "SELECT 'notifications.unread', CAST(user_id AS VARCHAR(255)), COUNT(*) FROM notifications "
+        "GROUP BY user_id"
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM stat_counters WHERE scope = 'notifications.unread'")
+
+    with op.batch_alter_table('notifications', schema=None) as batch_op:
+        batch_op.drop_index('ix_notifications_unread')
+        batch_op.drop_column('read_at')
@@ -0,0 +1,38 @@
+"""Add the message conversation key and its history index
+
+Revision ID: f1c6a9d3b582
+Revises: d4a8c2b6e791
+Create Date: 2026-10-18 18:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f1c6a9d3b582'
+down_revision = 'd4a8c2b6e791'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('conversation_key', sa.String(length=41), nullable=True))
+
+    # 'low user id:high user id'
+    op.execute(
+        "UPDATE messages SET conversation_key = CASE WHEN sender_id < recipient_id "
+        "THEN CAST(sender_id AS VARCHAR(20)) || ':' || CAST(recipient_id AS VARCHAR(20)) "
+        "ELSE CAST(recipient_id AS VARCHAR(20)) || ':' || CAST(sender_id AS VARCHAR(20)) END"
+    )
+
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.alter_column('conversation_key', existing_type=sa.String(length=41), nullable=False)
+        batch_op.create_index('ix_messages_conversation_date', ['conversation_key', 'send_date', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('messages', schema=None) as batch_op:
+        batch_op.drop_index('ix_messages_conversation_date')
+        batch_op.drop_column('conversation_key')
@@ -0,0 +1,57 @@
+#tests/conftest.py
+#
+# Shared fixtures: an app bound to a throwaway SQLite database file per test.
+
+import pytest
+
+from app import create_app, db
+from config import TestingConfig
+
+
+@pytest.fixture
+def app(tmp_path):
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'test.db'}"
+
+    app = create_app(Config)
+    with app.app_context():
+        yield app
+        db.session.remove()
+
+
+@pytest.fixture
+def database(app):
+    """The app with every table created."""
+    db.create_all()
+    yield db
+    db.session.remove()
+    db.drop_all()
+
+
+@pytest.fixture
+def client(app):
+    return app.test_client()
+
+
+@pytest.fixture
+def make_user(database):
+    """Creates users: make_user('alice') -> User with password 'password'."""
+    from app.auth import create_user
+
+    def make(username, password='password', role='student'):
+        user = create_user(username, f'{username}@example.com', password)
+        if role != user.role:
+            user.role = role
+            database.session.commit()
+        return user
+    return make
+
+
+@pytest.fixture
+def auth_headers():
+    """Returns the Authorization header of a user: auth_headers(user)."""
+    from app.auth import generate_token
+
+    def headers(user):
+        return {'Authorization': f'Bearer {generate_token(user.id)}'}
+    return headers
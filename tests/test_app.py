@@ -0,0 +1,22 @@
+#tests/test_app.py
+#
+# The application factory imports and wires every extension.
+
+from app import create_app, db
+
+
+def test_create_app_initialises_extensions(app):
+    for name in ('sqlalchemy', 'search_engine', 'fuzzy_index', 'write_buffer'):
+        assert name in app.extensions, name
+    assert db.session.execute(db.text('SELECT 1')).scalar() == 1
+
+
+def test_create_app_with_default_config():
+    assert create_app().name == 'app'
+
+
+def test_create_app_registers_every_blueprint(app):
+    assert set(app.blueprints) == {
+        'admin', 'auth', 'applications', 'institutions', 'search', 'students', 'polls',
+        'discussions', 'notifications', 'messages', 'resources',
+    }
@@ -0,0 +1,61 @@
+#tests/test_applications.py
+#
+# Bulk submission of applications.
+
+import pytest
+
+from app.models import Application, Institution
+
+
+@pytest.fixture
+def institution(database):
+    institution = Institution(name='Strathmore', location='Nairobi')
+    database.session.add(institution)
+    database.session.commit()
+    return institution
+
+
+def test_bulk_requires_auth(client, institution):
+    response = client.post('/applications/bulk', json={
+        'applications': [{'institution_id': institution.id, 'program': 'Law'}]})
+    assert response.status_code == 401
+
+
+def test_bulk_submits_for_the_caller(client, make_user, auth_headers, institution):
+    alice = make_user('alice')
+    bob = make_user('bob')
+
+    response = client.post('/applications/bulk', headers=auth_headers(alice), json={
+        'user_id': bob.id,
+        'applications': [
+            {'institution_id': institution.id, 'program': 'Law'},
+            {'user_id': bob.id, 'institution_id': institution.id, 'program': 'Medicine'},
+        ]})
+
+    assert response.status_code == 207
+    body = response.get_json()
+    assert [application['user_id'] for application in body['created']] == [alice.id]
+    assert body['errors'] == [{'index': 1, 'msg': "Applications can only be submitted for yourself"}]
+    assert Application.query.filter_by(user_id=bob.id).count() == 0
+
+
+def test_admins_submit_for_other_users(client, make_user, auth_headers, institution):
+    admin = make_user('admin', role='admin')
+    bob = make_user('bob')
+
+    response = client.post('/applications/bulk', headers=auth_headers(admin), json={
+        'user_id': bob.id,
+        'applications': [{'institution_id': institution.id, 'program': 'Law'}]})
+
+    assert response.status_code == 201
+    assert response.get_json()['created'][0]['user_id'] == bob.id
+
+
+def test_bulk_rejects_boolean_ids(client, make_user, auth_headers, institution):
+    admin = make_user('admin', role='admin')
+
+    response = client.post('/applications/bulk', headers=auth_headers(admin), json={
+        'applications': [{'user_id': True, 'institution_id': institution.id, 'program': 'Law'}]})
+
+    assert response.status_code == 400
+    assert response.get_json()['errors'][0]['msg'] == "User ID and institution ID must be integers"
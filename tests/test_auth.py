@@ -0,0 +1,36 @@
+#tests/test_auth.py
+#
+# Token refresh and the user endpoints of auth_bp.
+
+
+def test_refresh_issues_new_tokens(client, make_user):
+    make_user('alice')
+    tokens = client.post('/auth/login', json={'email': 'alice@example.com', 'password': 'password'}).get_json()
+
+    response = client.post('/auth/refresh', json={'refresh_token': tokens['refresh_token']})
+    assert response.status_code == 200
+    assert response.get_json()['token']
+
+    assert client.post('/auth/refresh', json={'refresh_token': 'garbage'}).status_code == 401
+
+
+def test_current_user_and_user_by_id_are_separate_endpoints(client, make_user, auth_headers):
+    alice = make_user('alice')
+    bob = make_user('bob')
+
+    response = client.get('/auth/user', headers=auth_headers(alice))
+    assert response.get_json()['username'] == 'alice'
+
+    response = client.get(f'/auth/users/{bob.id}', headers=auth_headers(alice))
+    assert response.get_json()['username'] == 'bob'
+    assert client.get('/auth/users/999', headers=auth_headers(alice)).status_code == 404
+
+
+def test_register_returns_the_serialized_user(client, database):
+    response = client.post('/auth/register', json={
+        'username': 'carol', 'email': 'carol@example.com', 'password': 'password'})
+    assert response.status_code == 201
+    body = response.get_json()
+    assert body['username'] == 'carol'
+    assert body['email'] == 'carol@example.com'
+    assert 'password_hash' not in body
@@ -0,0 +1,59 @@
+#tests/test_fuzzy.py
+#
+# Fuzzy lookups: the term cap, and periodic rebuilds picking up writes made outside this process.
+
+import pytest
+
+from app import db
+from app.models import User
+from app.utils.fuzzy import DeletionIndex, fuzzy_index
+from app.utils.search import search_engine
+
+
+@pytest.fixture
+def users(make_user):
+    """Two users, with a fresh fuzzy index."""
+    make_user('alice')
+    make_user('bob')
+    fuzzy_index.invalidate()
+    yield
+    fuzzy_index.invalidate()
+
+
+# Function to list the usernames of a ?fuzzy=1 user search
+def fuzzy_usernames(query):
+    return sorted(row.username for row in search_engine.search(User, query, fuzzy=True))
+
+
+def test_deletion_index_empties_itself_past_the_term_cap():
+    index = DeletionIndex(max_terms=3)
+    index.add(1, ('alice', 'alice@example.com'))
+    index.add(1, ('alicia', 'alice@example.com'))  # Replacing a row's terms frees the old ones
+    assert not index.full
+    index.add(2, ('bob', 'bob@example.com'))
+    assert index.full
+    assert not index.deletes and not index.term_rows and not index.rows
+    index.add(3, ('carol',))
+    assert not index.rows
+
+
+def test_lookups_past_the_term_cap_fall_back_to_substring_matches(users, monkeypatch):
+    monkeypatch.setattr(fuzzy_index, 'max_terms', 3)
+    assert fuzzy_index.search(User, 'alcie', 10) is None
+    assert fuzzy_usernames('alcie') == []
+    assert fuzzy_usernames('ali') == ['alice']
+
+
+def test_rebuild_picks_up_rows_written_by_other_processes(users, monkeypatch):
+    assert fuzzy_usernames('alcie') == ['alice']
+    # Bypasses the session hooks, as a write committed by another worker does
+    db.session.execute(User.__table__.insert().values(
+        username='carol', email='carol@example.com', password_hash='x'))
+    db.session.commit()
+    assert fuzzy_usernames('carlo') == []
+
+    monkeypatch.setattr(fuzzy_index, 'rebuild_interval', 0)
+    fuzzy_index.search(User, 'carlo', 10)  # Stale: starts a background rebuild
+    fuzzy_index.build()  # Waits for it
+    monkeypatch.undo()
+    assert fuzzy_usernames('carlo') == ['carol']
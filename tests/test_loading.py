@@ -0,0 +1,63 @@
+#tests/test_loading.py
+#
+# Loading profiles keep listings of applications at a fixed number of queries.
+
+import pytest
+
+from app import db
+from app.models import Application, Institution, User
+from app.utils.database import get_all_applications, get_applications_by_institution_id
+from app.utils.loading import count_queries, load_profile, max_queries
+
+
+@pytest.fixture
+def applications(database):
+    """Two institutions with three applications from three users each."""
+    institutions = [Institution(name=f'Institution {i}', location='Nairobi') for i in range(2)]
+    users = [User(username=f'user{i}', email=f'user{i}@example.com', password_hash='x') for i in range(3)]
+    database.session.add_all(institutions + users)
+    database.session.flush()
+    database.session.add_all([
+        Application(user_id=user.id, institution_id=institution.id, program='Medicine')
+        for institution in institutions for user in users
+    ])
+    database.session.commit()
+    # Start from an empty identity map so relationships are not served from memory
+    database.session.remove()
+
+
+def test_listing_with_profile_runs_one_query(applications):
+    with max_queries(1):
+        listed = get_all_applications()
+        names = [repr(application) for application in listed]
+    assert len(names) == 6
+    assert '<Application Medicine for Institution 0 by user0>' in names
+
+
+def test_helpers_apply_profile(applications):
+    with max_queries(1):
+        listed = get_applications_by_institution_id(1)
+        for application in listed:
+            repr(application)
+    assert len(listed) == 3
+
+
+def test_listing_without_profile_is_caught(applications):
+    with count_queries() as counter:
+        for application in Application.query.all():
+            repr(application)
+    # One query for the list, then a lazy load per distinct institution and user
+    assert counter.count == 1 + 2 + 3
+
+    db.session.remove()
+    with pytest.raises(AssertionError, match='Expected at most 1 queries'):
+        with max_queries(1):
+            for application in Application.query.all():
+                repr(application)
+
+
+def test_user_profile_loads_applications_and_institutions(applications):
+    with max_queries(2):
+        for user in User.query.options(*load_profile('user.applications')).all():
+            for application in user.applications:
+                repr(application)
@@ -0,0 +1,63 @@
+#tests/test_messages.py
+#
+# Sending messages, the conversation list and keyset-paged history.
+
+import pytest
+
+
+@pytest.fixture
+def users(make_user):
+    return {name: make_user(name) for name in ('alice', 'bob', 'carol')}
+
+
+# Function to send a message through the API
+def send(client, headers, recipient, content):
+    return client.post('/messages', headers=headers, json={'recipient_id': recipient.id, 'content': content})
+
+
+def test_send_message_validates_the_recipient(client, auth_headers, users):
+    headers = auth_headers(users['alice'])
+
+    assert send(client, headers, users['bob'], 'Hi Bob').status_code == 201
+    assert client.post('/messages', headers=headers, json={'recipient_id': True, 'content': 'x'}).status_code == 400
+    assert client.post('/messages', headers=headers, json={'recipient_id': 999, 'content': 'x'}).status_code == 404
+    assert send(client, headers, users['alice'], 'Note to self').status_code == 400
+
+
+def test_conversations_list_the_latest_message_of_each(client, auth_headers, users):
+    alice, bob, carol = users['alice'], users['bob'], users['carol']
+    send(client, auth_headers(alice), bob, 'Hi Bob')
+    send(client, auth_headers(carol), alice, 'Hi Alice')
+    send(client, auth_headers(bob), alice, 'Hi back')
+
+    response = client.get('/messages/conversations', headers=auth_headers(alice))
+    items = response.get_json()['items']
+    assert [(item['user_id'], item['latest_message']['content']) for item in items] == [
+        (bob.id, 'Hi back'), (carol.id, 'Hi Alice')]
+
+    # One per page, following the cursor
+    first = client.get('/messages/conversations?limit=1', headers=auth_headers(alice)).get_json()
+    assert [item['user_id'] for item in first['items']] == [bob.id]
+    second = client.get(f"/messages/conversations?limit=1&cursor={first['next_cursor']}",
+                        headers=auth_headers(alice)).get_json()
+    assert [item['user_id'] for item in second['items']] == [carol.id]
+    assert second['next_cursor'] is None
+
+
+def test_history_is_paged_newest_first(client, auth_headers, users):
+    alice, bob = users['alice'], users['bob']
+    for i in range(5):
+        send(client, auth_headers(alice if i % 2 == 0 else bob), alice if i % 2 else bob, f'message {i}')
+
+    contents, cursor = [], ''
+    while True:
+        page = client.get(f'/messages/conversations/{bob.id}?limit=2&cursor={cursor}',
+                          headers=auth_headers(alice)).get_json()
+        contents.extend(message['content'] for message in page['items'])
+        cursor = page['next_cursor']
+        if cursor is None:
+            break
+    assert contents == [f'message {i}' for i in reversed(range(5))]
+
+    response = client.get(f'/messages/conversations/{bob.id}?cursor=garbage', headers=auth_headers(alice))
+    assert response.status_code == 400
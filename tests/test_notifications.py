@@ -0,0 +1,119 @@
+#tests/test_notifications.py
+#
+# Unread counters, marking as read and long-poll delivery.
+
+import threading
+import time
+
+import pytest
+
+from app import db
+from app.models import Notification
+from app.utils.notifications import notification_hub, notify, reconcile_unread_counts, unread_count
+
+
+@pytest.fixture
+def alice(make_user):
+    return make_user('alice')
+
+
+def test_unread_counts_follow_notify_and_mark_read(client, auth_headers, alice, make_user):
+    bob = make_user('bob')
+    notify([alice.id, alice.id, bob.id], 'Results are out')
+    assert (unread_count(alice.id), unread_count(bob.id)) == (2, 1)
+
+    first = Notification.query.filter_by(user_id=alice.id).order_by(Notification.id).first()
+    response = client.post('/notifications/read', json={'ids': [first.id]}, headers=auth_headers(alice))
+    assert response.get_json() == {'marked': 1, 'unread': 1}
+    # Marking again changes nothing
+    response = client.post('/notifications/read', json={'ids': [first.id]}, headers=auth_headers(alice))
+    assert response.get_json() == {'marked': 0, 'unread': 1}
+
+    response = client.post('/notifications/read', headers=auth_headers(alice))
+    assert response.get_json() == {'marked': 1, 'unread': 0}
+    assert unread_count(bob.id) == 1
+
+
+def test_reconcile_repairs_unread_counts(alice):
+    notify([alice.id], 'Hello')
+    db.session.execute(db.text("UPDATE stat_counters SET value = 9 WHERE scope = 'notifications.unread'"))
+    db.session.commit()
+
+    assert reconcile_unread_counts() == 1
+    assert unread_count(alice.id) == 1
+
+
+# Function to start a long poll and return its cursor
+def start_poll(client, headers):
+    return client.get('/notifications/poll', headers=headers).get_json()['cursor']
+
+
+def test_poll_wakes_up_on_a_new_notification(app, client, auth_headers, alice):
+    headers = auth_headers(alice)
+    cursor = start_poll(client, headers)
+
+    def later():
+        time.sleep(0.3)
+        with app.app_context():
+            notify([alice.id], 'Your application was accepted')
+            db.session.remove()
+    threading.Thread(target=later).start()
+
+    started = time.monotonic()
+    body = client.get(f'/notifications/poll?cursor={cursor}&timeout=10', headers=headers).get_json()
+    assert time.monotonic() - started < 5
+    assert [item['content'] for item in body['items']] == ['Your application was accepted']
+
+    # The new cursor does not deliver it again
+    body = client.get(f"/notifications/poll?cursor={body['cursor']}&timeout=0", headers=headers).get_json()
+    assert body['items'] == []
+
+
+def test_poll_delivers_rows_committed_out_of_id_order(client, auth_headers, alice):
+    headers = auth_headers(alice)
+    notify([alice.id], 'first')
+    cursor = start_poll(client, headers)
+    # Id 5 is delivered, then id 3 commits (as a slower concurrent transaction would)
+    db.session.add(Notification(id=5, user_id=alice.id, content='five'))
+    db.session.commit()
+    body = client.get(f'/notifications/poll?cursor={cursor}&timeout=0', headers=headers).get_json()
+    assert [item['content'] for item in body['items']] == ['five']
+
+    db.session.add(Notification(id=3, user_id=alice.id, content='three'))
+    db.session.commit()
+    body = client.get(f"/notifications/poll?cursor={body['cursor']}&timeout=0", headers=headers).get_json()
+    assert [item['content'] for item in body['items']] == ['three']
+
+
+def test_poll_is_refused_when_every_slot_is_taken(client, auth_headers, alice, monkeypatch):
+    monkeypatch.setattr(notification_hub, 'max_waiters', 0)
+    headers = auth_headers(alice)
+    cursor = start_poll(client, headers)
+
+    response = client.get(f'/notifications/poll?cursor={cursor}&timeout=5', headers=headers)
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'
+
+
+def test_poll_rejects_a_bad_cursor(client, auth_headers, alice):
+    response = client.get('/notifications/poll?cursor=garbage', headers=auth_headers(alice))
+    assert response.status_code == 400
+
+
+def test_watcher_picks_up_rows_committed_elsewhere_out_of_order(alice):
+    notify([alice.id], 'first')
+    generation = notification_hub.subscribe(alice.id)
+    try:
+        # Raw inserts stand in for other processes: no session hook wakes the waiter
+        for notification_id in (5, 3):
+            db.session.execute(db.text(
+                "INSERT INTO notifications (id, user_id, content) VALUES (:id, :user_id, 'x')"),
+                {'id': notification_id, 'user_id': alice.id})
+            db.session.commit()
+            notification_hub._check()
+            assert notification_hub.wait(alice.id, generation, 0)
+            generation = notification_hub.generations[alice.id]
+        notification_hub._check()
+        assert not notification_hub.wait(alice.id, generation, 0)
+    finally:
+        notification_hub.unsubscribe(alice.id)
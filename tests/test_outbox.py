@@ -0,0 +1,38 @@
+#tests/test_outbox.py
+#
+# The email outbox: queued with the caller's transaction, delivered by the workers.
+
+from app import create_app, db
+from app.models import OutboxEmail
+from app.utils.outbox import claim_batch, run_worker, worker_settings
+
+
+def test_password_change_queues_a_notice(app, client, make_user, auth_headers, tmp_path):
+    app.config['MAIL_OUTBOX_DIR'] = str(tmp_path / 'outbox')
+    alice = make_user('alice')
+
+    response = client.put('/auth/user/password', json={'password': 'new password'}, headers=auth_headers(alice))
+    assert response.status_code == 200
+    email = OutboxEmail.query.one()
+    assert (email.recipient, email.status) == ('alice@example.com', 'pending')
+
+    run_worker(app, once=True)
+    db.session.remove()  # The worker used its own session
+    assert OutboxEmail.query.one().status == 'sent'
+    sent = (tmp_path / 'outbox' / f'{email.id}.eml').read_text()
+    assert 'Subject: Your password was changed' in sent
+
+
+def test_claimed_emails_are_leased_once(database):
+    database.session.add_all([OutboxEmail(subject='Hi', recipient=f'user{i}@example.com', body='Hello')
+                              for i in range(3)])
+    database.session.commit()
+
+    assert len(claim_batch(10, lease_seconds=300)) == 3
+    assert claim_batch(10, lease_seconds=300) == []
+
+
+def test_worker_settings_rebuild_the_app(app):
+    settings = worker_settings(app)
+    worker_app = create_app(settings)
+    assert worker_app.config['SQLALCHEMY_DATABASE_URI'] == app.config['SQLALCHEMY_DATABASE_URI']
@@ -0,0 +1,110 @@
+#tests/test_polls.py
+#
+# Poll votes, tallies and buffered comment votes.
+
+from datetime import datetime, timedelta
+
+import pytest
+
+from app.models import (
+    Course, Institution, Poll, PollComment, PollCommentVote, PollQuestion, PollResult, PollVote,
+)
+from app.utils.polls import get_poll_results, reconcile_poll_results
+from app.utils.write_buffer import write_buffer
+
+
+@pytest.fixture
+def poll(database):
+    """An open poll with one question and one comment."""
+    institution = Institution(name='Strathmore', location='Nairobi')
+    database.session.add(institution)
+    database.session.flush()
+    course = Course(institution_id=institution.id, name='Statistics', code='STA101')
+    database.session.add(course)
+    database.session.flush()
+    poll = Poll(course_id=course.id, title='Exam date', end_date=datetime.utcnow() + timedelta(days=1))
+    database.session.add(poll)
+    database.session.flush()
+    database.session.add_all([
+        PollQuestion(poll_id=poll.id, question_text='Which week?'),
+        PollComment(poll_id=poll.id, user_id=1, content='Week 12 please'),
+    ])
+    database.session.commit()
+    return poll
+
+
+# Function to cast a vote through the API
+def vote(client, headers, poll, answer, question_id=1):
+    return client.post(f'/polls/{poll.id}/votes', headers=headers,
+                       json={'question_id': question_id, 'answer_text': answer})
+
+
+def test_votes_update_the_tallies(client, make_user, auth_headers, poll):
+    for name, answer in [('alice', 'Week 12'), ('bob', ' Week 12 '), ('carol', 'Week 13')]:
+        assert vote(client, auth_headers(make_user(name)), poll, answer).status_code == 201
+
+    assert get_poll_results(poll.id) == {1: {'Week 12': 2, 'Week 13': 1}}
+    response = client.get(f'/polls/{poll.id}/results')
+    assert response.get_json()['questions'] == [{'question_id': 1, 'answers': {'Week 12': 2, 'Week 13': 1}}]
+
+
+def test_second_vote_on_a_question_is_a_conflict(client, make_user, auth_headers, poll):
+    headers = auth_headers(make_user('alice'))
+    assert vote(client, headers, poll, 'Week 12').status_code == 201
+    assert vote(client, headers, poll, 'Week 13').status_code == 409
+
+    assert PollVote.query.count() == 1
+    assert get_poll_results(poll.id) == {1: {'Week 12': 1}}
+
+
+def test_vote_rejects_boolean_question_id(client, make_user, auth_headers, poll):
+    response = vote(client, auth_headers(make_user('alice')), poll, 'Week 12', question_id=True)
+    assert response.status_code == 400
+
+
+def test_new_answers_are_capped(app, client, make_user, auth_headers, poll):
+    app.config['POLL_MAX_ANSWERS'] = 2
+    assert vote(client, auth_headers(make_user('alice')), poll, 'Week 12').status_code == 201
+    assert vote(client, auth_headers(make_user('bob')), poll, 'Week 13').status_code == 201
+    assert vote(client, auth_headers(make_user('carol')), poll, 'Week 14').status_code == 400
+    # Existing answers still take votes
+    assert vote(client, auth_headers(make_user('dave')), poll, 'Week 13').status_code == 201
+
+
+def test_reconcile_rebuilds_drifted_tallies(database, client, make_user, auth_headers, poll):
+    vote(client, auth_headers(make_user('alice')), poll, 'Week 12')
+    vote(client, auth_headers(make_user('bob')), poll, 'Week 13')
+    # Drift: a wrong count, and a tally without votes
+    PollResult.query.filter_by(answer_text='Week 12').update({'vote_count': 7})
+    database.session.add(PollResult(poll_id=poll.id, question_id=1, answer_text='Week 9', vote_count=3))
+    database.session.commit()
+
+    assert reconcile_poll_results(poll.id) == 2
+    assert get_poll_results(poll.id) == {1: {'Week 12': 1, 'Week 13': 1}}
+
+
+def test_repeated_comment_votes_keep_one_vote_per_user(client, make_user, auth_headers, poll):
+    alice = make_user('alice')
+    bob = make_user('bob')
+    url = f'/polls/{poll.id}/comments/1/votes'
+
+    for _ in range(5):
+        assert client.post(url, json={'vote': 1}, headers=auth_headers(alice)).status_code == 202
+    assert client.post(url, json={'vote': -1}, headers=auth_headers(bob)).status_code == 202
+    write_buffer.flush()
+    # A later vote replaces the stored one, in the same flush or a later one
+    client.post(url, json={'vote': -1}, headers=auth_headers(alice))
+    write_buffer.flush()
+
+    votes = {vote.user_id: vote.vote for vote in PollCommentVote.query.filter_by(comment_id=1)}
+    assert votes == {alice.id: -1, bob.id: -1}
+
+
+def test_comment_vote_value_is_validated(client, make_user, auth_headers, poll):
+    alice = make_user('alice')
+    url = f'/polls/{poll.id}/comments/1/votes'
+
+    assert client.post(url, json={'vote': True}, headers=auth_headers(alice)).status_code == 400
+    assert client.post(url, json={'vote': 2}, headers=auth_headers(alice)).status_code == 400
+    assert client.post(f'/polls/{poll.id}/comments/99/votes', json={'vote': 1},
+                       headers=auth_headers(alice)).status_code == 404
@@ -0,0 +1,99 @@
+#tests/test_replicas.py
+#
+# Read-replica routing against local SQLite files standing in for the primary and replicas.
+
+import pytest
+from flask import jsonify
+
+from app import create_app, db
+from app.models import Institution
+from app.utils.replicas import use_replica
+from config import TestingConfig
+
+
+# Function to create an app with a primary and `replicas` replica files, each holding one institution
+def make_app(tmp_path, replicas):
+    class Config(TestingConfig):
+        SQLALCHEMY_DATABASE_URI = f"sqlite:///{tmp_path / 'primary.db'}"
+        SQLALCHEMY_REPLICA_URIS = [f"sqlite:///{tmp_path / f'replica-{i}.db'}" for i in range(replicas)]
+        REPLICA_READ_BLUEPRINTS = []
+
+    app = create_app(Config)
+
+    @app.route('/test/institutions', methods=['GET'])
+    @use_replica
+    def list_names():
+        # Two separate queries: both must come from the same database
+        first = [name for (name,) in db.session.query(Institution.name).order_by(Institution.name)]
+        second = [name for (name,) in db.session.query(Institution.name).order_by(Institution.name)]
+        return jsonify({'first': first, 'second': second}), 200
+
+    @app.route('/test/institutions/primary', methods=['GET'])
+    def list_names_on_primary():
+        return jsonify([name for (name,) in db.session.query(Institution.name).order_by(Institution.name)]), 200
+
+    @app.route('/test/institutions', methods=['POST'])
+    def add_institution():
+        db.session.add(Institution(name='Added University', location='Primary'))
+        db.session.commit()
+        return jsonify({"msg": "Institution added"}), 201
+
+    with app.app_context():
+        db.create_all()
+        db.session.add(Institution(name='Primary University', location='Primary'))
+        db.session.commit()
+        for i, replica in enumerate(app.extensions['replica_router'].replicas):
+            db.metadata.create_all(replica.engine)
+            with replica.engine.begin() as connection:
+                connection.execute(Institution.__table__.insert(),
+                                   [{'name': f'Replica {i} University', 'location': 'Replica'}])
+    return app
+
+
+@pytest.fixture
+def replica_app(tmp_path):
+    return make_app(tmp_path, 1)
+
+
+def test_marked_views_read_from_the_replica(replica_app):
+    response = replica_app.test_client().get('/test/institutions')
+    assert response.status_code == 200
+    assert response.get_json()['first'] == ['Replica 0 University']
+
+
+def test_unmarked_views_read_from_the_primary(replica_app):
+    response = replica_app.test_client().get('/test/institutions/primary')
+    assert response.get_json() == ['Primary University']
+
+
+def test_reads_follow_the_clients_own_writes(replica_app):
+    client = replica_app.test_client()
+    assert client.post('/test/institutions').status_code == 201
+
+    # The write set the read-your-writes cookie, so this client now reads the primary
+    response = client.get('/test/institutions')
+    assert response.get_json()['first'] == ['Added University', 'Primary University']
+
+    # Other clients still read the (lagging) replica
+    other = replica_app.test_client().get('/test/institutions')
+    assert other.get_json()['first'] == ['Replica 0 University']
+
+
+def test_each_request_is_pinned_to_one_replica(tmp_path):
+    app = make_app(tmp_path, 2)
+    client = app.test_client()
+    seen = set()
+    for _ in range(4):
+        body = client.get('/test/institutions').get_json()
+        assert body['first'] == body['second']
+        seen.update(body['first'])
+    # Round-robin still spreads requests over both replicas
+    assert seen == {'Replica 0 University', 'Replica 1 University'}
+
+
+def test_reads_fall_back_to_the_primary_without_a_healthy_replica(replica_app):
+    replica_set = replica_app.extensions['replica_router']
+    with replica_app.app_context():
+        replica_set.mark_unhealthy(replica_set.replicas[0], 'test')
+    response = replica_app.test_client().get('/test/institutions')
+    assert response.get_json()['first'] == ['Primary University']
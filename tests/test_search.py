@@ -0,0 +1,39 @@
+#tests/test_search.py
+#
+# The in-process trigram backend: committed writes and periodic rebuilds.
+
+from app import db
+from app.models import Institution
+from app.utils.search import search_engine
+
+
+# Function to list the names of the institutions matching a query
+def institution_names(query):
+    return sorted(row.name for row in search_engine.search(Institution, query))
+
+
+def test_ngram_backend_follows_committed_writes(database):
+    assert search_engine.backend.name == 'ngram'
+    institution = Institution(name='Strathmore University', location='Nairobi')
+    database.session.add(institution)
+    database.session.commit()
+    assert institution_names('more') == ['Strathmore University']
+
+    institution.name = 'Moi University'
+    database.session.commit()
+    assert institution_names('more') == []
+    assert institution_names('moi') == ['Moi University']
+
+
+def test_ngram_rebuild_picks_up_rows_written_by_other_processes(database, monkeypatch):
+    assert institution_names('nairobi') == []
+    # Bypasses the session hooks, as a write committed by another worker does
+    db.session.execute(Institution.__table__.insert().values(name='Strathmore University', location='Nairobi'))
+    db.session.commit()
+    assert institution_names('nairobi') == []
+
+    monkeypatch.setattr(search_engine.backend, 'rebuild_interval', 0)
+    search_engine.search(Institution, 'nairobi')  # Stale: starts a background rebuild
+    search_engine.backend.build()  # Waits for it
+    monkeypatch.undo()
+    assert institution_names('nairobi') == ['Strathmore University']
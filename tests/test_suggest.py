@@ -0,0 +1,92 @@
+#tests/test_suggest.py
+#
+# Typeahead suggestions: popularity follows committed writes, and rebuilds replay each change once.
+
+import pytest
+
+from app import db
+from app.models import Application, Institution, User
+from app.utils import suggest
+from app.utils.suggest import suggestion_index
+
+
+@pytest.fixture
+def index(database):
+    """An empty suggestion index over one user and two institutions."""
+    user = User(username='alice', email='a@example.com', password_hash='x')
+    database.session.add_all([
+        user,
+        Institution(name='Strathmore University', location='Nairobi'),
+        Institution(name='Moi University', location='Eldoret'),
+    ])
+    database.session.commit()
+    suggestion_index.invalidate()
+    suggestion_index.build()
+    yield user
+    suggestion_index.invalidate()
+
+
+# Function to read the popularity of each suggestion for a prefix
+def popularity(prefix):
+    return {item['text']: item['popularity'] for item in suggestion_index.suggest(prefix, 10)}
+
+# Function to commit an application
+def apply(user, institution_id, program):
+    application = Application(user_id=user.id, institution_id=institution_id, program=program)
+    db.session.add(application)
+    db.session.commit()
+    return application
+
+
+def test_popularity_follows_added_moved_and_deleted_applications(index):
+    application = apply(index, 1, 'Law')
+    apply(index, 1, 'Law')
+    assert popularity('law') == {'Law': 2}
+    assert popularity('strath') == {'Strathmore University': 2}
+    assert popularity('nai') == {'Nairobi': 2}
+
+    application.program = 'Medicine'
+    application.institution_id = 2
+    db.session.commit()
+    assert popularity('law') == {'Law': 1}
+    assert popularity('med') == {'Medicine': 1}
+    assert popularity('strath') == {'Strathmore University': 1}
+    assert popularity('moi') == {'Moi University': 1}
+
+    db.session.delete(application)
+    db.session.commit()
+    assert popularity('med') == {}  # Nobody applies to the program any more
+    assert popularity('univ') == {'Strathmore University': 1, 'Moi University': 0}
+    assert popularity('eld') == {'Eldoret': 0}
+
+
+def test_rebuild_skips_changes_already_in_its_snapshot(index):
+    # A commit between starting a build and reading its snapshot is logged for replay
+    with suggestion_index.lock:
+        suggestion_index.building, suggestion_index.replay = True, []
+    apply(index, 1, 'Law')
+    suggestion_index._build()
+    assert popularity('law') == {'Law': 1}
+    assert popularity('strath') == {'Strathmore University': 1}
+
+
+def test_rebuild_replays_changes_committed_after_its_counters_were_read(index, monkeypatch):
+    read_counters = suggest.read_counters
+
+    def read_then_commit(scope):
+        counters = read_counters(scope)
+        if scope == 'applications.program':
+            apply(index, 2, 'Law')
+        return counters
+
+    monkeypatch.setattr(suggest, 'read_counters', read_then_commit)
+    suggestion_index.build()
+    assert popularity('law') == {'Law': 1}
+    assert popularity('moi') == {'Moi University': 1}
+
+
+def test_suggest_answers_503_until_the_index_is_built(index, client, monkeypatch):
+    monkeypatch.setattr(suggestion_index, 'current', lambda timeout=None: None)
+    response = client.get('/search/suggest?q=str')
+    assert response.status_code == 503
+    assert response.headers['Retry-After'] == '5'